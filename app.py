@@ -1,42 +1,67 @@
 import os
 import json
-import requests
+from collections import Counter
 
-from sqlite3 import IntegrityError
-from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect, request
+import click
+from dotenv import load_dotenv
 
+# carrega as variaveis de ambiente antes dos modulos que as utilizam
+load_dotenv()
 
-from model import Session, Diario, Refeicao
+from sqlite3 import IntegrityError
+from flask_openapi3 import OpenAPI, Info, Tag
+from flask import redirect, request, Response, stream_with_context
+from werkzeug.http import quote_etag
+from sqlalchemy import select, insert, update, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload, contains_eager
+
+
+from json_provider import ProvedorJsonRapido
+from model import Session, SessionFactory, Diario, Refeicao, Receita
+from model.versao import obtem_versao_global, incrementa_versao_global
+from model.estatistica import (
+    EstatisticaRefeicao, atualiza_estatisticas, contagens_refeicoes,
+    remove_estatisticas, reconstroi_estatisticas
+)
 from logger import logger
 
 from schemas.diario import (
-    DiarioSchema, DiarioViewSchema, DiarioListaSchema,
-    DiarioRemocaoSchema, DiarioBuscaSchema,
-    retorna_diario, retorna_lista_diarios
+    DiarioSchema, DiarioViewSchema, DiarioListaSchema, DiarioListagemSchema,
+    DiarioExportacaoSchema, DiarioRemocaoSchema, DiarioBuscaSchema,
+    DiarioLoteSchema, DiarioLoteViewSchema, DiarioIntervaloSchema, DiarioFiltroSchema, DiarioRemocaoLoteSchema,
+    retorna_diario, retorna_lista_diarios, retorna_lista_diarios_linhas, agrupa_linhas_diarios
 )
 
-from schemas.receita import (ReceitaBuscaSchema, ReceitaViewSchema, retorna_lista_receitas, organiza_estrutura_receita)
+from schemas.receita import (ReceitaBuscaSchema, ReceitaPaginaBuscaSchema, ReceitaIdBuscaSchema, ReceitaViewSchema,
+                             ReceitaListaViewSchema, retorna_receita)
 
-from schemas.traducao import (TraducaoRequisicaoSchema, TraducaoViewSchema)
+from schemas.comentario import (ComentarioBuscaSchema, ComentarioListaSchema, gera_consulta_fts, retorna_lista_comentarios)
 
-from schemas.error import ErrorSchema
-from flask_cors import CORS
+from schemas.estatistica import (EstatisticaBuscaSchema, EstatisticaListaSchema, retorna_lista_estatisticas)
 
-from dotenv import load_dotenv
+from schemas.traducao import (TraducaoRequisicaoSchema, TraducaoViewSchema, CacheTraducaoViewSchema)
 
+from services.traducao import realizar_traducao, cache_traducao
+from services.receita import buscar_receita_em_cache_assincrona, buscar_receitas_em_cache_assincrona
+from services.preaquecimento import executa_preaquecimento, preaquece_continuamente
+
+from schemas.error import ErrorSchema
+from flask_cors import CORS
 
-load_dotenv()
 
 info = Info(title="Diário Introdução Alimentar API", version="1.0.0")
 app = OpenAPI(__name__, info=info)
+app.json = ProvedorJsonRapido(app)
 CORS(app)
 
 
+# quantidade de linhas lidas do bd por vez na exportacao
+EXPORTACAO_LINHAS_POR_LOTE = int(os.getenv('EXPORTACAO_LINHAS_POR_LOTE') or 500)
+
 #definindo api keys
 
 SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY')
-GOOGLE_TRANSLATE_API_KEY = os.getenv('GOOGLE_TRANSLATE_API_KEY')
 
 if not SPOONACULAR_API_KEY:
     raise RuntimeError("SPOONACULAR_API_KEY não encontrada nas variáveis de ambiente")
@@ -49,8 +74,37 @@ diario_tag = Tag(
 
 receita_tag = Tag(name="Receitas", description="Busca de receitas usando a API Spoonacular")
 
+estatistica_tag = Tag(name="Estatísticas", description="Contagens de refeições por período, tipo, método, avaliação e aceitação")
+
 traducao_tag = Tag(name="Tradução", description="Tradução de textos usando a API Google Translate")
 
+@app.teardown_appcontext
+def remove_sessao(exception=None):
+    """Encerra a sessao do bd associada a requisicao
+    """
+    Session.remove()
+
+
+def consulta_linhas_diarios():
+    """Retorna a consulta dos registros e refeicoes como linhas
+    (data_registro, tipo, metodo, avaliacao, aceitacao, comentarios),
+    ordenadas por data, no formato esperado por agrupa_linhas_diarios
+    """
+    return select(
+        Diario.data_registro, Refeicao.tipo, Refeicao.metodo,
+        Refeicao.avaliacao, Refeicao.aceitacao, Refeicao.comentarios
+    ).outerjoin(Diario.refeicoes).order_by(Diario.data_registro, Refeicao.id)
+
+
+def resposta_nao_modificada(etag: str):
+    """Retorna uma resposta 304 caso o cliente ja possua a versao do recurso
+    identificada pela etag (cabecalho If-None-Match) ou None caso contrario
+    """
+    if request.if_none_match.contains(etag):
+        return "", 304, {"ETag": quote_etag(etag)}
+    return None
+
+
 @app.get('/', tags=[home_tag])
 def home():
     """Redireciona para /openapi, tela que permite a escolha do estilo de documentacao.
@@ -87,7 +141,10 @@ def insert_entrada_diario(body:DiarioSchema):
         # criando conexao com o bd
         session = Session()
         # adicionando instancia de diario
+        diario.versao = incrementa_versao_global(session)
         session.add(diario)
+        # contabilizando as refeicoes nas estatisticas
+        atualiza_estatisticas(session, contagens_refeicoes(diario.data_registro, diario.refeicoes))
         # realizando o commit da transacao
         session.commit()
         logger.debug("Adicionando entrada para a data: %s",
@@ -108,26 +165,169 @@ def insert_entrada_diario(body:DiarioSchema):
         return {"message": error_msg}, 400
 
 
+@app.post('/inserir_diarios', tags=[diario_tag],
+          responses={"200": DiarioLoteViewSchema, "400": ErrorSchema})
+def insert_entradas_diario(body: DiarioLoteSchema):
+    """Adiciona um lote de registros do diario de introducao alimentar
+
+    Todos os registros sao gravados em uma unica transacao. Registros com
+    data ja salva na base ou repetida no lote sao reportados como conflito,
+    sem impedir a insercao dos demais.
+
+    Retorna as datas inseridas e os registros em conflito.
+    """
+    conflitos = []
+    diarios = {}
+
+    for diario_bruto in body.diarios:
+        if diario_bruto.data_registro in diarios:
+            conflitos.append({"data_registro": diario_bruto.data_registro,
+                              "mensagem": "Registro com data repetida no lote"})
+        else:
+            diarios[diario_bruto.data_registro] = diario_bruto
+
+    logger.debug("Adicionando lote com %s entradas", len(diarios))
+    try:
+        # criando conexao com o bd
+        session = Session()
+
+        # insere os registros ignorando datas ja salvas; o RETURNING informa
+        # quais datas foram efetivamente inseridas
+        resultado = session.execute(
+            sqlite_insert(Diario).on_conflict_do_nothing().returning(Diario.data_registro),
+            [{"data_registro": data_registro} for data_registro in diarios])
+        inseridos = {linha.data_registro for linha in resultado}
+
+        refeicoes = [
+            {
+                "diario": data_registro,
+                "tipo": refeicao_bruta.tipo,
+                "metodo": refeicao_bruta.metodo,
+                "avaliacao": refeicao_bruta.avaliacao,
+                "aceitacao": refeicao_bruta.aceitacao,
+                "comentarios": refeicao_bruta.comentarios
+            }
+            for data_registro, diario_bruto in diarios.items() if data_registro in inseridos
+            for refeicao_bruta in diario_bruto.refeicoes
+        ]
+        if refeicoes:
+            session.execute(insert(Refeicao), refeicoes)
+
+        # contabilizando as refeicoes inseridas nas estatisticas
+        variacoes = Counter()
+        for data_registro in inseridos:
+            variacoes.update(contagens_refeicoes(data_registro, diarios[data_registro].refeicoes))
+        atualiza_estatisticas(session, variacoes)
+        if inseridos:
+            versao = incrementa_versao_global(session)
+            session.execute(update(Diario).where(Diario.data_registro.in_(inseridos)).values(versao=versao))
+
+        # realizando o commit da transacao
+        session.commit()
+
+    except Exception as e:
+        # tratando erros nao previstos
+        error_msg = "Nao foi possivel salvar o lote de registros :/"
+        logger.warning("Erro ao adicionar lote de registros, %s", {e})
+        return {"message": error_msg}, 400
+
+    for data_registro in diarios:
+        if data_registro not in inseridos:
+            conflitos.append({"data_registro": data_registro,
+                              "mensagem": "Registro com mesma data ja salvo na base"})
+
+    logger.debug("%s entradas adicionadas, %s conflitos", len(inseridos), len(conflitos))
+    return {"inseridos": sorted(inseridos), "conflitos": conflitos}, 200
+
+
 @app.get('/listar_diarios', tags=[diario_tag],
          responses={"200": DiarioListaSchema, "404": ErrorSchema})
-def get_entradas_diario():
-    """Retorna todos os registros do diario presentes no bd
+def get_entradas_diario(query: DiarioListagemSchema):
+    """Retorna uma pagina dos registros do diario presentes no bd
+
+    Os registros sao ordenados por data e a pagina seguinte e obtida
+    enviando proximo_cursor como after. Caso o cliente informe no cabecalho
+    If-None-Match a ETag da versao atual do diario, retorna 304 sem
+    realizar a busca.
 
     Retorna uma representacao da listagem de registros.
     """
-    logger.debug("Buscando entradas de diário ")
+    logger.debug("Buscando entradas de diário após %s", query.after)
     # criando conexao com o bd
     session = Session()
-    # fazendo a busca
-    entradas_diario = session.query(Diario).all()
 
-    if not entradas_diario:
-        # se nao ha registros cadastrados
-        return {"diarios": []}, 200
-    else:
-        logger.debug("%s entradas de diario encontradas", len(entradas_diario))
-        # retorna a representacao de um registro
-        return retorna_lista_diarios(entradas_diario), 200
+    # a listagem muda apenas quando o contador global de alteracoes muda
+    etag = "v%d" % obtem_versao_global(session)
+    nao_modificada = resposta_nao_modificada(etag)
+    if nao_modificada:
+        return nao_modificada
+
+    # fazendo a busca das datas da pagina
+    consulta = select(Diario.data_registro)
+    if query.after is not None:
+        consulta = consulta.where(Diario.data_registro > query.after)
+
+    # busca um registro a mais para saber se existe uma proxima pagina
+    datas = session.execute(
+        consulta.order_by(Diario.data_registro).limit(query.limit + 1)).scalars().all()
+
+    proximo_cursor = None
+    if len(datas) > query.limit:
+        datas = datas[:query.limit]
+        # formato ISO, para que o cursor possa ser reenviado como parametro
+        proximo_cursor = datas[-1].isoformat()
+
+    # carregando os registros e refeicoes da pagina como tuplas, sem objetos do ORM
+    linhas = session.execute(consulta_linhas_diarios().where(Diario.data_registro.in_(datas)))
+
+    logger.debug("%s entradas de diario encontradas", len(datas))
+    # retorna a representacao da pagina de registros
+    return retorna_lista_diarios_linhas(linhas, proximo_cursor), 200, {"ETag": quote_etag(etag)}
+
+
+@app.get('/exportar_diarios', tags=[diario_tag],
+         responses={"200": DiarioSchema})
+def exportar_diarios(query: DiarioExportacaoSchema):
+    """Exporta todos os registros do diario presentes no bd
+
+    Os registros sao lidos do bd em lotes e enviados aos poucos, de modo que
+    o consumo de memoria nao depende do tamanho do historico. O formato
+    ndjson envia um registro por linha e o formato json envia uma lista.
+
+    Retorna um fluxo com a representacao dos registros.
+    """
+    logger.debug("Exportando entradas de diário em %s", query.formato)
+
+    consulta = consulta_linhas_diarios()
+
+    def serializa(diario):
+        diario["data_registro"] = diario["data_registro"].isoformat()
+        return json.dumps(diario, ensure_ascii=False)
+
+    def gera_exportacao():
+        # criando conexao propria com o bd, ja que o fluxo e enviado apos o
+        # termino da funcao da rota
+        session = SessionFactory()
+        try:
+            # cursor no servidor, lendo as linhas em lotes
+            linhas = session.execute(consulta.execution_options(
+                yield_per=EXPORTACAO_LINHAS_POR_LOTE))
+
+            if query.formato == "ndjson":
+                for diario in agrupa_linhas_diarios(linhas):
+                    yield serializa(diario) + "\n"
+            else:
+                separador = ""
+                yield "["
+                for diario in agrupa_linhas_diarios(linhas):
+                    yield separador + serializa(diario)
+                    separador = ","
+                yield "]"
+        finally:
+            session.close()
+
+    mimetype = "application/x-ndjson" if query.formato == "ndjson" else "application/json"
+    return Response(stream_with_context(gera_exportacao()), mimetype=mimetype)
 
 
 @app.get('/buscar_diario', tags=[diario_tag],
@@ -135,6 +335,9 @@ def get_entradas_diario():
 def get_entrada_diario(query: DiarioBuscaSchema):
     """Faz a busca de um registro a partir da data informada
 
+    Caso o cliente informe no cabecalho If-None-Match a ETag da versao atual
+    do registro, retorna 304 sem carregar as refeicoes.
+
     Retorna uma representação do registro do diario de introducao alimentar e refeicoes associadas.
     """
     data_registro = query.data_registro
@@ -151,9 +354,80 @@ def get_entrada_diario(query: DiarioBuscaSchema):
         logger.warning(
             "Erro ao buscar entrada de diário para a data %s , %s", data_registro, error_msg)
         return {"message": error_msg}, 404
+
+    etag = "%s-%d" % (diario.data_registro.isoformat(), diario.versao)
+    nao_modificada = resposta_nao_modificada(etag)
+    if nao_modificada:
+        return nao_modificada
+
     logger.debug("Entrada econtrada : %s", {diario.data_registro})
     # retorna a entrada encontrada
-    return retorna_diario(diario), 200
+    return retorna_diario(diario), 200, {"ETag": quote_etag(etag)}
+
+
+@app.get('/buscar_diarios', tags=[diario_tag],
+         responses={"200": DiarioListaSchema})
+def get_entradas_diario_intervalo(query: DiarioFiltroSchema):
+    """Faz a busca dos registros entre as datas informadas, inclusive
+
+    As refeicoes podem ser filtradas por tipo e aceitacao.
+
+    Retorna uma representacao da listagem de registros.
+    """
+    logger.debug("Buscando entradas de diário entre %s e %s",
+                 query.data_inicio, query.data_fim)
+    # criando conexao com o bd
+    session = Session()
+    # fazendo a busca
+    consulta = session.query(Diario).filter(
+        Diario.data_registro.between(query.data_inicio, query.data_fim))
+
+    if query.tipo is None and query.aceitacao is None:
+        consulta = consulta.options(selectinload(Diario.refeicoes)).order_by(Diario.data_registro)
+    else:
+        # carrega apenas as refeicoes que atendem aos filtros, na ordem de insercao
+        consulta = consulta.join(Diario.refeicoes).options(contains_eager(Diario.refeicoes))
+        if query.tipo is not None:
+            consulta = consulta.filter(Refeicao.tipo == query.tipo)
+        if query.aceitacao is not None:
+            consulta = consulta.filter(Refeicao.aceitacao == query.aceitacao)
+        consulta = consulta.order_by(Diario.data_registro, Refeicao.id)
+
+    entradas_diario = consulta.all()
+
+    logger.debug("%s entradas de diario encontradas", len(entradas_diario))
+    return retorna_lista_diarios(entradas_diario), 200
+
+
+@app.get('/buscar_comentarios', tags=[diario_tag],
+         responses={"200": ComentarioListaSchema, "400": ErrorSchema})
+def get_comentarios(query: ComentarioBuscaSchema):
+    """Faz a busca de palavras nos comentarios das refeicoes
+
+    A busca usa o indice de texto completo dos comentarios e ignora acentos.
+
+    Retorna os registros encontrados, do mais relevante para o menos relevante,
+    com um trecho do comentario.
+    """
+    consulta_fts = gera_consulta_fts(query.termo)
+    if not consulta_fts:
+        error_msg = "Termo de busca não informado :/"
+        return {"message": error_msg}, 400
+
+    logger.debug("Buscando comentários com %s", consulta_fts)
+    # criando conexao com o bd
+    session = Session()
+    # fazendo a busca, ordenada pela relevancia (bm25: menor e mais relevante)
+    linhas = session.execute(text(
+        "SELECT refeicao.diario, refeicao.tipo, "
+        "snippet(refeicao_fts, 0, '<b>', '</b>', '...', 12), -bm25(refeicao_fts) "
+        "FROM refeicao_fts JOIN refeicao ON refeicao.id = refeicao_fts.rowid "
+        "WHERE refeicao_fts MATCH :consulta "
+        "ORDER BY bm25(refeicao_fts) LIMIT :limite"
+    ).columns(Refeicao.diario, Refeicao.tipo), {"consulta": consulta_fts, "limite": query.limit}).all()
+
+    logger.debug("%s comentários encontrados", len(linhas))
+    return retorna_lista_comentarios(linhas), 200
 
 
 @app.delete('/deletar_diario', tags=[diario_tag],
@@ -161,24 +435,21 @@ def get_entrada_diario(query: DiarioBuscaSchema):
 def del_produto(query: DiarioBuscaSchema):
     """Deleta um registro do diário a partir da data informada
 
+    As refeicoes associadas sao removidas pelo bd (ON DELETE CASCADE).
+
     Retorna uma mensagem de confirmacao da remocao.
     """
     data_registro = query.data_registro
     logger.debug("Deletando entrada de diário para a data %s", data_registro)
     # criando conexao com o bd
     session = Session()
-    # fazendo a remocao
-    
-    diario =  session.query(Diario).filter(
-        Diario.data_registro == data_registro).first()
-    
-    
-    for refeicao in diario.refeicoes:
-        session.query(Refeicao).filter(
-        Refeicao.id == refeicao.id).delete()
-    
+    # descontando as refeicoes das estatisticas
+    remove_estatisticas(session, Refeicao.diario == data_registro)
+    # fazendo a remocao com um unico DELETE
     count = session.query(Diario).filter(
-        Diario.data_registro == data_registro).delete()
+        Diario.data_registro == data_registro).delete(synchronize_session=False)
+    if count:
+        incrementa_versao_global(session)
     session.commit()
 
     if count:
@@ -192,6 +463,31 @@ def del_produto(query: DiarioBuscaSchema):
     return {"message": error_msg}, 404
 
 
+@app.delete('/deletar_diarios', tags=[diario_tag],
+            responses={"200": DiarioRemocaoLoteSchema})
+def del_entradas_diario(query: DiarioIntervaloSchema):
+    """Deleta os registros do diário entre as datas informadas, inclusive
+
+    Retorna uma mensagem de confirmacao e a quantidade de registros removidos.
+    """
+    logger.debug("Deletando entradas de diário entre %s e %s",
+                 query.data_inicio, query.data_fim)
+    # criando conexao com o bd
+    session = Session()
+    # descontando as refeicoes das estatisticas
+    remove_estatisticas(session, Refeicao.diario.between(query.data_inicio, query.data_fim))
+    # fazendo a remocao com um unico DELETE
+    count = session.query(Diario).filter(
+        Diario.data_registro.between(query.data_inicio, query.data_fim)
+    ).delete(synchronize_session=False)
+    if count:
+        incrementa_versao_global(session)
+    session.commit()
+
+    logger.debug("%s entradas de diário removidas", count)
+    return {"message": "Entradas de diário removidas", "quantidade": count}, 200
+
+
 @app.put('/editar_diario', tags=[diario_tag],
           responses={"200": DiarioViewSchema, "409": ErrorSchema, "400": ErrorSchema})
 def edit_entrada_diario(body:DiarioSchema):
@@ -209,7 +505,7 @@ def edit_entrada_diario(body:DiarioSchema):
         # criando conexao com o bd
         session = Session()
         # fazendo a busca
-        diario = session.query(Diario).filter(
+        diario = session.query(Diario).options(selectinload(Diario.refeicoes)).filter(
             Diario.data_registro == data_registro).first()
 
         logger.debug(
@@ -222,26 +518,31 @@ def edit_entrada_diario(body:DiarioSchema):
                 "Erro ao buscar entrada de diário para a data %s , %s", data_registro, error_msg)
             return {"message": error_msg}, 404
 
-        refeicoes = diario.refeicoes
-        for refeicao in refeicoes:
-            session.query(Refeicao).filter(
-                Refeicao.id == refeicao.id).delete()
-            session.commit()
-
         lista_refeicoes_brutas = body.refeicoes
-        for refeicao_bruta in lista_refeicoes_brutas:
-            refeicao = Refeicao(
+        refeicoes = [
+            Refeicao(
                 refeicao_bruta.tipo,
                 refeicao_bruta.metodo,
                 refeicao_bruta.avaliacao,
                 refeicao_bruta.aceitacao,
                 refeicao_bruta.comentarios
             )
-            diario.adiciona_refeicao(refeicao)
+            for refeicao_bruta in lista_refeicoes_brutas
+        ]
+        # altera apenas as refeicoes que mudaram
+        antes = contagens_refeicoes(data_registro, diario.refeicoes)
+        if diario.atualiza_refeicoes(refeicoes):
+            diario.versao = incrementa_versao_global(session)
+
+        # contabilizando nas estatisticas apenas a diferenca
+        variacoes = contagens_refeicoes(data_registro, diario.refeicoes)
+        variacoes.subtract(antes)
+        atualiza_estatisticas(session, variacoes)
 
         logger.debug("Editando entrada para a data: %s",
                      diario.data_registro)
 
+        # realizando o commit da transacao
         session.commit()
         return retorna_diario(diario), 200
 
@@ -249,106 +550,140 @@ def edit_entrada_diario(body:DiarioSchema):
         # tratando erros nao previstos
         error_msg = "Não foi possível editar o registro :/"
         logger.warning(
-            "Erro ao adicionar registro para a data %s, %s", diario.data_registro, {e})
+            "Erro ao editar registro para a data %s, %s", data_registro, {e})
         return {"message": error_msg}, 400
 
+@app.get('/estatisticas_refeicoes', tags=[estatistica_tag],
+         responses={"200": EstatisticaListaSchema})
+def get_estatisticas_refeicoes(query: EstatisticaBuscaSchema):
+    """Retorna as contagens de refeicoes por periodo e dimensoes
+
+    As contagens sao pre-agregadas por dia e por semana e mantidas a cada
+    insercao, edicao e remocao de registros.
+
+    Retorna uma representacao da listagem de contagens.
+    """
+    logger.debug("Buscando estatísticas por %s entre %s e %s",
+                 query.periodo, query.data_inicio, query.data_fim)
+    # criando conexao com o bd
+    session = Session()
+    # fazendo a busca
+    consulta = session.query(EstatisticaRefeicao).filter(
+        EstatisticaRefeicao.periodo == query.periodo,
+        EstatisticaRefeicao.inicio_periodo.between(query.data_inicio, query.data_fim))
+    if query.tipo is not None:
+        consulta = consulta.filter(EstatisticaRefeicao.tipo == query.tipo)
+    if query.metodo is not None:
+        consulta = consulta.filter(EstatisticaRefeicao.metodo == query.metodo)
+
+    estatisticas = consulta.order_by(EstatisticaRefeicao.inicio_periodo).all()
+
+    return retorna_lista_estatisticas(query.periodo, estatisticas), 200
+
+
+@app.cli.command("reconstruir-estatisticas")
+def reconstruir_estatisticas():
+    """Recalcula as estatisticas de refeicoes a partir dos registros salvos
+    """
+    session = SessionFactory()
+    try:
+        reconstroi_estatisticas(session)
+        session.commit()
+    finally:
+        session.close()
+
+
+@app.cli.command("preaquecer-receitas")
+@click.option("--continuo", is_flag=True,
+              help="Executa periodicamente, apenas no horario fora de pico.")
+def preaquecer_receitas(continuo):
+    """Preaquece as buscas de receitas mais frequentes, a partir das buscas
+    recentes e dos alimentos registrados nos diarios
+    """
+    if continuo:
+        preaquece_continuamente()
+    else:
+        executa_preaquecimento()
+
+
 @app.get('/buscar_receita', tags=[receita_tag],
- responses={"200": ReceitaViewSchema,  "400": ErrorSchema})
-def buscar_receita(query: ReceitaBuscaSchema):
+ responses={"200": ReceitaViewSchema,  "400": ErrorSchema, "503": ErrorSchema})
+async def buscar_receita(query: ReceitaBuscaSchema):
     """Busca uma receita utilizando a API Spoonacular a partir dos parametros
     fornecidos pelo usuário
 
+    Buscas frequentes são respondidas a partir do cache de receitas e as
+    traduções independentes são feitas de forma concorrente.
 
     Retorna uma representação de receita
 
     """
     try:
-
         ingredientes = query.ingredients
         excluir_ingredientes = query.excludeIngredients
-        max_results = 1
         tipo_prato = query.dishType
 
-        #realiza a tradução dos parametros que serão enviados para a API
-        ingredientes_traduzidos,ing_status_code = realizar_traducao(ingredientes, "pt-BR", "en")
-        excluir_ingredientes_traduzidos,exc_ing_status_code  = realizar_traducao(excluir_ingredientes, "pt-BR", "en")
+        logger.debug("Buscando receita")
+        return await buscar_receita_em_cache_assincrona(ingredientes, excluir_ingredientes, tipo_prato)
 
-        if ing_status_code == 400 or exc_ing_status_code == 400 :
-            error_msg = "Não foi possível traduzir os ingredientes"
-            logger.warning(
-            "Erro ao buscar receitas", error_msg)
-            return {"message": error_msg}, 404
-        
-        
-        #prepara a url da request
-        url = "https://api.spoonacular.com/recipes/complexSearch"
-
-        params = {
-            "apiKey": SPOONACULAR_API_KEY,
-            "includeIngredients": ingredientes_traduzidos,
-            "excludeIngredients": excluir_ingredientes_traduzidos,
-            "number": max_results,
-            "addRecipeInformation": True,  
-            "fillIngredients": True,
-            "addRecipeInstructions": True,
-            "type":tipo_prato
-        }
-        
-        
-        logger.debug("Requisitando receitas")
-        resposta = requests.get(url, params=params)
-
-        if resposta.status_code == 200:
-
-            dados = resposta.json()
-            receitas = dados.get("results")
-
-            #estrutura o retorno da request 
-            lista_receita = retorna_lista_receitas(receitas)
-
-            if not lista_receita:
-                error_msg = "Não foi possível realizar a requisição :/"
-                logger.warning(
+    except Exception as e:
+        # tratando erros nao previstos
+        error_msg = "Não foi possível realizar a requisição :/"
+        logger.warning(
                     "Erro ao realizar a requisição",{e})
-                return {"message": error_msg}, 400
-
-            receita = lista_receita[0]
-
-            titulo = receita.get("titulo")
-            instrucoes = receita.get("instrucoes")
-            ingredientes = receita.get("ingredientes")
-
-            texto_ingredientes = ""
-
-            for ingrediente in ingredientes:
-                texto_ingredientes =  texto_ingredientes + str(ingrediente.get("quantidade"))+" "+ ingrediente.get("unidade") + ingrediente.get("nome") + "<<|>>"
+        return {"message": error_msg}, 400
 
 
-            texto_a_traduzir = titulo + "<§§§>"+instrucoes+ "<§§§>"+texto_ingredientes
+@app.get('/buscar_receitas', tags=[receita_tag],
+ responses={"200": ReceitaListaViewSchema,  "400": ErrorSchema, "503": ErrorSchema})
+async def buscar_receitas(query: ReceitaPaginaBuscaSchema):
+    """Busca varias receitas utilizando a API Spoonacular a partir dos
+    parametros fornecidos pelo usuário, retornando uma pagina dos resultados
 
-            #traduz a receita retornada
-            texto_traduzido, status_code = realizar_traducao(texto_a_traduzir, "en", "pt-BR")
+    As receitas encontradas são mantidas no cache sem tradução e apenas as
+    receitas da página solicitada são traduzidas.
 
-            if(status_code == 200):
-                #estrutura a receita para enviar para o frontend
-                texto_traduzido = organiza_estrutura_receita(texto_traduzido)
+    Retorna uma lista de representações de receitas
 
-            #retorna a receita
-            return texto_traduzido, status_code
+    """
+    try:
+        logger.debug("Buscando receitas, offset %s", query.offset)
+        return await buscar_receitas_em_cache_assincrona(
+            query.ingredients, query.excludeIngredients, query.dishType, query.offset, query.limit)
 
-        else:
-            error_msg = "Não foi possível realizar a requisição :/"
-            logger.warning(
-                "Erro ao realizar a requisição",{e})
-            return {"message": error_msg}, 400
     except Exception as e:
         # tratando erros nao previstos
         error_msg = "Não foi possível realizar a requisição :/"
         logger.warning(
-                    "Erro ao realizar a requisição",{e})
+                    "Erro ao realizar a requisição %s", {e})
         return {"message": error_msg}, 400
 
 
+@app.get('/buscar_receita_armazenada', tags=[receita_tag],
+         responses={"200": ReceitaViewSchema, "404": ErrorSchema})
+def get_receita_armazenada(query: ReceitaIdBuscaSchema):
+    """Faz a busca de uma receita ja traduzida e armazenada, a partir do
+    identificador da receita na API Spoonacular, sem acessar as APIs externas
+
+    Retorna uma representação de receita
+    """
+    receita_id = query.id
+    logger.debug("Buscando receita armazenada %s", receita_id)
+    # criando conexao com o bd
+    session = Session()
+    # fazendo a busca
+    receita = session.get(Receita, receita_id, options=[selectinload(Receita.ingredientes)])
+
+    if not receita:
+        # se a receita nao foi encontrada
+        error_msg = "Receita não encontrada na base :/"
+        logger.warning(
+            "Erro ao buscar receita armazenada %s, %s", receita_id, error_msg)
+        return {"message": error_msg}, 404
+
+    return retorna_receita(receita), 200
+
+
 @app.get('/traduzir_texto', tags=[traducao_tag],
  responses={"200": TraducaoViewSchema,  "400": ErrorSchema})
 def traduzir_texto(query: TraducaoRequisicaoSchema):
@@ -382,49 +717,11 @@ def traduzir_texto(query: TraducaoRequisicaoSchema):
         return {"message": error_msg}, 400
 
 
-def realizar_traducao(texto:str,idioma_origem:str, idioma_destino:str): 
-    """Prepara  a request de tradução de textos através da API Google Translate
+@app.get('/estatisticas_traducao', tags=[traducao_tag],
+ responses={"200": CacheTraducaoViewSchema})
+def estatisticas_traducao():
+    """Retorna os contadores de acertos e falhas do cache de traduções
 
-    Retorna o texto traduzido e o status code da request.
+    Permite acompanhar quantas requisições à API Google Translate foram evitadas.
     """
-    try:          
-        if not texto:
-            error_msg = "Texto a ser traduzido não enviado"
-            logger.warning(
-            "Erro ao traduzir texto", error_msg)
-            return {"message": error_msg}, 404
-        
-        #prepara a url da request
-        url = "https://translation.googleapis.com/language/translate/v2?key="+GOOGLE_TRANSLATE_API_KEY
-
-        params = {
-            "q": texto,
-            "source": idioma_origem,
-            "target": idioma_destino,
-            "format": "text"
-        }
-
-        
-        logger.debug("Requisitando tradução")
-
-        resposta = requests.post(url, data=params)
-
-        status_code = resposta.status_code
-
-        if(status_code == 200):
-            dados = resposta.json()
-
-            resultado = dados.get("data")
-            traduzido = resultado.get("translations")[0].get("translatedText")
-
-            return traduzido,200
-        else :
-            return "", 400
-
-        
-    except Exception as e:
-        # tratando erros nao previstos
-        error_msg = "Não foi possível realizar a requisição :/"
-        logger.warning(
-                    "Erro ao realizar a requisição",{e})
-        return {"message": error_msg}, 400
\ No newline at end of file
+    return cache_traducao.estatisticas(), 200
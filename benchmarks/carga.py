@@ -0,0 +1,96 @@
+"""Teste de carga do servidor de producao com diferentes quantidades de workers
+
+Para cada quantidade de workers, inicia o gunicorn com o gunicorn.conf.py,
+dispara requisicoes concorrentes de leitura durante alguns segundos e mostra
+a vazao e as latencias observadas. Usa o bd da aplicacao apenas para leitura.
+
+Uso, na raiz do repositorio:
+
+    python -m benchmarks.carga [workers ...]
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+ENDERECO = "127.0.0.1:5099"
+CLIENTES = 32
+DURACAO = 10
+ROTAS = ("/listar_diarios?limit=50", "/estatisticas_refeicoes?periodo=semana&data_inicio=2020-01-01&data_fim=2030-12-31")
+
+
+def aguarda_servidor(url: str, limite: float = 30):
+    """ Aguarda o servidor responder ou o limite de tempo, em segundos
+    """
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("Servidor nao respondeu em %s segundos" % limite)
+
+
+def cliente(url_base: str, fim: float, latencias: list, lock: threading.Lock):
+    """ Realiza requisicoes sequenciais, com conexao keep-alive, ate o fim
+    """
+    sessao = requests.Session()
+    medidas = []
+    indice = 0
+    while time.monotonic() < fim:
+        inicio = time.perf_counter()
+        resposta = sessao.get(url_base + ROTAS[indice % len(ROTAS)])
+        medidas.append(time.perf_counter() - inicio)
+        resposta.raise_for_status()
+        indice += 1
+
+    with lock:
+        latencias.extend(medidas)
+
+
+def mede(workers: int):
+    """ Executa a carga contra um servidor com a quantidade de workers
+    """
+    ambiente = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_BIND=ENDERECO)
+    ambiente.setdefault("SPOONACULAR_API_KEY", "benchmark")
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        url_base = "http://" + ENDERECO
+        aguarda_servidor(url_base + ROTAS[0])
+
+        latencias = []
+        lock = threading.Lock()
+        fim = time.monotonic() + DURACAO
+        with ThreadPoolExecutor(CLIENTES) as executor:
+            tarefas = [executor.submit(cliente, url_base, fim, latencias, lock) for _ in range(CLIENTES)]
+            for tarefa in tarefas:
+                tarefa.result()
+
+        latencias.sort()
+        p50 = latencias[len(latencias) // 2] * 1000
+        p99 = latencias[int(len(latencias) * 0.99)] * 1000
+        print("%2d workers: %8.1f req/s   p50 %6.1f ms   p99 %6.1f ms" % (
+            workers, len(latencias) / DURACAO, p50, p99))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    quantidades = [int(valor) for valor in sys.argv[1:]] or [1, 2, 4]
+    print("%d clientes concorrentes, %d segundos por medida" % (CLIENTES, DURACAO))
+    for workers in quantidades:
+        mede(workers)
+
+
+if __name__ == "__main__":
+    main()
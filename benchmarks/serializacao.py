@@ -0,0 +1,74 @@
+"""Micro-benchmark da serializacao da listagem de registros do diario
+
+Compara o caminho original (objetos do ORM + json da biblioteca padrao) com o
+caminho por tuplas (linhas da consulta + ProvedorJsonRapido).
+
+Uso, na raiz do repositorio:
+
+    python -m benchmarks.serializacao [quantidade_de_registros]
+"""
+import sys
+import timeit
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, selectinload
+
+from json_provider import ProvedorJsonRapido, orjson
+from model import Base, Diario, Refeicao
+from model.categorias import TipoRefeicao, MetodoRefeicao, AvaliacaoRefeicao, AceitacaoRefeicao
+from schemas.diario import retorna_lista_diarios, retorna_lista_diarios_linhas
+
+
+def popula(session, quantidade: int):
+    """ Cria registros com quatro refeicoes cada
+    """
+    inicio = date(2020, 1, 1)
+    for i in range(quantidade):
+        diario = Diario(inicio + timedelta(days=i))
+        for tipo in (TipoRefeicao.CAFE_MANHA, TipoRefeicao.ALMOCO, TipoRefeicao.LANCHE_TARDE, TipoRefeicao.JANTAR):
+            diario.adiciona_refeicao(Refeicao(tipo.name, MetodoRefeicao.BLW.name, AvaliacaoRefeicao.SUCESSO.name,
+                                              AceitacaoRefeicao.OTIMO.name, "comeu bem " * 5))
+        session.add(diario)
+    session.commit()
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    # bd em memoria, para nao alterar o bd da aplicacao
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    popula(Session(), quantidade)
+
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    rapido = ProvedorJsonRapido(app)
+
+    def caminho_orm():
+        session = Session()
+        diarios = session.query(Diario).options(selectinload(Diario.refeicoes)) \
+            .order_by(Diario.data_registro).all()
+        padrao.dumps(retorna_lista_diarios(diarios))
+        session.close()
+
+    def caminho_tuplas():
+        session = Session()
+        linhas = session.execute(select(
+            Diario.data_registro, Refeicao.tipo, Refeicao.metodo,
+            Refeicao.avaliacao, Refeicao.aceitacao, Refeicao.comentarios
+        ).outerjoin(Diario.refeicoes).order_by(Diario.data_registro, Refeicao.id))
+        rapido.dumps(retorna_lista_diarios_linhas(linhas))
+        session.close()
+
+    print("registros: %d, orjson disponivel: %s" % (quantidade, orjson is not None))
+    for nome, funcao in (("orm + json padrao", caminho_orm), ("tuplas + provedor rapido", caminho_tuplas)):
+        tempo = min(timeit.repeat(funcao, number=5, repeat=3)) / 5
+        print("%-26s %8.2f ms" % (nome, tempo * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Configuracao do gunicorn, servidor WSGI usado em producao
+
+Uso, na raiz do repositorio:
+
+    gunicorn -c gunicorn.conf.py
+
+Um sinal HUP enviado ao processo principal recarrega a configuracao e
+substitui os workers de forma gradual, sem derrubar requisicoes em andamento.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+
+# carrega o .env antes de ler as variaveis abaixo e de importar o model em
+# on_starting, que le as configuracoes do SQLite ao ser importado
+load_dotenv()
+
+wsgi_app = "app:app"
+
+bind = os.getenv('GUNICORN_BIND') or "0.0.0.0:5000"
+
+# processos e threads por processo; as threads atendem as requisicoes que
+# aguardam as APIs externas
+workers = int(os.getenv('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.getenv('GUNICORN_THREADS') or 4)
+worker_class = "gthread"
+
+# conexoes keep-alive com os clientes
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE') or 5)
+
+# tempo maximo de uma requisicao e tempo para encerrar um worker na recarga
+timeout = int(os.getenv('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+
+# reinicia os workers periodicamente, evitando o acumulo de memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER') or 100)
+
+# a aplicacao e importada em cada worker, apos o fork
+preload_app = False
+
+accesslog = "-"
+
+
+def on_starting(server):
+    """Cria as tabelas e aplica as migracoes do bd uma unica vez, no processo
+    principal, antes da criacao dos workers
+    """
+    from model import engine
+    # nenhuma conexao aberta aqui deve ser herdada pelos workers
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    """Descarta as conexoes herdadas do processo principal, para que cada
+    worker abra as suas proprias conexoes com o SQLite
+    """
+    from model import engine
+    engine.dispose(close=False)
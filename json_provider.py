@@ -0,0 +1,50 @@
+from flask.json.provider import DefaultJSONProvider
+
+from logger import logger
+
+try:
+    import orjson
+except ImportError:
+    # sem o orjson a serializacao padrao do Flask (json da biblioteca padrao) e usada
+    orjson = None
+
+
+class ProvedorJsonRapido(DefaultJSONProvider):
+    """
+    Provedor JSON que usa o orjson, quando instalado, para serializar as
+    respostas da API
+
+    Datas continuam sendo serializadas pela funcao padrao do Flask, de modo
+    que o formato das respostas nao muda. Argumentos nao suportados pelo
+    orjson fazem com que a serializacao padrao seja usada.
+    """
+
+    # argumentos de json.dumps que possuem equivalente no orjson
+    ARGUMENTOS_SUPORTADOS = {"indent", "separators", "sort_keys", "default", "ensure_ascii"}
+
+    def dumps(self, obj, **kwargs):
+        """ Serializa o objeto para uma string JSON
+        """
+        if orjson is None or not set(kwargs) <= self.ARGUMENTOS_SUPORTADOS:
+            return super().dumps(obj, **kwargs)
+
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            opcoes |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            opcoes |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=kwargs.get("default", self.default),
+                                option=opcoes).decode("utf-8")
+        except TypeError as e:
+            # por exemplo, inteiros maiores que 64 bits
+            logger.debug("Serializacao com orjson falhou, usando padrao %s", {e})
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """ Desserializa uma string ou bytes JSON
+        """
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
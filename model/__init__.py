@@ -1,12 +1,20 @@
 from sqlalchemy_utils import database_exists, create_database
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
 import os
 
 # importando os elementos definidos no modelo
 from model.base import Base
 from model.refeicao import Refeicao
 from model.diario import Diario
+from model.traducao import Traducao, TraducaoTermo
+from model.estatistica import EstatisticaRefeicao
+from model.versao import VersaoGlobal
+from model.servico_externo import LimiteServico, DisjuntorServico
+from model.ingrediente_receita import IngredienteReceita
+from model.receita import Receita
+from model.busca_receita import BuscaReceita
+from model.migracoes import executa_migracoes
 
 
 db_path = "database/"
@@ -15,18 +23,59 @@ if not os.path.exists(db_path):
    os.makedirs(db_path)
 
 
+# configuracoes do SQLite e do pool de conexoes, ajustaveis por variaveis de ambiente
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE') or 'WAL'
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT') or 5000)
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS') or 'NORMAL'
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE') or 64 * 1024 * 1024)
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE') or -16000)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE') or 5)
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW') or 10)
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT') or 30)
+
+
 # string de acesso ao bd
 db_url = 'sqlite:///%s/database.sqlite3' % db_path
 
 # criacao de um engine de conexao com o bd
-engine = create_engine(db_url)
+engine = create_engine(db_url,
+                       pool_size=DB_POOL_SIZE,
+                       max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT)
+
+
+@event.listens_for(engine, "connect")
+def configura_conexao(dbapi_connection, connection_record):
+    """ Aplica as configuracoes do SQLite a cada nova conexao
 
-# criacao de uma sessao do bd
-Session = sessionmaker(engine)
+        As chaves estrangeiras passam a ser verificadas, no modo WAL leitores
+        nao sao bloqueados por escritores e o busy_timeout faz com que
+        escritores concorrentes aguardem em vez de falhar com "database is
+        locked".
+    """
+    cursor = dbapi_connection.cursor()
+    # habilita as restricoes de chave estrangeira, incluindo ON DELETE CASCADE
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=%s" % SQLITE_JOURNAL_MODE)
+    cursor.execute("PRAGMA busy_timeout=%d" % SQLITE_BUSY_TIMEOUT)
+    cursor.execute("PRAGMA synchronous=%s" % SQLITE_SYNCHRONOUS)
+    cursor.execute("PRAGMA mmap_size=%d" % SQLITE_MMAP_SIZE)
+    cursor.execute("PRAGMA cache_size=%d" % SQLITE_CACHE_SIZE)
+    cursor.close()
+
+
+# fabrica de sessoes independentes, para uso fora do ciclo de uma requisicao
+SessionFactory = sessionmaker(engine)
+
+# sessao do bd associada a requisicao (thread) corrente, removida ao final dela
+Session = scoped_session(SessionFactory)
 
 # cria o bd, caso não exista
 if not database_exists(engine.url):
     create_database(engine.url) 
 
 # cria as tabelas do bd, caso não existam
-Base.metadata.create_all(engine)
\ No newline at end of file
+Base.metadata.create_all(engine)
+
+# atualiza as tabelas ja existentes para a definicao atual do modelo
+executa_migracoes(engine)
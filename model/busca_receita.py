@@ -0,0 +1,59 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+
+from model import Base
+
+
+class BuscaReceita(Base):
+    """
+    Classe que representa uma busca de receitas, com a frequencia com que e
+    feita pelos usuarios e os ultimos resultados obtidos da API Spoonacular
+
+    ...
+
+    Atributos
+    ---------
+    chave : str
+        chave normalizada da busca: ingredientes, ingredientes excluidos e
+        tipo de prato
+
+    ingredientes : str
+        ingredientes normalizados da busca, separados por virgula
+
+    excluir_ingredientes : str
+        ingredientes excluidos normalizados, separados por virgula
+
+    tipo_prato : str
+        tipo de prato normalizado
+
+    quantidade : int
+        quantidade de vezes que a busca foi feita pelos usuarios
+
+    ultima_busca : datetime
+        momento da ultima vez que a busca foi feita pelos usuarios
+
+    resultados : str
+        receitas encontradas, sem traducao, em JSON
+
+    total_resultados : int
+        quantidade total de receitas da busca informada pela API Spoonacular,
+        da qual os resultados armazenados sao um lote
+
+    data_resultados : datetime
+        momento em que os resultados foram obtidos
+
+    """
+    __tablename__ = 'busca_receita'
+    __table_args__ = (
+        # busca das chaves mais frequentes entre as buscadas recentemente
+        Index("ix_busca_receita_ultima_busca", "ultima_busca"),
+    )
+
+    chave = Column(String(1000), primary_key=True)
+    ingredientes = Column(String(1000))
+    excluir_ingredientes = Column(String(1000))
+    tipo_prato = Column(String(100))
+    quantidade = Column(Integer, nullable=False, default=0)
+    ultima_busca = Column(DateTime)
+    resultados = Column(Text)
+    total_resultados = Column(Integer)
+    data_resultados = Column(DateTime)
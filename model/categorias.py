@@ -0,0 +1,78 @@
+from enum import IntEnum
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+
+class TipoRefeicao(IntEnum):
+    """ Tipos de refeicao e seus codigos no bd
+    """
+    CAFE_MANHA = 1
+    LANCHE_MANHA = 2
+    ALMOCO = 3
+    LANCHE_TARDE = 4
+    JANTAR = 5
+    CEIA = 6
+
+
+class MetodoRefeicao(IntEnum):
+    """ Metodos de oferta dos alimentos e seus codigos no bd
+    """
+    TRADICIONAL = 1
+    BLW = 2
+    PARTICIPATIVO = 3
+
+
+class AvaliacaoRefeicao(IntEnum):
+    """ Avaliacoes da refeicao e seus codigos no bd
+    """
+    SUCESSO = 1
+    NEUTRO = 2
+    CAOS = 3
+
+
+class AceitacaoRefeicao(IntEnum):
+    """ Niveis de aceitacao da refeicao e seus codigos no bd
+    """
+    OTIMO = 1
+    BOM = 2
+    REGULAR = 3
+    RUIM = 4
+    RECUSOU = 5
+
+
+class Categoria(TypeDecorator):
+    """
+    Coluna que armazena uma categoria como um inteiro pequeno no bd e a
+    expoe como o nome da categoria (str) na aplicacao
+
+    Apenas nomes da enumeracao podem ser gravados. Registros antigos com
+    nomes fora da enumeracao, mantidos como texto pela migracao, sao lidos
+    como estao.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum: type, *args, **kwargs):
+        """
+        Cria uma nova coluna de categoria
+
+        Argumentos:
+            enum : IntEnum com os nomes e codigos das categorias
+
+        """
+        super().__init__(*args, **kwargs)
+        self.enum = enum
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self.enum[value].value
+        except KeyError:
+            raise ValueError("Valor inválido para %s: %s" % (self.enum.__name__, value))
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, int) and value in self.enum._value2member_map_:
+            return self.enum(value).name
+        return value if value is None else str(value)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Date
+from typing import List
+
+from sqlalchemy import Column, Date, Integer
 from sqlalchemy.orm import relationship
 
 from  model import Base, Refeicao
@@ -14,16 +16,27 @@ class Diario(Base):
         codigo unico identificador do registro
         campo obrigatorio
     
+    versao : int
+        valor do contador global de alteracoes na ultima insercao ou edicao
+        do registro, que nunca se repete, mesmo que a data seja removida e
+        inserida novamente
+        usada para identificar se o registro mudou (ETag)
+
     refeicoes : list[Refeicao]
-        lista das refeicoes ofertadas
+        lista das refeicoes ofertadas, na ordem em que foram inseridas
         relacao implicita, sera construida pelo SQLAlchemy
+        refeicoes removidas da lista sao removidas do bd
+        a remocao do registro remove as refeicoes via ON DELETE CASCADE
 
     """
     __tablename__ = 'diario'
 
     data_registro = Column(Date, primary_key = True, unique = True)
 
-    refeicoes = relationship("Refeicao")
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+
+    refeicoes = relationship("Refeicao", cascade="all, delete-orphan", passive_deletes=True,
+                             order_by=Refeicao.id)
 
     def __init__(self,data_registro):
         """
@@ -35,6 +48,7 @@ class Diario(Base):
 
         """
         self.data_registro = data_registro
+        self.versao = 1
 
     
     def adiciona_refeicao(self,refeicao:Refeicao):
@@ -47,5 +61,37 @@ class Diario(Base):
         """
         self.refeicoes.append(refeicao)
 
+    def atualiza_refeicoes(self, refeicoes: List[Refeicao]):
+        """
+        Substitui as refeicoes do registro alterando apenas o necessario
+
+        As refeicoes sao comparadas por posicao, preservando a ordem enviada:
+        a refeicao salva identica a nova na mesma posicao e mantida sem
+        alteracao, as diferentes sao reaproveitadas com os novos valores e as
+        excedentes sao removidas ou adicionadas ao final.
+
+        Argumentos:
+            refeicoes: novas refeicoes oferecidas
+
+        Retorna se alguma refeicao foi alterada.
+        """
+        existentes = list(self.refeicoes)
+        alterada = len(existentes) != len(refeicoes)
+
+        # reaproveita as refeicoes alteradas, gerando apenas UPDATEs
+        for existente, nova in zip(existentes, refeicoes):
+            if existente.valores() != nova.valores():
+                existente.tipo = nova.tipo
+                existente.metodo = nova.metodo
+                existente.avaliacao = nova.avaliacao
+                existente.aceitacao = nova.aceitacao
+                existente.comentarios = nova.comentarios
+                alterada = True
+
+        for existente in existentes[len(refeicoes):]:
+            self.refeicoes.remove(existente)
+
+        for nova in refeicoes[len(existentes):]:
+            self.adiciona_refeicao(nova)
 
-        
\ No newline at end of file
+        return alterada
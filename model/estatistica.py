@@ -0,0 +1,149 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable
+
+from sqlalchemy import Column, String, Integer, Date, select, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from model import Base, Refeicao
+
+
+PERIODOS = ("dia", "semana")
+
+
+class EstatisticaRefeicao(Base):
+    """
+    Classe que representa a contagem pre-agregada de refeicoes em um periodo
+
+    ...
+
+    Atributos
+    ---------
+    periodo : str
+        granularidade da contagem: dia ou semana
+
+    inicio_periodo : date
+        data do dia ou da segunda-feira da semana contabilizada
+
+    tipo, metodo, avaliacao, aceitacao : str
+        dimensoes da refeicao contabilizada
+
+    quantidade : int
+        quantidade de refeicoes com essas dimensoes no periodo
+
+    """
+    __tablename__ = 'estatistica_refeicao'
+
+    periodo = Column(String(6), primary_key=True)
+    inicio_periodo = Column(Date, primary_key=True)
+    tipo = Column(String(30), primary_key=True)
+    metodo = Column(String(30), primary_key=True)
+    avaliacao = Column(String(30), primary_key=True)
+    aceitacao = Column(String(30), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+
+def inicio_periodo(data_registro: date, periodo: str):
+    """ Retorna o inicio do periodo que contem a data: o proprio dia ou a
+        segunda-feira da semana
+    """
+    if periodo == "semana":
+        return data_registro - timedelta(days=data_registro.weekday())
+    return data_registro
+
+
+def dimensoes(tipo, metodo, avaliacao, aceitacao):
+    """ Retorna as dimensoes de uma refeicao, substituindo valores nulos
+    """
+    return tuple(valor if valor is not None else "" for valor in (tipo, metodo, avaliacao, aceitacao))
+
+
+def contagens_refeicoes(data_registro: date, refeicoes: Iterable):
+    """ Conta as refeicoes de um registro por data e dimensoes
+
+        Retorna um Counter com chaves (data, tipo, metodo, avaliacao, aceitacao).
+    """
+    return Counter(
+        (data_registro,) + dimensoes(r.tipo, r.metodo, r.avaliacao, r.aceitacao)
+        for r in refeicoes)
+
+
+def contagens_bd(session, *filtros):
+    """ Conta as refeicoes salvas no bd que atendem aos filtros, por data e
+        dimensoes, com uma unica consulta agregada
+
+        Retorna um Counter com chaves (data, tipo, metodo, avaliacao, aceitacao).
+    """
+    consulta = select(
+        Refeicao.diario, Refeicao.tipo, Refeicao.metodo,
+        Refeicao.avaliacao, Refeicao.aceitacao, func.count()
+    ).where(*filtros).group_by(
+        Refeicao.diario, Refeicao.tipo, Refeicao.metodo,
+        Refeicao.avaliacao, Refeicao.aceitacao)
+
+    contagens = Counter()
+    for data_registro, tipo, metodo, avaliacao, aceitacao, quantidade in session.execute(consulta):
+        contagens[(data_registro,) + dimensoes(tipo, metodo, avaliacao, aceitacao)] += quantidade
+
+    return contagens
+
+
+def _agrega_periodos(contagens: Counter):
+    """ Agrega contagens diarias em contagens por dia e por semana
+    """
+    agregado = Counter()
+    for (data_registro, *chave), quantidade in contagens.items():
+        for periodo in PERIODOS:
+            agregado[(periodo, inicio_periodo(data_registro, periodo), *chave)] += quantidade
+
+    return agregado
+
+
+def atualiza_estatisticas(session, variacoes: Counter):
+    """ Aplica variacoes de contagem as estatisticas, na transacao da sessao
+
+        Argumentos:
+            session : sessao com a transacao que altera as refeicoes
+            variacoes : Counter com chaves (data, tipo, metodo, avaliacao,
+                aceitacao) e valores positivos ou negativos
+
+    """
+    agregado = {chave: valor for chave, valor in _agrega_periodos(variacoes).items() if valor}
+    if not agregado:
+        return
+
+    tabela = EstatisticaRefeicao.__table__
+    comando = sqlite_insert(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=[coluna.name for coluna in tabela.primary_key],
+        set_={"quantidade": tabela.c.quantidade + comando.excluded.quantidade})
+
+    session.execute(comando, [
+        {
+            "periodo": periodo, "inicio_periodo": inicio, "tipo": tipo, "metodo": metodo,
+            "avaliacao": avaliacao, "aceitacao": aceitacao, "quantidade": quantidade
+        }
+        for (periodo, inicio, tipo, metodo, avaliacao, aceitacao), quantidade in agregado.items()
+    ])
+
+    # remove as contagens zeradas para manter a tabela enxuta
+    if any(valor < 0 for valor in agregado.values()):
+        session.execute(delete(EstatisticaRefeicao).where(EstatisticaRefeicao.quantidade <= 0))
+
+
+def remove_estatisticas(session, *filtros):
+    """ Desconta das estatisticas as refeicoes que atendem aos filtros
+
+        Deve ser chamada na transacao que remove as refeicoes, antes da
+        remocao.
+    """
+    removidas = contagens_bd(session, *filtros)
+    atualiza_estatisticas(session, Counter({chave: -quantidade for chave, quantidade in removidas.items()}))
+
+
+def reconstroi_estatisticas(session):
+    """ Recalcula todas as estatisticas a partir das refeicoes salvas, na
+        transacao da sessao
+    """
+    session.execute(delete(EstatisticaRefeicao))
+    atualiza_estatisticas(session, contagens_bd(session))
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+from model import Base
+
+
+class IngredienteReceita(Base):
+
+    """
+    Classe que representa um ingrediente traduzido de uma receita armazenada
+
+    ...
+
+    Atributos
+    ---------
+    id : int
+        codigo unico identificador do ingrediente
+
+    posicao : int
+        posicao do ingrediente na lista de ingredientes da receita
+
+    texto : str
+        quantidade, unidade e nome do ingrediente, traduzidos
+
+    receita : int
+        identificador da receita na API Spoonacular
+        chave estrangeira que relaciona o ingrediente com a receita
+        o ingrediente e removido junto com a receita
+
+    """
+    __tablename__ = 'ingrediente_receita'
+
+    id = Column(Integer, primary_key=True)
+    posicao = Column(Integer, nullable=False)
+    texto = Column(String(500))
+
+    receita = Column(Integer, ForeignKey("receita.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    def __init__(self, posicao: int, texto: str):
+        """
+        Cria um novo ingrediente de receita
+
+        Argumentos:
+            posicao : posicao do ingrediente na receita
+            texto : ingrediente traduzido
+
+        """
+        self.posicao = posicao
+        self.texto = texto
@@ -0,0 +1,335 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+from logger import logger
+from model.base import Base
+from model.refeicao import Refeicao
+from model.categorias import TipoRefeicao, MetodoRefeicao, AvaliacaoRefeicao, AceitacaoRefeicao
+
+
+# enum de cada coluna de categoria da tabela refeicao
+CATEGORIAS_REFEICAO = {
+    "tipo": TipoRefeicao,
+    "metodo": MetodoRefeicao,
+    "avaliacao": AvaliacaoRefeicao,
+    "aceitacao": AceitacaoRefeicao,
+}
+
+
+def _ddl(elemento):
+    """ Retorna o comando DDL de uma tabela ou indice para o SQLite
+    """
+    return str(elemento.compile(dialect=sqlite.dialect()))
+
+
+def _sql_codigo(coluna: str, enum: type):
+    """ Retorna uma expressao SQL que converte o nome da categoria no codigo,
+        mantendo os nomes desconhecidos
+    """
+    casos = " ".join("WHEN '%s' THEN %d" % (item.name, item.value) for item in enum)
+    return "CASE %s %s ELSE %s END" % (coluna, casos, coluna)
+
+
+def _sql_nome(coluna: str, enum: type):
+    """ Retorna uma expressao SQL que converte o codigo da categoria no nome,
+        mantendo os nomes armazenados como texto
+    """
+    casos = " ".join("WHEN %d THEN '%s'" % (item.value, item.name) for item in enum)
+    return "CASE %s %s ELSE %s END" % (coluna, casos, coluna)
+
+
+def _categorias_desconhecidas(cursor):
+    """ Retorna, por coluna, os ids das refeicoes com nomes de categoria
+        armazenados como texto por nao pertencerem a enumeracao, por nome
+    """
+    desconhecidas = {}
+    for coluna, enum in CATEGORIAS_REFEICAO.items():
+        linhas = cursor.execute(
+            "SELECT %s, id FROM refeicao WHERE typeof(%s) = 'text' ORDER BY id" % (coluna, coluna)).fetchall()
+        for valor, id_refeicao in linhas:
+            if valor not in enum.__members__:
+                desconhecidas.setdefault(coluna, {}).setdefault(valor, []).append(id_refeicao)
+
+    return desconhecidas
+
+
+def _indices(tabela: Table):
+    """ Retorna os indices da tabela ordenados pelo nome
+
+        Os indices do modelo formam um conjunto sem ordem definida e, sem
+        estatisticas, o SQLite desempata entre indices equivalentes pela
+        ordem de criacao; a ordem fixa faz todos os bds terem os mesmos planos.
+    """
+    return sorted(tabela.indexes, key=lambda indice: indice.name)
+
+
+def recria_tabela(cursor, tabela: Table, colunas_origem: dict = None):
+    """ Recria uma tabela a partir da sua definicao no modelo, copiando os
+        dados da tabela atual
+
+        O SQLite nao permite alterar restricoes de uma tabela existente, entao
+        a tabela e renomeada, recriada com seus indices e os dados copiados,
+        com as chaves estrangeiras desativadas (executa_migracoes). Registros
+        sem o registro relacionado, possiveis em bds anteriores a ativacao
+        das chaves estrangeiras, sao removidos e informados no log.
+
+        Argumentos:
+            cursor : cursor com uma transacao aberta
+            tabela : definicao da tabela no modelo
+            colunas_origem : expressoes SQL, por coluna de destino, usadas
+                para obter os valores a partir da tabela atual
+
+    """
+    nome = tabela.name
+    nome_antigo = nome + "_antiga"
+    colunas_origem = colunas_origem or {}
+
+    cursor.execute("ALTER TABLE %s RENAME TO %s" % (nome, nome_antigo))
+
+    # os indices acompanham a tabela renomeada e precisam liberar seus nomes
+    indices = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (nome_antigo,)).fetchall()
+    for (indice,) in indices:
+        cursor.execute("DROP INDEX %s" % indice)
+
+    cursor.execute(_ddl(CreateTable(tabela)))
+    for indice in _indices(tabela):
+        cursor.execute(_ddl(CreateIndex(indice)))
+
+    colunas = [coluna.name for coluna in tabela.columns]
+    cursor.execute("INSERT INTO %s (%s) SELECT %s FROM %s" % (
+        nome, ", ".join(colunas),
+        ", ".join(colunas_origem.get(coluna, coluna) for coluna in colunas),
+        nome_antigo))
+    cursor.execute("DROP TABLE %s" % nome_antigo)
+
+    orfaos = [linha[1] for linha in cursor.execute("PRAGMA foreign_key_check(%s)" % nome).fetchall()]
+    if orfaos:
+        cursor.executemany("DELETE FROM %s WHERE rowid = ?" % nome, [(rowid,) for rowid in orfaos])
+        logger.warning("Registros de %s sem registro relacionado removidos, rowids %s", nome, orfaos)
+
+
+def refeicao_categorias_inteiras(cursor):
+    """ Converte as colunas de categoria da tabela refeicao (tipo, metodo,
+        avaliacao e aceitacao) de texto para codigos inteiros
+
+        Valores que nao correspondem a nenhuma categoria sao mantidos como
+        texto e informados no log, sem impedir a migracao.
+    """
+    tipos = {coluna[1]: coluna[2].upper() for coluna in cursor.execute("PRAGMA table_info(refeicao)").fetchall()}
+    if all(tipos.get(coluna) == "SMALLINT" for coluna in CATEGORIAS_REFEICAO):
+        return False
+
+    recria_tabela(cursor, Refeicao.__table__, {
+        coluna: _sql_codigo(coluna, enum) for coluna, enum in CATEGORIAS_REFEICAO.items()
+    })
+
+    for coluna, valores in _categorias_desconhecidas(cursor).items():
+        for valor, ids in valores.items():
+            logger.warning("Refeicoes com %s sem categoria correspondente mantidas como texto: %s, ids %s",
+                           coluna, valor, ids)
+    return True
+
+
+def refeicao_categorias_texto(cursor):
+    """ Converte para codigos inteiros as categorias armazenadas como texto
+        que passaram a pertencer a enumeracao
+    """
+    aplicada = False
+    for coluna, enum in CATEGORIAS_REFEICAO.items():
+        cursor.execute("UPDATE refeicao SET %s = %s WHERE typeof(%s) = 'text' AND %s IN (%s)" % (
+            coluna, _sql_codigo(coluna, enum), coluna, coluna,
+            ", ".join("'%s'" % nome for nome in enum.__members__)))
+        aplicada = aplicada or cursor.rowcount > 0
+
+    return aplicada
+
+
+def refeicao_remocao_em_cascata(cursor):
+    """ Recria a tabela refeicao com a chave estrangeira para diario usando
+        ON DELETE CASCADE
+    """
+    chaves = cursor.execute("PRAGMA foreign_key_list(refeicao)").fetchall()
+    # colunas do pragma: id, seq, tabela, origem, destino, on_update, on_delete, match
+    if all(chave[6].upper() == "CASCADE" for chave in chaves if chave[2] == "diario"):
+        return False
+
+    recria_tabela(cursor, Refeicao.__table__)
+    return True
+
+
+def cria_indices_ausentes(cursor):
+    """ Cria os indices definidos no modelo que ainda nao existem no bd
+
+        O create_all cria os indices apenas junto com tabelas novas.
+    """
+    existentes = {nome for (nome,) in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()}
+
+    aplicada = False
+    for tabela in Base.metadata.sorted_tables:
+        for indice in _indices(tabela):
+            if indice.name not in existentes:
+                cursor.execute(_ddl(CreateIndex(indice)))
+                aplicada = True
+
+    return aplicada
+
+
+def popula_estatisticas(cursor):
+    """ Calcula as estatisticas das refeicoes ja salvas quando a tabela de
+        estatisticas acabou de ser criada
+    """
+    (estatisticas,) = cursor.execute("SELECT count(*) FROM estatistica_refeicao").fetchone()
+    (refeicoes,) = cursor.execute("SELECT count(*) FROM refeicao").fetchone()
+    if estatisticas or not refeicoes:
+        return False
+
+    # a semana e identificada pela sua segunda-feira
+    for periodo, inicio in (("dia", "diario"), ("semana", "date(diario, 'weekday 0', '-6 days')")):
+        cursor.execute(
+            "INSERT INTO estatistica_refeicao "
+            "(periodo, inicio_periodo, tipo, metodo, avaliacao, aceitacao, quantidade) "
+            "SELECT '%s', %s, %s, count(*) FROM refeicao GROUP BY 2, 3, 4, 5, 6" % (
+                periodo, inicio,
+                ", ".join("coalesce(%s, '')" % _sql_nome(coluna, enum)
+                          for coluna, enum in CATEGORIAS_REFEICAO.items())))
+
+    return True
+
+
+def cria_busca_comentarios(cursor):
+    """ Cria o indice de texto completo (FTS5) dos comentarios das refeicoes
+        e os triggers que o mantem sincronizado com a tabela refeicao
+
+        O indice e reconstruido sempre que a tabela ou os triggers precisam
+        ser criados, o que tambem ocorre apos a tabela refeicao ser recriada.
+    """
+    existentes = {nome for (nome,) in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name LIKE 'refeicao_fts%'").fetchall()}
+    triggers = {
+        "refeicao_fts_ai": "AFTER INSERT ON refeicao BEGIN "
+                           "INSERT INTO refeicao_fts (rowid, comentarios) VALUES (new.id, new.comentarios); END",
+        "refeicao_fts_ad": "AFTER DELETE ON refeicao BEGIN "
+                           "INSERT INTO refeicao_fts (refeicao_fts, rowid, comentarios) "
+                           "VALUES ('delete', old.id, old.comentarios); END",
+        "refeicao_fts_au": "AFTER UPDATE OF comentarios ON refeicao BEGIN "
+                           "INSERT INTO refeicao_fts (refeicao_fts, rowid, comentarios) "
+                           "VALUES ('delete', old.id, old.comentarios); "
+                           "INSERT INTO refeicao_fts (rowid, comentarios) VALUES (new.id, new.comentarios); END",
+    }
+    if {"refeicao_fts", *triggers} <= existentes:
+        return False
+
+    # remove_diacritics faz com que "brocolis" encontre "brócolis"
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS refeicao_fts USING fts5("
+        "comentarios, content='refeicao', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')")
+    for nome, definicao in triggers.items():
+        cursor.execute("CREATE TRIGGER IF NOT EXISTS %s %s" % (nome, definicao))
+    cursor.execute("INSERT INTO refeicao_fts (refeicao_fts) VALUES ('rebuild')")
+
+    return True
+
+
+def diario_versao(cursor):
+    """ Adiciona a coluna versao a tabela diario e cria a linha do contador
+        global de alteracoes
+    """
+    aplicada = False
+    colunas = {coluna[1] for coluna in cursor.execute("PRAGMA table_info(diario)").fetchall()}
+    if "versao" not in colunas:
+        cursor.execute("ALTER TABLE diario ADD COLUMN versao INTEGER NOT NULL DEFAULT 1")
+        aplicada = True
+
+    cursor.execute("INSERT OR IGNORE INTO versao_global (id, versao) VALUES (1, 1)")
+    return aplicada or cursor.rowcount > 0
+
+
+def busca_receita_total(cursor):
+    """ Adiciona a coluna total_resultados a tabela busca_receita
+    """
+    colunas = {coluna[1] for coluna in cursor.execute("PRAGMA table_info(busca_receita)").fetchall()}
+    if "total_resultados" in colunas:
+        return False
+
+    cursor.execute("ALTER TABLE busca_receita ADD COLUMN total_resultados INTEGER")
+    return True
+
+
+def busca_receita_parametros(cursor):
+    """ Adiciona a tabela busca_receita as colunas com os parametros da
+        busca, preenchidas a partir da chave das buscas ja registradas
+    """
+    colunas = {coluna[1] for coluna in cursor.execute("PRAGMA table_info(busca_receita)").fetchall()}
+    novas = {"ingredientes": "VARCHAR(1000)", "excluir_ingredientes": "VARCHAR(1000)", "tipo_prato": "VARCHAR(100)"}
+    novas = {coluna: tipo for coluna, tipo in novas.items() if coluna not in colunas}
+    if not novas:
+        return False
+
+    for coluna, tipo in novas.items():
+        cursor.execute("ALTER TABLE busca_receita ADD COLUMN %s %s" % (coluna, tipo))
+
+    # a chave e a lista JSON dos parametros normalizados
+    cursor.execute("""
+        UPDATE busca_receita SET ingredientes = json_extract(chave, '$[0]'),
+            excluir_ingredientes = json_extract(chave, '$[1]'), tipo_prato = json_extract(chave, '$[2]')
+        WHERE json_valid(chave) AND json_type(chave) = 'array'
+    """)
+    return True
+
+
+# migracoes aplicadas, em ordem, a cada inicializacao; cada uma verifica se
+# ainda e necessaria e retorna se foi aplicada
+MIGRACOES = [
+    refeicao_categorias_inteiras,
+    refeicao_categorias_texto,
+    refeicao_remocao_em_cascata,
+    cria_indices_ausentes,
+    popula_estatisticas,
+    cria_busca_comentarios,
+    diario_versao,
+    busca_receita_total,
+    busca_receita_parametros,
+]
+
+
+def executa_migracoes(engine):
+    """ Aplica as migracoes pendentes no bd
+
+        Cada migracao e executada em uma transacao propria, iniciada com
+        BEGIN IMMEDIATE para que processos iniciados ao mesmo tempo nao
+        apliquem a mesma migracao em paralelo. As chaves estrangeiras ficam
+        desativadas durante as migracoes, como recomendado pelo SQLite para a
+        recriacao de tabelas, e sao verificadas por recria_tabela.
+    """
+    conexao = engine.raw_connection()
+    try:
+        driver = conexao.driver_connection
+        nivel_isolamento = driver.isolation_level
+        # controla as transacoes manualmente, inclusive para comandos DDL
+        driver.isolation_level = None
+        cursor = driver.cursor()
+        # o pragma nao tem efeito dentro de uma transacao
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for migracao in MIGRACOES:
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    aplicada = migracao(cursor)
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+
+                if aplicada:
+                    logger.warning("Migracao aplicada no bd: %s", migracao.__name__)
+        finally:
+            cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.close()
+            driver.isolation_level = nivel_isolamento
+    finally:
+        conexao.close()
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.orm import relationship
+
+from model import Base, IngredienteReceita
+
+
+class Receita(Base):
+    """
+    Classe que representa uma receita da API Spoonacular armazenada ja
+    traduzida
+
+    ...
+
+    Atributos
+    ---------
+    id : int
+        identificador da receita na API Spoonacular
+
+    hash_conteudo : str
+        hash do conteudo original da receita, usado para identificar se a
+        receita mudou na API e precisa ser traduzida novamente
+
+    titulo : str
+        titulo traduzido
+
+    instrucoes : str
+        passos traduzidos, separados por <br>
+
+    data_atualizacao : datetime
+        momento em que a traducao foi armazenada
+
+    ingredientes : list[IngredienteReceita]
+        ingredientes traduzidos, na ordem da receita
+        a remocao da receita remove os ingredientes via ON DELETE CASCADE
+
+    """
+    __tablename__ = 'receita'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    hash_conteudo = Column(String(64), nullable=False)
+    titulo = Column(String(500))
+    instrucoes = Column(Text)
+    data_atualizacao = Column(DateTime, default=datetime.now)
+
+    ingredientes = relationship("IngredienteReceita", cascade="all, delete-orphan", passive_deletes=True,
+                                order_by=IngredienteReceita.posicao)
+
+    def __init__(self, id: int):
+        """
+        Cria uma nova receita armazenada
+
+        Argumentos:
+            id : identificador da receita na API Spoonacular
+
+        """
+        self.id = id
+
+    def atualiza_traducao(self, hash_conteudo: str, titulo: str, instrucoes: str, ingredientes: List[str]):
+        """
+        Substitui a traducao armazenada da receita
+
+        Argumentos:
+            hash_conteudo : hash do conteudo original traduzido
+            titulo : titulo traduzido
+            instrucoes : passos traduzidos, separados por <br>
+            ingredientes : ingredientes traduzidos, na ordem da receita
+
+        """
+        self.hash_conteudo = hash_conteudo
+        self.titulo = titulo
+        self.instrucoes = instrucoes
+        self.data_atualizacao = datetime.now()
+        self.ingredientes = [IngredienteReceita(posicao, texto) for posicao, texto in enumerate(ingredientes)]
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Date
+from sqlalchemy import Column, String, Integer, ForeignKey, Date, Index
 from model import Base
+from model.categorias import Categoria, TipoRefeicao, MetodoRefeicao, AvaliacaoRefeicao, AceitacaoRefeicao
 
 
 class Refeicao(Base):
@@ -16,15 +17,19 @@ class Refeicao(Base):
 
     tipo : str
         tipo de refeicao oferecida 
+        armazenado como codigo inteiro (TipoRefeicao)
 
     metodo : str
         metodo usado para oferecer os alimentos 
+        armazenado como codigo inteiro (MetodoRefeicao)
 
     avaliacao : str
         avaliacao de como foi a refeicao 
+        armazenada como codigo inteiro (AvaliacaoRefeicao)
 
     aceitacao : str
         aceitacao da refeicao oferecida
+        armazenada como codigo inteiro (AceitacaoRefeicao)
 
     comentarios : str
         comentarios sobre a refeicao 
@@ -32,19 +37,26 @@ class Refeicao(Base):
     diario : date
         data do registro
         chave estrangeira que relaciona a refeicao com o registro do diario
+        a refeicao e removida junto com o registro do diario
 
 
     """
     __tablename__ = 'refeicao'
+    __table_args__ = (
+        # usado no carregamento das refeicoes de um registro
+        Index("ix_refeicao_diario", "diario"),
+        # usado nas buscas por intervalo de datas filtradas por tipo
+        Index("ix_refeicao_diario_tipo", "diario", "tipo"),
+    )
 
     id = Column(Integer, primary_key=True)
-    tipo = Column(String(30))
-    metodo = Column(String(30))
-    avaliacao = Column(String(30))
-    aceitacao = Column(String(30))
+    tipo = Column(Categoria(TipoRefeicao))
+    metodo = Column(Categoria(MetodoRefeicao))
+    avaliacao = Column(Categoria(AvaliacaoRefeicao))
+    aceitacao = Column(Categoria(AceitacaoRefeicao))
     comentarios = Column(String(4000))
 
-    diario = Column(Date, ForeignKey("diario.data_registro"), nullable=False)
+    diario = Column(Date, ForeignKey("diario.data_registro", ondelete="CASCADE"), nullable=False)
 
     def __init__(self, tipo: str, metodo: str, avaliacao: str, aceitacao: str, comentarios: str):
         """
@@ -65,3 +77,10 @@ class Refeicao(Base):
         self.avaliacao = avaliacao
         self.aceitacao = aceitacao
         self.comentarios = comentarios
+
+    def valores(self):
+        """
+        Retorna os valores editaveis da refeicao, usados para comparar
+        refeicoes
+        """
+        return (self.tipo, self.metodo, self.avaliacao, self.aceitacao, self.comentarios)
@@ -0,0 +1,56 @@
+from sqlalchemy import Column, String, Integer, Float
+
+from model import Base
+
+
+class LimiteServico(Base):
+    """
+    Classe que representa o balde de fichas (token bucket) que limita as
+    requisicoes a uma API externa, compartilhado entre os processos
+
+    ...
+
+    Atributos
+    ---------
+    nome : str
+        identificador do limite, formado pelo servico e pelo periodo
+
+    fichas : float
+        fichas disponiveis no momento da ultima atualizacao
+
+    atualizado_em : float
+        momento da ultima atualizacao, em segundos desde a epoch
+
+    """
+    __tablename__ = 'limite_servico'
+
+    nome = Column(String(60), primary_key=True)
+    fichas = Column(Float, nullable=False)
+    atualizado_em = Column(Float, nullable=False)
+
+
+class DisjuntorServico(Base):
+    """
+    Classe que representa o estado do disjuntor (circuit breaker) de uma API
+    externa, compartilhado entre os processos
+
+    ...
+
+    Atributos
+    ---------
+    servico : str
+        nome da API externa
+
+    falhas : int
+        quantidade de falhas consecutivas
+
+    aberto_ate : float
+        momento, em segundos desde a epoch, ate o qual as requisicoes sao
+        recusadas sem serem enviadas
+
+    """
+    __tablename__ = 'disjuntor_servico'
+
+    servico = Column(String(60), primary_key=True)
+    falhas = Column(Integer, nullable=False, default=0)
+    aberto_ate = Column(Float, nullable=False, default=0)
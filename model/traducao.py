@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, Text, DateTime, Index
+from model import Base
+
+
+class Traducao(Base):
+    """
+    Classe que representa uma traducao armazenada em cache
+
+    ...
+
+    Atributos
+    ---------
+    chave : str
+        codigo unico identificador da traducao
+        formado pelos idiomas de origem e destino e pelo hash do texto
+
+    idioma_origem : str
+        idioma do texto original
+
+    idioma_destino : str
+        idioma do texto traduzido
+
+    texto_traduzido : str
+        resultado da traducao
+
+    data_criacao : datetime
+        momento em que a traducao foi armazenada
+
+    """
+    __tablename__ = 'traducao'
+    __table_args__ = (
+        # remocao das traducoes expiradas
+        Index("ix_traducao_data_criacao", "data_criacao"),
+    )
+
+    chave = Column(String(100), primary_key=True)
+    idioma_origem = Column(String(10))
+    idioma_destino = Column(String(10))
+    texto_traduzido = Column(Text)
+    data_criacao = Column(DateTime, default=datetime.now)
+
+    def __init__(self, chave: str, idioma_origem: str, idioma_destino: str, texto_traduzido: str):
+        """
+        Cria uma nova traducao em cache
+
+        Argumentos:
+            chave : identificador da traducao
+            idioma_origem : idioma do texto original
+            idioma_destino : idioma do texto traduzido
+            texto_traduzido : resultado da traducao
+
+        """
+        self.chave = chave
+        self.idioma_origem = idioma_origem
+        self.idioma_destino = idioma_destino
+        self.texto_traduzido = texto_traduzido
+        self.data_criacao = datetime.now()
+
+
+class TraducaoTermo(Base):
+    """
+    Classe que representa a traducao de um termo isolado, como um ingrediente,
+    memorizada sem prazo de validade
+
+    ...
+
+    Atributos
+    ---------
+    idioma_origem : str
+        idioma do termo original
+
+    idioma_destino : str
+        idioma do termo traduzido
+
+    termo : str
+        termo original normalizado
+
+    texto_traduzido : str
+        resultado da traducao
+
+    data_criacao : datetime
+        momento em que a traducao foi armazenada
+
+    """
+    __tablename__ = 'traducao_termo'
+
+    idioma_origem = Column(String(10), primary_key=True)
+    idioma_destino = Column(String(10), primary_key=True)
+    termo = Column(String(200), primary_key=True)
+    texto_traduzido = Column(String(400))
+    data_criacao = Column(DateTime, default=datetime.now)
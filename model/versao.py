@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, select, update
+
+from model import Base
+
+
+class VersaoGlobal(Base):
+    """
+    Classe que representa o contador global de alteracoes do diario
+
+    ...
+
+    Atributos
+    ---------
+    id : int
+        identificador da linha unica da tabela
+
+    versao : int
+        incrementada a cada insercao, edicao ou remocao de registros
+
+    """
+    __tablename__ = 'versao_global'
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=1)
+
+
+def obtem_versao_global(session):
+    """ Retorna o valor atual do contador global de alteracoes
+    """
+    return session.execute(select(VersaoGlobal.versao).where(VersaoGlobal.id == 1)).scalar_one()
+
+
+def incrementa_versao_global(session):
+    """ Incrementa o contador global de alteracoes, na transacao da sessao
+
+        Retorna o novo valor do contador.
+    """
+    return session.execute(
+        update(VersaoGlobal).where(VersaoGlobal.id == 1).values(versao=VersaoGlobal.versao + 1)
+        .returning(VersaoGlobal.versao)).scalar_one()
@@ -1,5 +1,12 @@
 from schemas.refeicao import RefeicaoSchema
 from schemas.diario import DiarioSchema, DiarioViewSchema, DiarioBuscaSchema, DiarioListaSchema, \
-  DiarioRemocaoSchema, retorna_diario, retorna_lista_diarios
-from schemas.receita import ReceitaBuscaSchema, ReceitaViewSchema
-from schemas.traducao import TraducaoRequisicaoSchema,TraducaoViewSchema
+  DiarioListagemSchema, DiarioExportacaoSchema, DiarioLoteSchema, DiarioLoteViewSchema, DiarioConflitoSchema, \
+  DiarioIntervaloSchema, DiarioFiltroSchema, DiarioRemocaoLoteSchema, DiarioRemocaoSchema, retorna_diario, retorna_lista_diarios, \
+  retorna_lista_diarios_linhas, agrupa_linhas_diarios
+from schemas.receita import ReceitaBuscaSchema, ReceitaPaginaBuscaSchema, ReceitaIdBuscaSchema, ReceitaViewSchema, \
+  ReceitaListaViewSchema, retorna_receita
+from schemas.traducao import TraducaoRequisicaoSchema,TraducaoViewSchema, CacheTraducaoViewSchema
+from schemas.estatistica import EstatisticaBuscaSchema, EstatisticaViewSchema, EstatisticaListaSchema, \
+  retorna_lista_estatisticas
+from schemas.comentario import ComentarioBuscaSchema, ComentarioViewSchema, ComentarioListaSchema, \
+  gera_consulta_fts, retorna_lista_comentarios
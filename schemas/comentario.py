@@ -0,0 +1,56 @@
+from datetime import date
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class ComentarioBuscaSchema(BaseModel):
+    """
+    Define como representar uma busca nos comentarios das refeicoes. A busca
+    sera feita pelas palavras informadas, considerando-as como prefixos
+    """
+    termo: str = Field("alergia", min_length=1)
+    limit: int = Field(20, ge=1, le=200)
+
+
+class ComentarioViewSchema(BaseModel):
+    """
+    Define como um comentario encontrado sera retornado: data do registro +
+    tipo da refeicao + trecho do comentario
+    """
+    data_registro: date
+    tipo: str
+    trecho: str
+    relevancia: float
+
+
+class ComentarioListaSchema(BaseModel):
+    """
+    Define como retornar uma lista de comentarios encontrados, do mais
+    relevante para o menos relevante
+    """
+    comentarios: List[ComentarioViewSchema]
+
+
+def gera_consulta_fts(termo: str):
+    """ Converte o texto informado pelo usuario em uma consulta FTS5, tratando
+        cada palavra como um prefixo literal
+    """
+    palavras = ['"%s"*' % palavra.replace('"', '""') for palavra in termo.split()]
+    return " ".join(palavras)
+
+
+def retorna_lista_comentarios(linhas):
+    """ Retorna uma lista de comentarios seguindo o schema definido em
+        ComentarioListaSchema.
+    """
+    return {
+        "comentarios": [
+            {
+                "data_registro": data_registro,
+                "tipo": tipo,
+                "trecho": trecho,
+                "relevancia": relevancia
+            }
+            for data_registro, tipo, trecho, relevancia in linhas
+        ]
+    }
@@ -1,11 +1,12 @@
 from datetime import date
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional, Literal, Iterable
+from pydantic import BaseModel, Field
 
 from model.diario import Diario
 
 
 from schemas import RefeicaoSchema
+from schemas.refeicao import TipoRefeicaoNome, AceitacaoRefeicaoNome
 
 
 class DiarioSchema(BaseModel):
@@ -24,11 +25,55 @@ class DiarioViewSchema(BaseModel):
     refeicoes: List[RefeicaoSchema]
 
 
+class DiarioLoteSchema(BaseModel):
+    """
+    Define como representar um lote de registros a serem inseridos
+    """
+    diarios: List[DiarioSchema] = Field(..., min_length=1, max_length=5000)
+
+
+class DiarioConflitoSchema(BaseModel):
+    """
+    Define como representar um registro do lote que nao foi inserido
+    """
+    data_registro: date
+    mensagem: str
+
+
+class DiarioLoteViewSchema(BaseModel):
+    """
+    Define como o resultado da insercao de um lote sera retornado: datas
+    inseridas + registros em conflito
+    """
+    inseridos: List[date]
+    conflitos: List[DiarioConflitoSchema]
+
+
 class DiarioListaSchema(BaseModel):
     """
     Define como retornar uma lista de registros do diario de introducao alimentar
+
+    proximo_cursor deve ser enviado como after para obter a proxima pagina
     """
     diarios: List[DiarioSchema]
+    proximo_cursor: Optional[date] = None
+
+
+class DiarioListagemSchema(BaseModel):
+    """
+    Define como representar a paginacao da listagem de registros. A listagem
+    retorna os registros com data posterior a after, ordenados por data
+    """
+    after: Optional[date] = None
+    limit: int = Field(50, ge=1, le=500)
+
+
+class DiarioExportacaoSchema(BaseModel):
+    """
+    Define o formato da exportacao dos registros: ndjson (um registro por
+    linha) ou json (uma lista de registros)
+    """
+    formato: Literal["ndjson", "json"] = "ndjson"
 
 
 class DiarioBuscaSchema(BaseModel):
@@ -38,6 +83,35 @@ class DiarioBuscaSchema(BaseModel):
     data_registro: date = date.today()
 
 
+class DiarioIntervaloSchema(BaseModel):
+    """
+    Define como representar um intervalo de datas, incluindo as datas
+    inicial e final
+    """
+    data_inicio: date
+    data_fim: date
+
+
+class DiarioFiltroSchema(BaseModel):
+    """
+    Define como representar uma busca por intervalo de datas. As refeicoes
+    podem ser filtradas por tipo e aceitacao e, nesse caso, apenas os
+    registros com refeicoes correspondentes sao retornados
+    """
+    data_inicio: date
+    data_fim: date
+    tipo: Optional[TipoRefeicaoNome] = None
+    aceitacao: Optional[AceitacaoRefeicaoNome] = None
+
+
+class DiarioRemocaoLoteSchema(BaseModel):
+    """
+    Define a estrutura do retorno de uma requisicao de remocao por intervalo
+    """
+    message: str
+    quantidade: int
+
+
 class DiarioRemocaoSchema(BaseModel):
     """ 
     Define a estrutura do retorno de uma requisicao de remocao
@@ -46,9 +120,9 @@ class DiarioRemocaoSchema(BaseModel):
     mensagem: str
 
 
-def retorna_lista_diarios(diarios: List[Diario]):
+def retorna_lista_diarios(diarios: List[Diario], proximo_cursor: Optional[str] = None):
     """ Retorna uma lista de diarios seguindo o schema definido em
-        DiarioViewSchema.
+        DiarioListaSchema.
     """
     lista_diarios = []
     for diario in diarios:
@@ -70,7 +144,8 @@ def retorna_lista_diarios(diarios: List[Diario]):
         lista_diarios.append(diario_resposta)
 
     return {
-        "diarios": lista_diarios
+        "diarios": lista_diarios,
+        "proximo_cursor": proximo_cursor
     }
 
 
@@ -81,3 +156,41 @@ def retorna_diario(diario: Diario):
         "data_registro": diario.data_registro,
         "refeicoes": [{"tipo": r.tipo, "aceitacao": r.aceitacao, "metodo": r.metodo, "avaliacao": r.avaliacao, "comentarios":r.comentarios} for r in diario.refeicoes]
     }
+
+
+def agrupa_linhas_diarios(linhas: Iterable):
+    """ Agrupa linhas (data_registro, tipo, metodo, avaliacao, aceitacao,
+        comentarios), ordenadas por data, em registros do diario.
+
+        Os registros sao gerados um a um, sem manter a listagem em memoria.
+    """
+    diario_atual = None
+    for data_registro, tipo, metodo, avaliacao, aceitacao, comentarios in linhas:
+        if diario_atual is None or diario_atual["data_registro"] != data_registro:
+            if diario_atual is not None:
+                yield diario_atual
+            diario_atual = {"data_registro": data_registro, "refeicoes": []}
+
+        # diarios sem refeicoes retornam uma linha com as colunas da refeicao nulas
+        if tipo is not None:
+            diario_atual["refeicoes"].append({
+                "tipo": tipo,
+                "aceitacao": aceitacao,
+                "metodo": metodo,
+                "avaliacao": avaliacao,
+                "comentarios": comentarios
+            })
+
+    if diario_atual is not None:
+        yield diario_atual
+
+
+def retorna_lista_diarios_linhas(linhas: Iterable, proximo_cursor: Optional[str] = None):
+    """ Retorna uma lista de diarios seguindo o schema definido em
+        DiarioListaSchema a partir de linhas (data_registro, tipo, metodo,
+        avaliacao, aceitacao, comentarios), sem passar por objetos do ORM.
+    """
+    return {
+        "diarios": list(agrupa_linhas_diarios(linhas)),
+        "proximo_cursor": proximo_cursor
+    }
@@ -0,0 +1,59 @@
+from datetime import date
+from typing import List, Optional, Literal
+from pydantic import BaseModel
+
+from model.estatistica import EstatisticaRefeicao
+from schemas.refeicao import TipoRefeicaoNome, MetodoRefeicaoNome
+
+
+class EstatisticaBuscaSchema(BaseModel):
+    """
+    Define como representar uma busca de estatisticas. A busca sera feita
+    pelo periodo (dia ou semana) e intervalo de datas, podendo ser filtrada
+    por tipo e metodo da refeicao
+    """
+    periodo: Literal["dia", "semana"] = "semana"
+    data_inicio: date
+    data_fim: date
+    tipo: Optional[TipoRefeicaoNome] = None
+    metodo: Optional[MetodoRefeicaoNome] = None
+
+
+class EstatisticaViewSchema(BaseModel):
+    """
+    Define como uma contagem de refeicoes sera retornada
+    """
+    inicio_periodo: date
+    tipo: str
+    metodo: str
+    avaliacao: str
+    aceitacao: str
+    quantidade: int
+
+
+class EstatisticaListaSchema(BaseModel):
+    """
+    Define como retornar uma lista de contagens de refeicoes
+    """
+    periodo: str
+    estatisticas: List[EstatisticaViewSchema]
+
+
+def retorna_lista_estatisticas(periodo: str, estatisticas: List[EstatisticaRefeicao]):
+    """ Retorna uma lista de contagens seguindo o schema definido em
+        EstatisticaListaSchema.
+    """
+    return {
+        "periodo": periodo,
+        "estatisticas": [
+            {
+                "inicio_periodo": e.inicio_periodo.isoformat(),
+                "tipo": e.tipo,
+                "metodo": e.metodo,
+                "avaliacao": e.avaliacao,
+                "aceitacao": e.aceitacao,
+                "quantidade": e.quantidade
+            }
+            for e in estatisticas
+        ]
+    }
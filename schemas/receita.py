@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 
+from model.receita import Receita
+
 class ReceitaBuscaSchema(BaseModel):
    """
     Define como representar uma busca. A busca sera feita pela lista de ingredientes
@@ -9,17 +11,41 @@ class ReceitaBuscaSchema(BaseModel):
    excludeIngredients: str = "sal, açúcar"
    dishType: str = "breakfast"
 
+class ReceitaPaginaBuscaSchema(ReceitaBuscaSchema):
+    """
+    Define como representar uma busca de varias receitas. As receitas
+    encontradas sao retornadas em paginas, a partir da posicao offset
+    """
+    offset: int = Field(0, ge=0)
+    limit: int = Field(5, ge=1, le=10)
+
+class ReceitaIdBuscaSchema(BaseModel):
+    """
+    Define como representar a busca de uma receita armazenada, feita pelo
+    identificador da receita na API Spoonacular
+    """
+    id: int
+
 class ReceitaViewSchema(BaseModel):
     """ 
     Define como uma receita será retornada
     """
     receita: Dict[str, Any]
 
+class ReceitaListaViewSchema(BaseModel):
+    """
+    Define como uma pagina de receitas será retornada
+    """
+    receitas: List[Dict[str, Any]]
+    total: int
+    offset: int
+    limit: int
+
 def retorna_lista_receitas(receitas: List[Dict[str, Any]]):
     list_receitas = []
     for receita in receitas:
         
-        instrucoes = ""
+        passos = []
 
         ingredientes = []
 
@@ -34,15 +60,15 @@ def retorna_lista_receitas(receitas: List[Dict[str, Any]]):
 
 
         for instrucao in receita.get("analyzedInstructions"):
-            passos = instrucao.get("steps")
-            for passo in passos:
-                instrucoes+=passo.get("step") + "<br>"
+            for passo in instrucao.get("steps"):
+                passos.append(passo.get("step"))
 
         
         
         nova_receita = {
+            "id": receita.get("id"),
             "titulo": receita.get("title"),
-            "instrucoes": instrucoes,
+            "passos": passos,
             "ingredientes": ingredientes
         }
 
@@ -50,20 +76,49 @@ def retorna_lista_receitas(receitas: List[Dict[str, Any]]):
 
     return list_receitas
 
-def organiza_estrutura_receita(texto_receita:str):
+def segmentos_receita(receita: Dict[str, Any]):
 
     """ 
-    Estrutura uma receita
+    Retorna os textos de uma receita estruturada a serem traduzidos: o
+    titulo, cada passo e cada ingrediente, nessa ordem
     """
 
-    titulo, instrucoes, texto_ingredientes = texto_receita.split("<§§§>")
-    ingredientes = texto_ingredientes.split("<<|>>")
+    ingredientes = [
+        " ".join(str(parte) for parte in (ingrediente.get("quantidade"), ingrediente.get("unidade"),
+                                          ingrediente.get("nome")) if parte not in (None, ""))
+        for ingrediente in receita.get("ingredientes")
+    ]
+
+    return [receita.get("titulo")] + receita.get("passos") + ingredientes
 
-    receita = {
-        "titulo": titulo,
-        "instrucoes": instrucoes,
-        "ingredientes": ingredientes
+def organiza_estrutura_receita(receita: Dict[str, Any], segmentos: List[str]):
+
+    """ 
+    Estrutura uma receita a partir dos seus segmentos traduzidos, na ordem
+    retornada por segmentos_receita
+    """
+
+    quantidade_passos = len(receita.get("passos"))
+    passos = segmentos[1:1 + quantidade_passos]
+
+    receita_traduzida = {
+        "id": receita.get("id"),
+        "titulo": segmentos[0],
+        "instrucoes": "".join(passo + "<br>" for passo in passos),
+        "ingredientes": segmentos[1 + quantidade_passos:]
     }
 
-    return receita
+    return receita_traduzida
 
+def retorna_receita(receita: Receita):
+
+    """ 
+    Retorna uma representação de uma receita armazenada
+    """
+
+    return {
+        "id": receita.id,
+        "titulo": receita.titulo,
+        "instrucoes": receita.instrucoes,
+        "ingredientes": [ingrediente.texto for ingrediente in receita.ingredientes]
+    }
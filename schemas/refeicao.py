@@ -1,17 +1,25 @@
-from typing import List
+from typing import List, Literal
 from pydantic import BaseModel
 
 from model.refeicao import Refeicao
+from model.categorias import TipoRefeicao, MetodoRefeicao, AvaliacaoRefeicao, AceitacaoRefeicao
+
+
+# valores aceitos para as categorias da refeicao
+TipoRefeicaoNome = Literal[tuple(TipoRefeicao.__members__)]
+MetodoRefeicaoNome = Literal[tuple(MetodoRefeicao.__members__)]
+AvaliacaoRefeicaoNome = Literal[tuple(AvaliacaoRefeicao.__members__)]
+AceitacaoRefeicaoNome = Literal[tuple(AceitacaoRefeicao.__members__)]
 
 
 class RefeicaoSchema(BaseModel):
     """    
     Define como exibir uma refeicao
     """
-    tipo: str = "LANCHE_MANHA"
-    metodo: str = "BLW"
-    avaliacao: str = "SUCESSO"
-    aceitacao: str = "OTIMO"
+    tipo: TipoRefeicaoNome = "LANCHE_MANHA"
+    metodo: MetodoRefeicaoNome = "BLW"
+    avaliacao: AvaliacaoRefeicaoNome = "SUCESSO"
+    aceitacao: AceitacaoRefeicaoNome = "OTIMO"
     comentarios: str = ""
 
 
@@ -19,10 +27,10 @@ class RefeicaoViewSchema(BaseModel):
     """ 
     Define como uma refeicao será retornada:  data + refeicao
     """
-    tipo: str = "LANCHE_MANHA"
-    metodo: str = "BLW"
-    avaliacao: str = "SUCESSO"
-    aceitacao: str = "OTIMO"
+    tipo: TipoRefeicaoNome = "LANCHE_MANHA"
+    metodo: MetodoRefeicaoNome = "BLW"
+    avaliacao: AvaliacaoRefeicaoNome = "SUCESSO"
+    aceitacao: AceitacaoRefeicaoNome = "OTIMO"
     comentarios: str
 
 
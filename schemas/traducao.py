@@ -13,4 +13,14 @@ class TraducaoViewSchema(BaseModel):
     """ 
     Define como um texto traduzido sera retornado
     """
-    texto_traduzido: str
\ No newline at end of file
+    texto_traduzido: str
+
+class CacheTraducaoViewSchema(BaseModel):
+    """ 
+    Define como as estatisticas do cache de traducoes serao retornadas
+    """
+    acertos_memoria: int
+    acertos_banco: int
+    falhas: int
+    itens_memoria: int
+    taxa_acerto: float
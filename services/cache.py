@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from logger import logger
+
+
+class CacheLRU:
+    """
+    Cache em memoria com politica LRU e tempo de expiracao (TTL)
+
+    Os itens mais antigos sao descartados quando o tamanho maximo e
+    atingido e itens expirados sao tratados como ausentes.
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl: float):
+        """
+        Cria um novo cache
+
+        Argumentos:
+            tamanho_maximo : quantidade maxima de itens mantidos
+            ttl : tempo de vida de cada item, em segundos
+
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """
+        Retorna o valor associado a chave ou None caso nao exista ou
+        esteja expirado
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.falhas += 1
+                return None
+
+            # marca o item como usado mais recentemente
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def armazenar(self, chave, valor):
+        """
+        Armazena um valor no cache, descartando o item usado ha mais
+        tempo caso o tamanho maximo seja ultrapassado
+        """
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class CacheRevalidavel:
+    """
+    Cache em memoria que serve itens expirados enquanto os atualiza
+
+    Um item dentro do TTL e retornado diretamente. Um item expirado, mas
+    ainda dentro do periodo de tolerancia, e retornado imediatamente e uma
+    unica atualizacao em segundo plano e disparada para ele
+    (stale-while-revalidate). Itens ausentes sao carregados e aguardados
+    pelo chamador.
+
+    A funcao de carga deve retornar uma corrotina que resulta em uma tupla
+    (valor, status_code) e apenas valores com status 200 sao armazenados.
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl: float, ttl_obsoleto: float):
+        """
+        Cria um novo cache
+
+        Argumentos:
+            tamanho_maximo : quantidade maxima de itens mantidos
+            ttl : tempo, em segundos, em que um item e considerado atual
+            ttl_obsoleto : tempo adicional, em segundos, em que um item
+                expirado ainda pode ser servido
+
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.ttl_obsoleto = ttl_obsoleto
+        self._itens = OrderedDict()
+        self._atualizando = set()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.acertos_obsoletos = 0
+        self.falhas = 0
+
+    def _armazenar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic())
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def _atualizar(self, chave, carregar):
+        # executada na thread de atualizacao, com um event loop proprio
+        try:
+            valor, status_code = asyncio.run(carregar())
+            if status_code == 200:
+                self._armazenar(chave, valor)
+        except Exception as e:
+            logger.warning("Erro ao atualizar item do cache %s", {e})
+        finally:
+            with self._lock:
+                self._atualizando.discard(chave)
+
+    def obter_item(self, chave):
+        """
+        Retorna o valor armazenado para a chave, mesmo que expirado, ou
+        None caso nao exista
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+        return item[0] if item is not None else None
+
+    def _consultar(self, chave, carregar):
+        """
+        Retorna o valor armazenado para a chave, disparando a atualizacao em
+        segundo plano se estiver expirado, ou None caso precise ser carregado
+        """
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                valor, armazenado_em = item
+                idade = agora - armazenado_em
+
+                if idade < self.ttl:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+
+                if idade < self.ttl + self.ttl_obsoleto:
+                    self.acertos_obsoletos += 1
+                    # apenas uma atualizacao em segundo plano por chave
+                    if chave not in self._atualizando:
+                        self._atualizando.add(chave)
+                        threading.Thread(target=self._atualizar, args=(chave, carregar),
+                                         daemon=True).start()
+                    return valor
+
+            # itens expirados sao mantidos ate serem substituidos ou
+            # descartados pelo limite de tamanho, podendo ser servidos pelo
+            # obter_item caso a API externa esteja indisponivel
+            self.falhas += 1
+
+        return None
+
+    async def obter_assincrono(self, chave, carregar):
+        """
+        Retorna o valor associado a chave e o status code, aguardando a
+        funcao carregar quando o item nao esta disponivel
+
+        A atualizacao em segundo plano de itens expirados executa a mesma
+        funcao carregar em um event loop proprio, na thread de atualizacao.
+        """
+        valor = self._consultar(chave, carregar)
+        if valor is not None:
+            return valor, 200
+
+        valor, status_code = await carregar()
+        if status_code == 200:
+            self._armazenar(chave, valor)
+        return valor, status_code
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos e falhas do cache
+        """
+        return {
+            "acertos": self.acertos,
+            "acertos_obsoletos": self.acertos_obsoletos,
+            "falhas": self.falhas,
+            "itens": len(self._itens)
+        }
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,287 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from logger import logger
+
+
+# configuracoes do cliente http, ajustaveis por variaveis de ambiente
+HTTP_CONEXOES_POR_HOST = int(os.getenv('HTTP_CONEXOES_POR_HOST') or 10)
+HTTP_TIMEOUT_CONEXAO = float(os.getenv('HTTP_TIMEOUT_CONEXAO') or 3.05)
+HTTP_TIMEOUT_LEITURA = float(os.getenv('HTTP_TIMEOUT_LEITURA') or 10)
+HTTP_TENTATIVAS = int(os.getenv('HTTP_TENTATIVAS') or 3)
+HTTP_ESPERA_BASE = float(os.getenv('HTTP_ESPERA_BASE') or 0.5)
+HTTP_ESPERA_MAXIMA = float(os.getenv('HTTP_ESPERA_MAXIMA') or 5)
+
+# status que indicam falhas temporarias da API externa
+STATUS_REPETIVEIS = (429, 500, 502, 503, 504)
+
+# status que indicam a cota da API externa esgotada (402 na API Spoonacular),
+# alem do 429 apos a ultima tentativa; nao sao repetidos e abrem o disjuntor
+STATUS_COTA_ESGOTADA = (402,)
+
+
+def _cota_esgotada(status_code: int, ultima_tentativa: bool):
+    """ Retorna se a resposta indica a cota da API externa esgotada
+    """
+    return status_code in STATUS_COTA_ESGOTADA or (status_code == 429 and ultima_tentativa)
+
+
+class ClienteHttp:
+    """
+    Cliente http compartilhado para as APIs externas
+
+    Mantem uma sessao com conexoes persistentes (keep-alive) por host,
+    limita o numero de conexoes simultaneas, aplica timeouts de conexao e
+    leitura e repete requisicoes que falharam temporariamente, com espera
+    exponencial e aleatoria entre as tentativas.
+    """
+
+    def __init__(self, conexoes_por_host: int, timeout_conexao: float, timeout_leitura: float,
+                 tentativas: int, espera_base: float, espera_maxima: float):
+        """
+        Cria um novo cliente http
+
+        Argumentos:
+            conexoes_por_host : numero maximo de conexoes abertas por host
+            timeout_conexao : tempo maximo para estabelecer a conexao, em segundos
+            timeout_leitura : tempo maximo de espera pela resposta, em segundos
+            tentativas : numero maximo de tentativas por requisicao
+            espera_base : espera inicial entre tentativas, em segundos
+            espera_maxima : espera maxima entre tentativas, em segundos
+
+        """
+        self.conexoes_por_host = conexoes_por_host
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tentativas = max(1, tentativas)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._sessoes = {}
+        self._lock = threading.Lock()
+
+    def _sessao(self, url: str):
+        """
+        Retorna a sessao associada ao host da url, criando-a se necessario
+        """
+        partes = urlsplit(url)
+        host = "%s://%s" % (partes.scheme, partes.netloc)
+
+        with self._lock:
+            sessao = self._sessoes.get(host)
+            if sessao is None:
+                sessao = requests.Session()
+                # pool_block faz com que requisicoes excedentes aguardem uma conexao livre
+                adaptador = HTTPAdapter(pool_connections=1,
+                                        pool_maxsize=self.conexoes_por_host,
+                                        pool_block=True)
+                sessao.mount(host, adaptador)
+                self._sessoes[host] = sessao
+
+        return sessao
+
+    def _espera(self, tentativa: int, resposta=None):
+        """
+        Calcula o tempo de espera antes da proxima tentativa
+
+        Usa o cabecalho Retry-After quando presente e, caso contrario,
+        uma espera exponencial com variacao aleatoria (full jitter).
+        """
+        if resposta is not None:
+            retry_after = resposta.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.espera_maxima)
+
+        limite = min(self.espera_maxima, self.espera_base * (2 ** tentativa))
+        return random.uniform(0, limite)
+
+    def requisitar(self, metodo: str, url: str, **kwargs):
+        """
+        Realiza uma requisicao http, repetindo-a em caso de falha temporaria
+
+        Retorna a resposta da ultima tentativa. Erros de conexao e timeout
+        sao propagados caso todas as tentativas falhem.
+
+        O argumento opcional protecao (ProtecaoServico) autoriza cada
+        tentativa e recebe o seu resultado; uma tentativa recusada, ou uma
+        resposta de cota esgotada, lanca ServicoIndisponivel.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        protecao = kwargs.pop("protecao", None)
+        sessao = self._sessao(url)
+
+        for tentativa in range(self.tentativas):
+            ultima_tentativa = tentativa == self.tentativas - 1
+            if protecao is not None:
+                protecao.autorizar()
+            try:
+                resposta = sessao.request(metodo, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if protecao is not None:
+                    protecao.registrar(False)
+                if ultima_tentativa:
+                    raise
+                logger.warning("Erro na requisição para %s, tentando novamente %s",
+                               urlsplit(url).netloc, {e})
+                time.sleep(self._espera(tentativa))
+                continue
+
+            falha = resposta.status_code in STATUS_REPETIVEIS
+            if protecao is not None:
+                if _cota_esgotada(resposta.status_code, ultima_tentativa):
+                    resposta.close()
+                    protecao.registrar_cota_esgotada(resposta.status_code)
+                protecao.registrar(not falha)
+            if not falha or ultima_tentativa:
+                return resposta
+
+            logger.warning("Status %s recebido de %s, tentando novamente",
+                           resposta.status_code, urlsplit(url).netloc)
+            espera = self._espera(tentativa, resposta)
+            resposta.close()
+            time.sleep(espera)
+
+    def get(self, url: str, **kwargs):
+        """ Realiza uma requisicao GET
+        """
+        return self.requisitar("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """ Realiza uma requisicao POST
+        """
+        return self.requisitar("POST", url, **kwargs)
+
+
+class ClienteHttpAssincrono:
+    """
+    Variante assincrona (asyncio) do cliente http, baseada no httpx
+
+    Aplica os mesmos limites, timeouts e repeticoes do ClienteHttp. O pool
+    de conexoes do httpx pertence ao event loop que o criou e o Flask executa
+    cada view assincrona em um event loop proprio, descartado ao fim da
+    requisicao; por isso as requisicoes sao enviadas a um event loop do
+    processo, executado em uma thread propria, que mantem um pool de
+    conexoes persistentes (keep-alive) por host, reaproveitado por todas as
+    requisicoes do processo.
+    """
+
+    def __init__(self, conexoes_por_host: int, timeout_conexao: float, timeout_leitura: float,
+                 tentativas: int, espera_base: float, espera_maxima: float):
+        """
+        Cria um novo cliente http assincrono, com os mesmos argumentos do
+        ClienteHttp
+        """
+        self.conexoes_por_host = conexoes_por_host
+        self.timeout = httpx.Timeout(timeout_leitura, connect=timeout_conexao)
+        self.tentativas = max(1, tentativas)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._loop = None
+        self._sessoes = {}
+        self._lock = threading.Lock()
+
+    # mesma politica de espera entre tentativas do cliente sincrono
+    _espera = ClienteHttp._espera
+
+    def _loop_conexoes(self):
+        """
+        Retorna o event loop que mantem as conexoes, iniciando a sua thread
+        se necessario
+
+        A thread e criada no primeiro uso, ja no processo do worker.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="cliente-http-assincrono",
+                                 daemon=True).start()
+        return self._loop
+
+    def _sessao(self, url: str):
+        """
+        Retorna a sessao associada ao host da url, criando-a se necessario
+        """
+        partes = urlsplit(url)
+        host = "%s://%s" % (partes.scheme, partes.netloc)
+
+        with self._lock:
+            sessao = self._sessoes.get(host)
+            if sessao is None:
+                sessao = httpx.AsyncClient(timeout=self.timeout,
+                                           limits=httpx.Limits(max_connections=self.conexoes_por_host))
+                self._sessoes[host] = sessao
+
+        return sessao
+
+    async def _enviar(self, metodo: str, url: str, **kwargs):
+        """
+        Envia uma unica requisicao pelo event loop das conexoes e aguarda a
+        resposta, ja lida por completo, no event loop de quem chamou
+        """
+        requisicao = self._sessao(url).request(metodo, url, **kwargs)
+        futuro = asyncio.run_coroutine_threadsafe(requisicao, self._loop_conexoes())
+        return await asyncio.wrap_future(futuro)
+
+    async def requisitar(self, metodo: str, url: str, **kwargs):
+        """
+        Realiza uma requisicao http, repetindo-a em caso de falha temporaria
+
+        Retorna a resposta da ultima tentativa. Erros de conexao e timeout
+        sao propagados caso todas as tentativas falhem.
+
+        Aceita o mesmo argumento opcional protecao do ClienteHttp; como ela
+        acessa o bd, e consultada em uma thread.
+        """
+        protecao = kwargs.pop("protecao", None)
+
+        for tentativa in range(self.tentativas):
+            ultima_tentativa = tentativa == self.tentativas - 1
+            if protecao is not None:
+                await asyncio.to_thread(protecao.autorizar)
+            try:
+                resposta = await self._enviar(metodo, url, **kwargs)
+            except httpx.TransportError as e:
+                if protecao is not None:
+                    await asyncio.to_thread(protecao.registrar, False)
+                if ultima_tentativa:
+                    raise
+                logger.warning("Erro na requisição para %s, tentando novamente %s",
+                               urlsplit(url).netloc, {e})
+                await asyncio.sleep(self._espera(tentativa))
+                continue
+
+            falha = resposta.status_code in STATUS_REPETIVEIS
+            if protecao is not None:
+                if _cota_esgotada(resposta.status_code, ultima_tentativa):
+                    await asyncio.to_thread(protecao.registrar_cota_esgotada, resposta.status_code)
+                await asyncio.to_thread(protecao.registrar, not falha)
+            if not falha or ultima_tentativa:
+                return resposta
+
+            logger.warning("Status %s recebido de %s, tentando novamente",
+                           resposta.status_code, urlsplit(url).netloc)
+            await asyncio.sleep(self._espera(tentativa, resposta))
+
+    async def get(self, url: str, **kwargs):
+        """ Realiza uma requisicao GET
+        """
+        return await self.requisitar("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        """ Realiza uma requisicao POST
+        """
+        return await self.requisitar("POST", url, **kwargs)
+
+
+cliente_http = ClienteHttp(HTTP_CONEXOES_POR_HOST, HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA,
+                           HTTP_TENTATIVAS, HTTP_ESPERA_BASE, HTTP_ESPERA_MAXIMA)
+
+cliente_http_assincrono = ClienteHttpAssincrono(
+    HTTP_CONEXOES_POR_HOST, HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA,
+    HTTP_TENTATIVAS, HTTP_ESPERA_BASE, HTTP_ESPERA_MAXIMA)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+
+class _Chamada:
+    """
+    Representa uma chamada em andamento e o seu resultado
+    """
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.excecao = None
+
+
+class CoalescenciaChamadas:
+    """
+    Agrupa chamadas concorrentes identicas em uma unica execucao
+
+    O primeiro chamador de uma chave executa a funcao e os chamadores
+    concorrentes da mesma chave aguardam e recebem o mesmo resultado (ou a
+    mesma excecao). Apos o termino, a proxima chamada executa novamente.
+    """
+
+    def __init__(self):
+        self._chamadas = {}
+        self._lock = threading.Lock()
+        self.coalescidas = 0
+
+    def _registrar(self, chave):
+        """
+        Retorna a chamada em andamento para a chave, criando-a se necessario,
+        e se o chamador e o responsavel por executa-la
+        """
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._chamadas[chave] = chamada
+            else:
+                self.coalescidas += 1
+
+        return chamada, lider
+
+    def _concluir(self, chave, chamada):
+        with self._lock:
+            del self._chamadas[chave]
+        chamada.evento.set()
+
+    @staticmethod
+    def _resultado(chamada):
+        if chamada.excecao is not None:
+            raise chamada.excecao
+        return chamada.resultado
+
+    def executar(self, chave, funcao):
+        """
+        Executa a funcao para a chave ou aguarda a execucao em andamento
+
+        Retorna o resultado da funcao.
+        """
+        chamada, lider = self._registrar(chave)
+
+        if not lider:
+            chamada.evento.wait()
+            return self._resultado(chamada)
+
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado
+        except Exception as e:
+            chamada.excecao = e
+            raise
+        finally:
+            self._concluir(chave, chamada)
+
+    async def executar_assincrono(self, chave, funcao):
+        """
+        Variante assincrona de executar: a funcao retorna uma corrotina
+
+        Chamadas sincronas e assincronas da mesma chave sao agrupadas entre
+        si; a espera pela execucao em andamento ocorre em uma thread, sem
+        bloquear o event loop.
+        """
+        chamada, lider = self._registrar(chave)
+
+        if not lider:
+            await asyncio.to_thread(chamada.evento.wait)
+            return self._resultado(chamada)
+
+        try:
+            chamada.resultado = await funcao()
+            return chamada.resultado
+        except Exception as e:
+            chamada.excecao = e
+            raise
+        finally:
+            self._concluir(chave, chamada)
@@ -0,0 +1,297 @@
+import os
+import threading
+import time
+from typing import List
+
+from sqlalchemy import select, update, case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from logger import logger
+from model import engine, LimiteServico, DisjuntorServico
+
+
+# configuracoes do disjuntor, ajustaveis por variaveis de ambiente
+DISJUNTOR_FALHAS = int(os.getenv('DISJUNTOR_FALHAS') or 5)
+DISJUNTOR_TEMPO_ABERTO = float(os.getenv('DISJUNTOR_TEMPO_ABERTO') or 30)
+
+# espera maxima, em segundos, por uma ficha antes de recusar a requisicao
+LIMITE_ESPERA_MAXIMA = float(os.getenv('LIMITE_ESPERA_MAXIMA') or 1)
+
+
+class ServicoIndisponivel(Exception):
+    """
+    Excecao lancada quando uma requisicao a uma API externa e recusada
+    localmente, sem ser enviada, pelo limite de requisicoes ou pelo disjuntor
+    """
+
+    def __init__(self, servico: str, motivo: str):
+        super().__init__("%s indisponivel: %s" % (servico, motivo))
+        self.servico = servico
+        self.motivo = motivo
+
+
+class LimiteRequisicoes:
+    """
+    Limite de requisicoes por balde de fichas (token bucket)
+
+    O balde guarda ate `capacidade` fichas e e reabastecido a `taxa` fichas
+    por segundo. O estado fica no bd, de modo que todos os processos da
+    aplicacao compartilham o mesmo limite; cada consumo e um unico UPDATE
+    condicional, atomico no SQLite.
+    """
+
+    def __init__(self, nome: str, taxa: float, capacidade: float):
+        """
+        Cria um novo limite
+
+        Argumentos:
+            nome : identificador do limite no bd
+            taxa : fichas adicionadas por segundo
+            capacidade : quantidade maxima de fichas acumuladas
+
+        """
+        self.nome = nome
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._inicializado = False
+
+    def consumir(self, quantidade: float = 1):
+        """
+        Consome fichas do balde
+
+        Retorna se havia fichas suficientes.
+        """
+        agora = time.time()
+        tabela = LimiteServico.__table__
+
+        with engine.begin() as conexao:
+            if not self._inicializado:
+                conexao.execute(sqlite_insert(tabela).values(
+                    nome=self.nome, fichas=self.capacidade, atualizado_em=agora
+                ).on_conflict_do_nothing())
+
+            disponiveis = func.min(self.capacidade,
+                                   tabela.c.fichas + (agora - tabela.c.atualizado_em) * self.taxa)
+            resultado = conexao.execute(
+                update(tabela)
+                .where(tabela.c.nome == self.nome, disponiveis >= quantidade)
+                .values(fichas=disponiveis - quantidade, atualizado_em=agora))
+
+        # marcado apos o commit, para que as demais threads so deixem de
+        # inserir o registro quando ele ja estiver visivel para elas
+        self._inicializado = True
+        return resultado.rowcount == 1
+
+    def espera(self, quantidade: float = 1):
+        """
+        Retorna o tempo, em segundos, ate que o balde tenha fichas suficientes
+        """
+        tabela = LimiteServico.__table__
+        with engine.connect() as conexao:
+            fichas, atualizado_em = conexao.execute(
+                select(tabela.c.fichas, tabela.c.atualizado_em)
+                .where(tabela.c.nome == self.nome)).one()
+
+        disponiveis = min(self.capacidade, fichas + (time.time() - atualizado_em) * self.taxa)
+        return max(0.0, (quantidade - disponiveis) / self.taxa)
+
+
+class Disjuntor:
+    """
+    Disjuntor (circuit breaker) de uma API externa
+
+    Apos `limite_falhas` falhas consecutivas o disjuntor abre e as
+    requisicoes sao recusadas durante `tempo_aberto` segundos. Em seguida uma
+    unica requisicao de teste e liberada: se tiver sucesso o disjuntor fecha,
+    caso contrario permanece aberto por mais um periodo. O estado fica no bd e
+    e compartilhado por todos os processos da aplicacao.
+    """
+
+    def __init__(self, servico: str, limite_falhas: int, tempo_aberto: float):
+        """
+        Cria um novo disjuntor
+
+        Argumentos:
+            servico : nome da API externa
+            limite_falhas : falhas consecutivas que abrem o disjuntor
+            tempo_aberto : tempo, em segundos, em que o disjuntor fica aberto
+
+        """
+        self.servico = servico
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._inicializado = False
+
+    def _inicializar(self, conexao):
+        # o registro e inserido, se necessario, ate o commit de uma transacao,
+        # pois antes dele nao e visivel para as demais threads
+        if not self._inicializado:
+            conexao.execute(sqlite_insert(DisjuntorServico.__table__).values(
+                servico=self.servico, falhas=0, aberto_ate=0
+            ).on_conflict_do_nothing())
+
+    def permite(self):
+        """
+        Retorna se uma requisicao pode ser enviada
+        """
+        agora = time.time()
+        tabela = DisjuntorServico.__table__
+
+        with engine.begin() as conexao:
+            self._inicializar(conexao)
+
+            falhas, aberto_ate = conexao.execute(
+                select(tabela.c.falhas, tabela.c.aberto_ate)
+                .where(tabela.c.servico == self.servico)).one()
+
+            if falhas < self.limite_falhas:
+                permitida = True
+            elif aberto_ate > agora:
+                permitida = False
+            else:
+                # libera uma unica requisicao de teste, mantendo as demais recusadas
+                permitida = conexao.execute(
+                    update(tabela)
+                    .where(tabela.c.servico == self.servico, tabela.c.aberto_ate <= agora)
+                    .values(aberto_ate=agora + self.tempo_aberto)).rowcount == 1
+
+        self._inicializado = True
+        return permitida
+
+    def registra_sucesso(self):
+        """
+        Fecha o disjuntor apos uma requisicao bem sucedida
+        """
+        tabela = DisjuntorServico.__table__
+        with engine.begin() as conexao:
+            conexao.execute(
+                update(tabela)
+                .where(tabela.c.servico == self.servico, tabela.c.falhas > 0)
+                .values(falhas=0, aberto_ate=0))
+
+    def registra_falha(self):
+        """
+        Contabiliza uma falha, abrindo o disjuntor ao atingir o limite
+        """
+        agora = time.time()
+        tabela = DisjuntorServico.__table__
+
+        with engine.begin() as conexao:
+            self._inicializar(conexao)
+            resultado = conexao.execute(
+                update(tabela)
+                .where(tabela.c.servico == self.servico)
+                .values(falhas=tabela.c.falhas + 1,
+                        aberto_ate=case(
+                            (tabela.c.falhas + 1 >= self.limite_falhas, agora + self.tempo_aberto),
+                            else_=tabela.c.aberto_ate))
+                .returning(tabela.c.falhas))
+            falhas = resultado.scalar_one()
+
+        self._inicializado = True
+        if falhas == self.limite_falhas:
+            logger.warning("Disjuntor de %s aberto apos %s falhas consecutivas", self.servico, falhas)
+
+    def abre(self):
+        """
+        Abre o disjuntor imediatamente, sem aguardar o limite de falhas, como
+        quando a cota da API externa se esgota
+        """
+        agora = time.time()
+        tabela = DisjuntorServico.__table__
+
+        with engine.begin() as conexao:
+            self._inicializar(conexao)
+            conexao.execute(
+                update(tabela)
+                .where(tabela.c.servico == self.servico)
+                .values(falhas=func.max(tabela.c.falhas, self.limite_falhas),
+                        aberto_ate=agora + self.tempo_aberto))
+
+        self._inicializado = True
+        logger.warning("Disjuntor de %s aberto, cota da API esgotada", self.servico)
+
+
+class ProtecaoServico:
+    """
+    Combina os limites de requisicoes e o disjuntor de uma API externa
+
+    Usada pelos clientes http a cada tentativa de requisicao. Erros no acesso
+    ao bd nao impedem as requisicoes. As requisicoes autorizadas pelo
+    processo sao contabilizadas em `requisicoes`.
+    """
+
+    def __init__(self, servico: str, limites: List[LimiteRequisicoes], disjuntor: Disjuntor):
+        self.servico = servico
+        self.limites = limites
+        self.disjuntor = disjuntor
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+
+    def autorizar(self):
+        """
+        Autoriza o envio de uma requisicao, consumindo uma ficha de cada
+        limite
+
+        Lanca ServicoIndisponivel se o disjuntor estiver aberto ou algum
+        limite estiver esgotado por mais de LIMITE_ESPERA_MAXIMA segundos.
+        """
+        try:
+            if not self.disjuntor.permite():
+                raise ServicoIndisponivel(self.servico, "disjuntor aberto")
+
+            prazo = time.monotonic() + LIMITE_ESPERA_MAXIMA
+            for limite in self.limites:
+                # aguarda as proximas fichas apenas enquanto estiver dentro do prazo,
+                # ja que outras requisicoes podem consumi-las antes
+                while not limite.consumir():
+                    espera = limite.espera()
+                    if time.monotonic() + espera > prazo:
+                        raise ServicoIndisponivel(self.servico, "limite %s esgotado" % limite.nome)
+                    time.sleep(espera)
+        except SQLAlchemyError as e:
+            logger.warning("Erro ao consultar limites de %s %s", self.servico, {e})
+
+        with self._lock:
+            self.requisicoes += 1
+
+    def registrar(self, sucesso: bool):
+        """
+        Registra o resultado de uma requisicao no disjuntor
+        """
+        try:
+            if sucesso:
+                self.disjuntor.registra_sucesso()
+            else:
+                self.disjuntor.registra_falha()
+        except SQLAlchemyError as e:
+            logger.warning("Erro ao registrar resultado de %s %s", self.servico, {e})
+
+    def registrar_cota_esgotada(self, status_code: int):
+        """
+        Registra a recusa de uma requisicao pela cota esgotada da API,
+        abrindo o disjuntor para que as proximas sejam recusadas localmente
+
+        Lanca ServicoIndisponivel, permitindo que o chamador sirva um
+        resultado em cache.
+        """
+        try:
+            self.disjuntor.abre()
+        except SQLAlchemyError as e:
+            logger.warning("Erro ao registrar resultado de %s %s", self.servico, {e})
+
+        raise ServicoIndisponivel(self.servico, "cota esgotada, status %s" % status_code)
+
+
+def cria_protecao(servico: str, por_segundo: float, por_dia: float):
+    """ Cria a protecao de uma API externa com um limite por segundo e,
+        opcionalmente, um limite diario; limites iguais a zero sao ignorados
+    """
+    limites = []
+    if por_segundo > 0:
+        limites.append(LimiteRequisicoes(servico + ":segundo", por_segundo, max(1.0, por_segundo)))
+    if por_dia > 0:
+        limites.append(LimiteRequisicoes(servico + ":dia", por_dia / (60 * 60 * 24), por_dia))
+
+    return ProtecaoServico(servico, limites, Disjuntor(servico, DISJUNTOR_FALHAS, DISJUNTOR_TEMPO_ABERTO))
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import re
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import combinations
+
+from sqlalchemy import select
+
+from logger import logger
+from model import SessionFactory, Refeicao, BuscaReceita
+from services.receita import (RECEITA_RESULTADOS_POR_BUSCA, normaliza_busca, gera_chave_receita,
+                              consulta_resultados_armazenados, buscar_receitas_em_cache_assincrona,
+                              protecao_spoonacular)
+from services.traducao import normaliza_termo, separa_termos, protecao_google
+
+
+# horario, em horas locais, em que o preaquecimento e executado no modo continuo
+PREAQUECIMENTO_HORARIO_INICIO = int(os.getenv('PREAQUECIMENTO_HORARIO_INICIO') or 2)
+PREAQUECIMENTO_HORARIO_FIM = int(os.getenv('PREAQUECIMENTO_HORARIO_FIM') or 6)
+
+# quantidade maxima de buscas na API Spoonacular feitas pelo preaquecimento
+# por dia, reservando o restante do limite diario para as buscas interativas
+PREAQUECIMENTO_ORCAMENTO = int(os.getenv('PREAQUECIMENTO_ORCAMENTO') or 20)
+
+# quantidade maxima de requisicoes a API Google Translate feitas pelo
+# preaquecimento por dia, para traduzir os ingredientes e as receitas
+PREAQUECIMENTO_ORCAMENTO_TRADUCOES = int(os.getenv('PREAQUECIMENTO_ORCAMENTO_TRADUCOES') or 60)
+
+# intervalo, em segundos, entre as execucoes do modo continuo
+PREAQUECIMENTO_INTERVALO = int(os.getenv('PREAQUECIMENTO_INTERVALO') or 600)
+
+# periodo, em dias, das buscas e refeicoes consideradas
+PREAQUECIMENTO_DIAS = int(os.getenv('PREAQUECIMENTO_DIAS') or 30)
+
+# quantidade de receitas traduzidas por busca preaquecida, equivalente as
+# primeiras paginas vistas pelos usuarios
+PREAQUECIMENTO_RECEITAS = int(os.getenv('PREAQUECIMENTO_RECEITAS') or 5)
+
+# tipo de prato das buscas montadas a partir dos alimentos das refeicoes
+PREAQUECIMENTO_TIPO_PRATO = os.getenv('PREAQUECIMENTO_TIPO_PRATO') or ""
+
+# quantidade minima de refeicoes em cujos comentarios uma palavra deve
+# aparecer para ser considerada um alimento, mesmo que nunca buscado
+PREAQUECIMENTO_REFEICOES_ALIMENTO = int(os.getenv('PREAQUECIMENTO_REFEICOES_ALIMENTO') or 3)
+
+# palavras frequentes nos comentarios das refeicoes que nao sao alimentos
+PALAVRAS_IGNORADAS = {
+    "com", "sem", "para", "pra", "pelo", "pela", "que", "não", "nao", "muito", "muita", "pouco", "pouca",
+    "pouquinho", "bem", "mais", "menos", "mas", "tudo", "nada", "todo", "toda", "hoje", "ontem", "dia",
+    "uma", "uns", "umas", "dos", "das", "nos", "nas", "ele", "ela", "dele", "dela", "foi", "era", "estava",
+    "está", "esta", "quis", "come", "comer", "comeu", "gostou", "aceitou", "recusou", "tomou", "bebeu",
+    "depois", "antes", "ainda", "também", "quando", "porque", "como", "metade", "pedaço", "pedaços",
+    "colher", "colheres", "prato", "bastante", "sobrou", "vez", "vezes", "primeira", "bebê",
+}
+
+
+def _texto_busca(texto: str):
+    """ Normaliza um texto para a busca de termos como palavras inteiras
+    """
+    return " %s " % " ".join(re.sub(r"[^\w]+", " ", normaliza_termo(texto)).split())
+
+
+def buscas_frequentes(desde: datetime):
+    """ Retorna os parametros normalizados das buscas feitas pelos usuarios
+        desde a data, com a quantidade de vezes que foram feitas
+    """
+    session = SessionFactory()
+    try:
+        linhas = session.execute(
+            select(BuscaReceita.ingredientes, BuscaReceita.excluir_ingredientes, BuscaReceita.tipo_prato,
+                   BuscaReceita.quantidade).where(
+                BuscaReceita.ultima_busca >= desde, BuscaReceita.quantidade > 0,
+                BuscaReceita.ingredientes.is_not(None))).all()
+    finally:
+        session.close()
+
+    return Counter({(ingredientes, excluir_ingredientes or "", tipo_prato or ""): quantidade
+                    for ingredientes, excluir_ingredientes, tipo_prato, quantidade in linhas})
+
+
+def alimentos_frequentes(desde: date, tipo_prato: str = PREAQUECIMENTO_TIPO_PRATO,
+                         minimo_refeicoes: int = PREAQUECIMENTO_REFEICOES_ALIMENTO):
+    """ Retorna os parametros das buscas formadas pelos alimentos registrados
+        nos comentarios das refeicoes desde a data, com a quantidade de
+        refeicoes em que aparecem
+
+        Sao considerados alimentos os ingredientes incluidos nas buscas feitas
+        pelos usuarios e as palavras presentes nos comentarios de pelo menos
+        minimo_refeicoes refeicoes, exceto as PALAVRAS_IGNORADAS e as que
+        fazem parte de ingredientes incluidos ou excluidos nas buscas; cada
+        alimento e cada par de alimentos de uma mesma refeicao formam uma
+        busca.
+    """
+    session = SessionFactory()
+    try:
+        buscas = session.execute(
+            select(BuscaReceita.ingredientes, BuscaReceita.excluir_ingredientes).distinct().where(
+                BuscaReceita.quantidade > 0, BuscaReceita.ingredientes.is_not(None))).all()
+        comentarios = session.execute(
+            select(Refeicao.comentarios).where(
+                Refeicao.diario >= desde, Refeicao.comentarios.is_not(None))).scalars().all()
+    finally:
+        session.close()
+
+    termos = {termo: _texto_busca(termo) for ingredientes, _ in buscas for termo in separa_termos(ingredientes)}
+    termos = {termo: texto for termo, texto in termos.items() if texto.strip()}
+    conhecidas = {palavra for ingredientes, excluir_ingredientes in buscas
+                  for termo in separa_termos("%s,%s" % (ingredientes, excluir_ingredientes or ""))
+                  for palavra in _texto_busca(termo).split()}
+
+    textos = [_texto_busca(comentario) for comentario in comentarios]
+
+    # alimentos registrados nas refeicoes que ainda nao foram buscados
+    recorrentes = Counter(palavra for texto in textos for palavra in set(texto.split()))
+    for palavra, quantidade in recorrentes.items():
+        if (quantidade >= minimo_refeicoes and len(palavra) > 2 and not palavra.isdigit()
+                and palavra not in PALAVRAS_IGNORADAS and palavra not in conhecidas):
+            termos[palavra] = " %s " % palavra
+
+    contagens = Counter()
+    for texto in textos:
+        alimentos = sorted(termo for termo, procurado in termos.items() if procurado in texto)
+        for quantidade in (1, 2):
+            for combinacao in combinations(alimentos, quantidade):
+                contagens[normaliza_busca(", ".join(combinacao), "", tipo_prato)] += 1
+
+    return contagens
+
+
+def candidatas(dias: int = PREAQUECIMENTO_DIAS):
+    """ Retorna os parametros normalizados das buscas a preaquecer, das mais
+        as menos frequentes
+    """
+    contagens = buscas_frequentes(datetime.now() - timedelta(days=dias))
+    contagens.update(alimentos_frequentes(date.today() - timedelta(days=dias)))
+
+    return [busca for busca, _ in contagens.most_common()]
+
+
+def executa_preaquecimento(orcamento: int = PREAQUECIMENTO_ORCAMENTO,
+                           orcamento_traducoes: int = PREAQUECIMENTO_ORCAMENTO_TRADUCOES,
+                           receitas: int = PREAQUECIMENTO_RECEITAS):
+    """ Preaquece as buscas mais frequentes: obtem os resultados da API
+        Spoonacular e traduz as primeiras receitas, armazenando ambos no bd
+
+        O orcamento limita as requisicoes a API Spoonacular e o
+        orcamento_traducoes as requisicoes a API Google Translate, contadas
+        pelas protecoes das APIs no processo; por isso o preaquecimento deve
+        ser executado fora dos processos do servidor. Buscas com resultados
+        armazenados recentemente nao consomem o orcamento da API Spoonacular.
+        A execucao e interrompida quando um dos orcamentos acaba ou as APIs
+        externas recusam as requisicoes; a ultima busca pode excede-los em
+        algumas requisicoes.
+
+        Retorna as quantidades de buscas preaquecidas, de requisicoes a cada
+        API e de falhas.
+    """
+    estatisticas = {"preaquecidas": 0, "buscas_api": 0, "traducoes_api": 0, "falhas": 0}
+    receitas = min(receitas, RECEITA_RESULTADOS_POR_BUSCA)
+    inicio_buscas, inicio_traducoes = protecao_spoonacular.requisicoes, protecao_google.requisicoes
+
+    for busca in candidatas():
+        if estatisticas["traducoes_api"] >= orcamento_traducoes:
+            break
+        armazenada = consulta_resultados_armazenados(gera_chave_receita(*busca)) is not None
+        if not armazenada and estatisticas["buscas_api"] >= orcamento:
+            break
+
+        _, status_code = asyncio.run(buscar_receitas_em_cache_assincrona(*busca, 0, receitas, registrar=False))
+        estatisticas["buscas_api"] = protecao_spoonacular.requisicoes - inicio_buscas
+        estatisticas["traducoes_api"] = protecao_google.requisicoes - inicio_traducoes
+
+        if status_code == 200:
+            estatisticas["preaquecidas"] += 1
+        elif status_code == 503:
+            logger.warning("Preaquecimento de receitas interrompido, APIs externas indisponiveis")
+            break
+        else:
+            estatisticas["falhas"] += 1
+
+    logger.warning("Preaquecimento de receitas concluido %s", estatisticas)
+    return estatisticas
+
+
+def fora_de_pico(agora: datetime, inicio: int = PREAQUECIMENTO_HORARIO_INICIO,
+                 fim: int = PREAQUECIMENTO_HORARIO_FIM):
+    """ Retorna se o horario esta no periodo de preaquecimento, que pode
+        atravessar a meia-noite
+    """
+    if inicio <= fim:
+        return inicio <= agora.hour < fim
+    return agora.hour >= inicio or agora.hour < fim
+
+
+def preaquece_continuamente(orcamento: int = PREAQUECIMENTO_ORCAMENTO,
+                            orcamento_traducoes: int = PREAQUECIMENTO_ORCAMENTO_TRADUCOES,
+                            intervalo: int = PREAQUECIMENTO_INTERVALO):
+    """ Executa o preaquecimento periodicamente durante o periodo fora de
+        pico, respeitando os orcamentos diarios de requisicoes as APIs
+        Spoonacular e Google Translate
+    """
+    dia, gasto, gasto_traducoes = None, 0, 0
+    while True:
+        agora = datetime.now()
+        if agora.date() != dia:
+            dia, gasto, gasto_traducoes = agora.date(), 0, 0
+
+        if fora_de_pico(agora) and gasto < orcamento and gasto_traducoes < orcamento_traducoes:
+            try:
+                estatisticas = executa_preaquecimento(orcamento - gasto, orcamento_traducoes - gasto_traducoes)
+                gasto += estatisticas["buscas_api"]
+                gasto_traducoes += estatisticas["traducoes_api"]
+            except Exception as e:
+                logger.warning("Erro ao preaquecer receitas %s", {e})
+
+        time.sleep(intervalo)
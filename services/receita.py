@@ -0,0 +1,500 @@
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
+
+from logger import logger
+from model import SessionFactory, Receita, BuscaReceita
+from schemas.receita import retorna_lista_receitas, segmentos_receita, organiza_estrutura_receita, retorna_receita
+from services.cache import CacheRevalidavel
+from services.coalescencia import CoalescenciaChamadas
+from services.cliente_http import cliente_http_assincrono
+from services.limitador import ServicoIndisponivel, cria_protecao
+from services.registro_buscas import RegistroBuscas
+from services.traducao import realizar_traducao_lote_assincrona, separa_termos, traduzir_termos_assincrona
+
+
+SPOONACULAR_URL = "https://api.spoonacular.com/recipes/complexSearch"
+
+# limites do cache de receitas, configuraveis por variaveis de ambiente
+RECEITA_CACHE_TAMANHO = int(os.getenv('RECEITA_CACHE_TAMANHO') or 256)
+RECEITA_CACHE_TTL = int(os.getenv('RECEITA_CACHE_TTL') or 60 * 60)
+RECEITA_CACHE_TTL_OBSOLETO = int(os.getenv('RECEITA_CACHE_TTL_OBSOLETO') or 60 * 60 * 24)
+
+# quantidade de receitas obtidas da API Spoonacular em cada busca; as
+# receitas sao mantidas sem traducao no cache e traduzidas por pagina
+RECEITA_RESULTADOS_POR_BUSCA = int(os.getenv('RECEITA_RESULTADOS_POR_BUSCA') or 10)
+
+# maior offset aceito pela API Spoonacular; os resultados alem dele nao
+# podem ser obtidos e nao sao contabilizados no total
+SPOONACULAR_OFFSET_MAXIMO = 900
+
+# tempo, em segundos, em que os resultados de uma busca armazenados no bd sao
+# reutilizados por todos os processos antes de consultar novamente a API
+RECEITA_RESULTADOS_TTL_BANCO = int(os.getenv('RECEITA_RESULTADOS_TTL_BANCO') or 60 * 60 * 24)
+
+# tempo, em segundos, em que os resultados e as buscas sao mantidos no bd,
+# e intervalo minimo entre as remocoes dos antigos
+RECEITA_RESULTADOS_RETENCAO = int(os.getenv('RECEITA_RESULTADOS_RETENCAO') or 60 * 60 * 24 * 30)
+RECEITA_RESULTADOS_INTERVALO_LIMPEZA = int(os.getenv('RECEITA_RESULTADOS_INTERVALO_LIMPEZA') or 60 * 60)
+
+# intervalo, em segundos, entre as gravacoes no bd das buscas contabilizadas
+RECEITA_BUSCAS_INTERVALO_GRAVACAO = int(os.getenv('RECEITA_BUSCAS_INTERVALO_GRAVACAO') or 60)
+
+# limites de requisicoes a API, por segundo e por dia (0 desativa o limite)
+SPOONACULAR_LIMITE_SEGUNDO = float(os.getenv('SPOONACULAR_LIMITE_SEGUNDO') or 1)
+SPOONACULAR_LIMITE_DIA = float(os.getenv('SPOONACULAR_LIMITE_DIA') or 150)
+
+protecao_spoonacular = cria_protecao("spoonacular", SPOONACULAR_LIMITE_SEGUNDO, SPOONACULAR_LIMITE_DIA)
+
+# resultados das buscas, ainda sem traducao, por chave normalizada da busca
+cache_receitas = CacheRevalidavel(RECEITA_CACHE_TAMANHO, RECEITA_CACHE_TTL, RECEITA_CACHE_TTL_OBSOLETO)
+
+# buscas identicas simultaneas compartilham uma unica ida as APIs externas
+coalescencia_receitas = CoalescenciaChamadas()
+
+# buscas feitas pelos usuarios, gravadas em lote, e retencao dos resultados
+registro_buscas = RegistroBuscas(RECEITA_BUSCAS_INTERVALO_GRAVACAO, RECEITA_RESULTADOS_RETENCAO,
+                                 RECEITA_RESULTADOS_INTERVALO_LIMPEZA)
+
+
+def normaliza_ingredientes(ingredientes: str):
+    """ Normaliza uma lista de ingredientes separados por virgula: normaliza
+        cada termo, remove duplicidades e ordena
+    """
+    return ", ".join(sorted(separa_termos(ingredientes)))
+
+
+def normaliza_busca(ingredientes: str, excluir_ingredientes: str, tipo_prato: str):
+    """ Normaliza os parametros de uma busca de receitas
+    """
+    return (normaliza_ingredientes(ingredientes),
+            normaliza_ingredientes(excluir_ingredientes),
+            tipo_prato.strip().lower())
+
+
+def gera_chave_receita(ingredientes: str, excluir_ingredientes: str, tipo_prato: str):
+    """ Gera a chave normalizada de uma busca de receitas
+
+        A chave e a lista JSON dos parametros normalizados, para que nenhum
+        caractere digitado nos parametros torne duas buscas diferentes
+        indistinguiveis.
+    """
+    return json.dumps(normaliza_busca(ingredientes, excluir_ingredientes, tipo_prato), ensure_ascii=False)
+
+
+def gera_chave_lote(chave: str, lote: int):
+    """ Gera a chave dos resultados de um lote de uma busca
+
+        Os resultados sao obtidos da API Spoonacular em lotes de
+        RECEITA_RESULTADOS_POR_BUSCA receitas; o primeiro lote usa a propria
+        chave da busca.
+    """
+    return chave if lote == 0 else "%s#%s" % (chave, lote)
+
+
+def _parametros_spoonacular(ingredientes: str, excluir_ingredientes: str, tipo_prato: str, lote: int):
+    """ Retorna os parametros da busca de um lote na API Spoonacular, com os
+        ingredientes ja traduzidos para ingles
+    """
+    return {
+        "apiKey": os.getenv('SPOONACULAR_API_KEY'),
+        "includeIngredients": ingredientes,
+        "excludeIngredients": excluir_ingredientes,
+        "number": RECEITA_RESULTADOS_POR_BUSCA,
+        "offset": lote * RECEITA_RESULTADOS_POR_BUSCA,
+        "addRecipeInformation": True,
+        "fillIngredients": True,
+        "addRecipeInstructions": True,
+        "type": tipo_prato
+    }
+
+
+def _traducoes_por_receita(receitas: list, segmentos: list):
+    """ Separa os segmentos traduzidos de uma pagina por receita e estrutura
+        as receitas traduzidas para enviar para o frontend
+    """
+    traduzidas = []
+    inicio = 0
+    for receita in receitas:
+        fim = inicio + len(segmentos_receita(receita))
+        traduzidas.append(organiza_estrutura_receita(receita, segmentos[inicio:fim]))
+        inicio = fim
+
+    return traduzidas
+
+
+def hash_receita(receita: dict):
+    """ Retorna o hash do conteudo original (sem traducao) de uma receita
+        estruturada
+    """
+    conteudo = json.dumps([receita.get("titulo"), receita.get("passos"), receita.get("ingredientes")],
+                          ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def consulta_receitas_armazenadas(receitas: list):
+    """ Retorna as traducoes armazenadas das receitas, por id, apenas para as
+        receitas cujo conteudo original nao mudou desde a traducao
+    """
+    hashes = {receita.get("id"): hash_receita(receita) for receita in receitas if receita.get("id") is not None}
+    if not hashes:
+        return {}
+
+    try:
+        session = SessionFactory()
+        try:
+            armazenadas = session.execute(
+                select(Receita).options(selectinload(Receita.ingredientes))
+                .where(Receita.id.in_(hashes))).scalars().all()
+            return {receita.id: retorna_receita(receita) for receita in armazenadas
+                    if receita.hash_conteudo == hashes[receita.id]}
+        finally:
+            session.close()
+    except Exception as e:
+        # o armazenamento nao deve impedir a busca
+        logger.warning("Erro ao consultar receitas armazenadas %s", {e})
+        return {}
+
+
+def armazena_receitas(receitas: list, traduzidas: list):
+    """ Armazena as traducoes das receitas, substituindo traducoes anteriores
+    """
+    try:
+        session = SessionFactory()
+        try:
+            for receita, traduzida in zip(receitas, traduzidas):
+                if receita.get("id") is None:
+                    continue
+
+                armazenada = session.get(Receita, receita.get("id")) or Receita(receita.get("id"))
+                armazenada.atualiza_traducao(hash_receita(receita), traduzida.get("titulo"),
+                                             traduzida.get("instrucoes"), traduzida.get("ingredientes"))
+                session.add(armazenada)
+            session.commit()
+        finally:
+            session.close()
+    except Exception as e:
+        logger.warning("Erro ao armazenar receitas %s", {e})
+
+
+def consulta_resultados_armazenados(chave: str, ttl: float = RECEITA_RESULTADOS_TTL_BANCO):
+    """ Retorna o lote de resultados armazenado de uma busca, obtido ha menos
+        de ttl segundos (sem limite se ttl for None), ou None
+    """
+    try:
+        session = SessionFactory()
+        try:
+            consulta = select(BuscaReceita.resultados, BuscaReceita.total_resultados).where(
+                BuscaReceita.chave == chave, BuscaReceita.resultados.is_not(None))
+            if ttl is not None:
+                consulta = consulta.where(BuscaReceita.data_resultados >= datetime.now() - timedelta(seconds=ttl))
+            linha = session.execute(consulta).first()
+        finally:
+            session.close()
+    except Exception as e:
+        logger.warning("Erro ao consultar resultados de receitas armazenados %s", {e})
+        return None
+
+    if linha is None:
+        return None
+
+    receitas = json.loads(linha.resultados)
+    # resultados armazenados antes da coluna total_resultados
+    total = linha.total_resultados if linha.total_resultados is not None else len(receitas)
+    return {"receitas": receitas, "total": total}
+
+
+def armazena_resultados(chave: str, resultados: dict):
+    """ Armazena um lote de resultados, sem traducao, de uma busca
+    """
+    try:
+        session = SessionFactory()
+        try:
+            tabela = BuscaReceita.__table__
+            comando = sqlite_insert(tabela).values(
+                chave=chave, quantidade=0, resultados=json.dumps(resultados["receitas"], ensure_ascii=False),
+                total_resultados=resultados["total"], data_resultados=datetime.now())
+            session.execute(comando.on_conflict_do_update(
+                index_elements=[tabela.c.chave],
+                set_={"resultados": comando.excluded.resultados,
+                      "total_resultados": comando.excluded.total_resultados,
+                      "data_resultados": comando.excluded.data_resultados}))
+            registro_buscas.remove_antigos(session)
+            session.commit()
+        finally:
+            session.close()
+    except Exception as e:
+        logger.warning("Erro ao armazenar resultados de receitas %s", {e})
+
+
+def _erro_traducao_parametros():
+    error_msg = "Não foi possível traduzir os ingredientes"
+    logger.warning(
+        "Erro ao buscar receitas %s", error_msg)
+    return {"message": error_msg}, 404
+
+
+def _erro_requisicao(status_code: int):
+    error_msg = "Não foi possível realizar a requisição :/"
+    logger.warning(
+        "Erro ao realizar a requisição, status %s", status_code)
+    return {"message": error_msg}, 400
+
+
+def _erro_indisponivel(erro: ServicoIndisponivel):
+    logger.warning("Erro ao buscar receitas %s", erro)
+    return {"message": "Serviço de receitas temporariamente indisponível"}, 503
+
+
+def _erro_sem_receita():
+    error_msg = "Não foi possível realizar a requisição :/"
+    logger.warning(
+        "Erro ao realizar a requisição %s", "nenhuma receita encontrada")
+    return {"message": error_msg}, 400
+
+
+def _resultados_obsoletos(chave: str, erro: ServicoIndisponivel):
+    """ Retorna os resultados em cache de uma busca recusada pela protecao
+        das APIs externas, mesmo que expirados, ou propaga o erro
+    """
+    resultados = cache_receitas.obter_item(chave)
+    if resultados is None:
+        resultados = consulta_resultados_armazenados(chave, ttl=None)
+    if resultados is None:
+        raise erro
+
+    logger.warning("Servindo resultados de receitas em cache, %s", erro)
+    return resultados, 200
+
+
+def _monta_pagina(receitas: list, total: int, offset: int, limit: int):
+    return {"receitas": receitas, "total": total, "offset": offset, "limit": limit}, 200
+
+
+def _lote_resultados(dados: dict, lote: int):
+    """ Estrutura a resposta da API Spoonacular em um lote de resultados, com
+        as receitas e o total de receitas da busca
+    """
+    receitas = retorna_lista_receitas(dados.get("results"))
+    total = dados.get("totalResults")
+    if total is None:
+        total = lote * RECEITA_RESULTADOS_POR_BUSCA + len(receitas)
+
+    limite = (SPOONACULAR_OFFSET_MAXIMO // RECEITA_RESULTADOS_POR_BUSCA + 1) * RECEITA_RESULTADOS_POR_BUSCA
+    return {"receitas": receitas, "total": min(total, limite)}
+
+
+def _lotes_pagina(offset: int, limit: int, total: int):
+    """ Retorna os lotes de resultados que contem a pagina, limitados ao total
+    """
+    fim = min(offset + limit, total)
+    return range(offset // RECEITA_RESULTADOS_POR_BUSCA, (fim - 1) // RECEITA_RESULTADOS_POR_BUSCA + 1)
+
+
+def _recorta_pagina(lotes: dict, offset: int, limit: int):
+    """ Retorna as receitas da pagina a partir dos lotes obtidos, por numero
+        do lote
+    """
+    receitas = []
+    for lote, resultados in sorted(lotes.items()):
+        inicio = lote * RECEITA_RESULTADOS_POR_BUSCA
+        receitas.extend(resultados["receitas"][max(offset - inicio, 0):max(offset + limit - inicio, 0)])
+    return receitas
+
+
+async def buscar_receitas_externas_assincrona(ingredientes: str, excluir_ingredientes: str, tipo_prato: str,
+                                              lote: int = 0):
+    """Busca um lote de receitas na API Spoonacular, sem traduzi-las
+
+    As traducoes dos ingredientes e dos ingredientes excluidos sao
+    independentes e feitas de forma concorrente, termo a termo, e as
+    requisicoes as APIs externas sao aguardadas sem bloquear o event loop.
+
+    Retorna o lote de resultados (receitas estruturadas e total de receitas
+    da busca) e o status code.
+    """
+    traducoes = await asyncio.gather(
+        traduzir_termos_assincrona([ingredientes], "pt-BR", "en"),
+        traduzir_termos_assincrona([excluir_ingredientes], "pt-BR", "en"))
+
+    if any(status_code != 200 for _, status_code in traducoes):
+        return _erro_traducao_parametros()
+
+    params = _parametros_spoonacular(*(traduzido[0] for traduzido, _ in traducoes), tipo_prato, lote)
+
+    logger.debug("Requisitando receitas, lote %s", lote)
+    resposta = await cliente_http_assincrono.get(SPOONACULAR_URL, params=params, protecao=protecao_spoonacular)
+
+    if resposta.status_code != 200:
+        return _erro_requisicao(resposta.status_code)
+
+    #estrutura o retorno da request
+    resultados = _lote_resultados(resposta.json(), lote)
+
+    if not resultados["receitas"] and lote == 0:
+        return _erro_sem_receita()
+
+    return resultados, 200
+
+
+async def carrega_resultados_assincrona(chave: str, busca: tuple, lote: int = 0):
+    """Obtem um lote de resultados de uma busca, sem traducao, a partir dos
+    resultados armazenados no bd ou da API Spoonacular, armazenando-os
+
+    Argumentos:
+        chave : chave do lote, como em gera_chave_lote
+        busca : parametros normalizados da busca, como em normaliza_busca
+        lote : numero do lote de resultados
+
+    Retorna o lote de resultados e o status code.
+    """
+    resultados = await asyncio.to_thread(consulta_resultados_armazenados, chave)
+    if resultados is not None:
+        return resultados, 200
+
+    resultados, status_code = await buscar_receitas_externas_assincrona(*busca, lote)
+    if status_code == 200:
+        await asyncio.to_thread(armazena_resultados, chave, resultados)
+
+    return resultados, status_code
+
+
+def _junta_receitas(receitas: list, armazenadas: dict, traduzidas: list):
+    """ Monta a lista de receitas traduzidas na ordem original, a partir das
+        receitas armazenadas e das traduzidas agora, na ordem das pendentes
+    """
+    novas = iter(traduzidas)
+    return [armazenadas[receita.get("id")] if receita.get("id") in armazenadas else next(novas)
+            for receita in receitas]
+
+
+async def traduzir_receitas_assincrona(receitas: list):
+    """Traduz uma lista de receitas estruturadas para portugues
+
+    Receitas ja armazenadas, com o mesmo conteudo original, sao servidas do
+    bd. Nas demais, o titulo, cada passo e cada ingrediente sao traduzidos
+    como textos independentes, em blocos paralelos, remontados pela sua
+    posicao e armazenados.
+
+    Retorna a lista de receitas traduzidas e o status code.
+    """
+    armazenadas = await asyncio.to_thread(consulta_receitas_armazenadas, receitas)
+    pendentes = [receita for receita in receitas if receita.get("id") not in armazenadas]
+
+    if pendentes:
+        segmentos, status_code = await realizar_traducao_lote_assincrona(
+            [segmento for receita in pendentes for segmento in segmentos_receita(receita)], "en", "pt-BR")
+
+        if status_code != 200:
+            return segmentos, status_code
+
+        traduzidas = _traducoes_por_receita(pendentes, segmentos)
+        await asyncio.to_thread(armazena_receitas, pendentes, traduzidas)
+    else:
+        traduzidas = []
+
+    return _junta_receitas(receitas, armazenadas, traduzidas), 200
+
+
+async def _obter_lote_assincrono(chave: str, busca: tuple, lote: int):
+    """ Obtem um lote de resultados de uma busca a partir do cache de
+        receitas, servindo resultados expirados caso as APIs externas
+        estejam indisponiveis
+    """
+    chave_lote = gera_chave_lote(chave, lote)
+
+    async def carregar():
+        return await coalescencia_receitas.executar_assincrono(
+            chave_lote, lambda: carrega_resultados_assincrona(chave_lote, busca, lote))
+
+    try:
+        return await cache_receitas.obter_assincrono(chave_lote, carregar)
+    except ServicoIndisponivel as e:
+        return await asyncio.to_thread(_resultados_obsoletos, chave_lote, e)
+
+
+async def obter_resultados_pagina_assincrona(chave: str, busca: tuple, offset: int, limit: int):
+    """ Obtem as receitas, sem traducao, de uma pagina de uma busca
+
+        O primeiro lote de resultados informa o total de receitas da busca;
+        os demais lotes que contem a pagina sao obtidos apenas se estiverem
+        dentro do total, um a um: requisicoes simultaneas disputariam as
+        fichas do limite por segundo da API Spoonacular e seriam recusadas
+        apos LIMITE_ESPERA_MAXIMA segundos.
+
+        Retorna as receitas da pagina e o total de receitas da busca, ou o
+        erro, e o status code.
+    """
+    primeiro, status_code = await _obter_lote_assincrono(chave, busca, 0)
+    if status_code != 200:
+        return primeiro, status_code
+
+    lotes = {0: primeiro}
+    for lote in _lotes_pagina(offset, limit, primeiro["total"]):
+        if lote not in lotes:
+            resultados, status_code = await _obter_lote_assincrono(chave, busca, lote)
+            if status_code != 200:
+                return resultados, status_code
+            lotes[lote] = resultados
+
+    return {"receitas": _recorta_pagina(lotes, offset, limit), "total": primeiro["total"]}, 200
+
+
+async def buscar_receitas_em_cache_assincrona(ingredientes: str, excluir_ingredientes: str, tipo_prato: str,
+                                              offset: int, limit: int, registrar: bool = True):
+    """Busca uma pagina de receitas consultando antes o cache de receitas
+
+    Os resultados da API Spoonacular sao obtidos em lotes, conforme as
+    paginas solicitadas, e mantidos sem traducao no cache; apenas as
+    receitas da pagina solicitada sao traduzidas. Buscas
+    equivalentes (mesmos ingredientes, em qualquer ordem, e mesmo tipo de
+    prato) compartilham os mesmos resultados, tambem armazenados no bd para
+    os demais processos, e buscas equivalentes simultaneas aguardam uma
+    unica requisicao as APIs externas. Quando as APIs externas estao
+    indisponiveis, os resultados em cache sao servidos mesmo que expirados.
+
+    A primeira pagina de cada busca e contabilizada, exceto quando registrar
+    e falso, para identificar as buscas mais frequentes; as contagens sao
+    gravadas no bd em lote, pelo registro_buscas.
+
+    Retorna a pagina de receitas traduzidas e o status code.
+    """
+    busca = normaliza_busca(ingredientes, excluir_ingredientes, tipo_prato)
+    chave = gera_chave_receita(*busca)
+    if registrar and offset == 0:
+        registro_buscas.registrar(chave, busca)
+
+    try:
+        resultados, status_code = await obter_resultados_pagina_assincrona(chave, busca, offset, limit)
+        if status_code != 200:
+            return resultados, status_code
+
+        receitas, status_code = await traduzir_receitas_assincrona(resultados["receitas"])
+    except ServicoIndisponivel as e:
+        return _erro_indisponivel(e)
+
+    if status_code != 200:
+        return receitas, status_code
+
+    return _monta_pagina(receitas, resultados["total"], offset, limit)
+
+
+async def buscar_receita_em_cache_assincrona(ingredientes: str, excluir_ingredientes: str, tipo_prato: str):
+    """Busca a primeira receita de uma busca, consultando antes o cache de
+    receitas
+
+    Retorna a receita estruturada e o status code.
+    """
+    pagina, status_code = await buscar_receitas_em_cache_assincrona(
+        ingredientes, excluir_ingredientes, tipo_prato, 0, 1)
+
+    if status_code != 200:
+        return pagina, status_code
+
+    return pagina["receitas"][0], 200
@@ -0,0 +1,126 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from logger import logger
+from model import SessionFactory, BuscaReceita
+
+
+class RegistroBuscas:
+    """
+    Registro das buscas de receitas na tabela busca_receita
+
+    As buscas feitas pelos usuarios sao contabilizadas em memoria e gravadas
+    no bd em lote, por uma thread em segundo plano, a cada intervalo_gravacao
+    segundos, sem uma escrita no bd a cada requisicao; as contagens pendentes
+    tambem sao gravadas ao encerrar o processo.
+
+    Os resultados armazenados ha mais de retencao segundos sao descartados e
+    as buscas que tambem nao foram feitas nesse periodo sao removidas.
+    """
+
+    def __init__(self, intervalo_gravacao: float, retencao: float, intervalo_limpeza: float):
+        """
+        Cria um novo registro de buscas
+
+        Argumentos:
+            intervalo_gravacao : intervalo, em segundos, entre as gravacoes
+                das contagens no bd
+            retencao : tempo, em segundos, em que os resultados e as buscas
+                sao mantidos no bd
+            intervalo_limpeza : intervalo minimo, em segundos, entre as
+                remocoes dos registros antigos do bd
+
+        """
+        self.intervalo_gravacao = intervalo_gravacao
+        self.retencao = retencao
+        self.intervalo_limpeza = intervalo_limpeza
+        self._pendentes = {}
+        self._proxima_limpeza = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def registrar(self, chave: str, busca: tuple):
+        """
+        Contabiliza uma busca feita por um usuario, com os parametros
+        normalizados da busca
+        """
+        with self._lock:
+            quantidade = self._pendentes.get(chave, (0,))[0]
+            self._pendentes[chave] = (quantidade + 1, datetime.now(), busca)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="registro-buscas", daemon=True)
+                self._thread.start()
+                atexit.register(self.gravar)
+
+    def _executar(self):
+        """
+        Grava as contagens pendentes periodicamente
+        """
+        while True:
+            time.sleep(self.intervalo_gravacao)
+            self.gravar()
+
+    def gravar(self):
+        """
+        Grava no bd as contagens pendentes, em uma unica transacao
+
+        Retorna a quantidade de buscas gravadas.
+        """
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+
+        if not pendentes:
+            return 0
+
+        try:
+            session = SessionFactory()
+            try:
+                tabela = BuscaReceita.__table__
+                comando = sqlite_insert(tabela)
+                session.execute(comando.on_conflict_do_update(
+                    index_elements=[tabela.c.chave],
+                    set_={"quantidade": tabela.c.quantidade + comando.excluded.quantidade,
+                          "ultima_busca": comando.excluded.ultima_busca,
+                          "ingredientes": comando.excluded.ingredientes,
+                          "excluir_ingredientes": comando.excluded.excluir_ingredientes,
+                          "tipo_prato": comando.excluded.tipo_prato}),
+                    [{"chave": chave, "quantidade": quantidade, "ultima_busca": ultima_busca,
+                      "ingredientes": busca[0], "excluir_ingredientes": busca[1], "tipo_prato": busca[2]}
+                     for chave, (quantidade, ultima_busca, busca) in pendentes.items()])
+                self.remove_antigos(session)
+                session.commit()
+            finally:
+                session.close()
+        except Exception as e:
+            logger.warning("Erro ao registrar buscas de receitas %s", {e})
+            return 0
+
+        return len(pendentes)
+
+    def remove_antigos(self, session):
+        """
+        Descarta do bd, na transacao da sessao, os resultados obtidos ha mais
+        de retencao segundos e remove as buscas sem resultados que nao foram
+        feitas nesse periodo, no maximo uma vez a cada intervalo_limpeza
+        segundos
+        """
+        agora = time.monotonic()
+        with self._lock:
+            if agora < self._proxima_limpeza:
+                return
+            self._proxima_limpeza = agora + self.intervalo_limpeza
+
+        limite = datetime.now() - timedelta(seconds=self.retencao)
+        session.execute(
+            update(BuscaReceita).where(BuscaReceita.data_resultados < limite)
+            .values(resultados=None, total_resultados=None, data_resultados=None))
+        session.execute(
+            delete(BuscaReceita).where(
+                BuscaReceita.resultados.is_(None),
+                or_(BuscaReceita.ultima_busca.is_(None), BuscaReceita.ultima_busca < limite)))
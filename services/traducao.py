@@ -0,0 +1,533 @@
+import asyncio
+import os
+import hashlib
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from model import SessionFactory, Traducao, TraducaoTermo
+from logger import logger
+from services.cache import CacheLRU
+from services.cliente_http import cliente_http, cliente_http_assincrono
+from services.coalescencia import CoalescenciaChamadas
+from services.limitador import ServicoIndisponivel, cria_protecao
+
+
+GOOGLE_TRANSLATE_URL = "https://translation.googleapis.com/language/translate/v2"
+
+# limites do cache de traducoes, configuraveis por variaveis de ambiente
+TRADUCAO_CACHE_TAMANHO = int(os.getenv('TRADUCAO_CACHE_TAMANHO') or 1024)
+TRADUCAO_CACHE_TTL = int(os.getenv('TRADUCAO_CACHE_TTL') or 60 * 60 * 24)
+TRADUCAO_CACHE_TTL_BANCO = int(os.getenv('TRADUCAO_CACHE_TTL_BANCO') or 60 * 60 * 24 * 30)
+# intervalo minimo, em segundos, entre as remocoes das traducoes expiradas do bd
+TRADUCAO_CACHE_INTERVALO_LIMPEZA = int(os.getenv('TRADUCAO_CACHE_INTERVALO_LIMPEZA') or 60 * 60)
+
+# textos pendentes sao divididos em blocos com no maximo essa quantidade de
+# caracteres e de textos, traduzidos em paralelo
+TRADUCAO_BLOCO_CARACTERES = int(os.getenv('TRADUCAO_BLOCO_CARACTERES') or 5000)
+TRADUCAO_BLOCO_TEXTOS = int(os.getenv('TRADUCAO_BLOCO_TEXTOS') or 128)
+TRADUCAO_BLOCOS_SIMULTANEOS = int(os.getenv('TRADUCAO_BLOCOS_SIMULTANEOS') or 4)
+
+# limites de requisicoes a API, por segundo e por dia (0 desativa o limite)
+GOOGLE_TRANSLATE_LIMITE_SEGUNDO = float(os.getenv('GOOGLE_TRANSLATE_LIMITE_SEGUNDO') or 10)
+GOOGLE_TRANSLATE_LIMITE_DIA = float(os.getenv('GOOGLE_TRANSLATE_LIMITE_DIA') or 0)
+
+protecao_google = cria_protecao("google_translate", GOOGLE_TRANSLATE_LIMITE_SEGUNDO, GOOGLE_TRANSLATE_LIMITE_DIA)
+
+
+def gera_chave_traducao(texto: str, idioma_origem: str, idioma_destino: str):
+    """ Gera a chave normalizada de uma traducao: idiomas + hash do texto
+    """
+    origem = idioma_origem.strip().lower()
+    destino = idioma_destino.strip().lower()
+    hash_texto = hashlib.sha256(texto.strip().encode("utf-8")).hexdigest()
+
+    return "%s:%s:%s" % (origem, destino, hash_texto)
+
+
+class CacheTraducao:
+    """
+    Cache de traducoes em dois niveis: LRU em memoria e tabela no bd
+
+    O nivel em memoria evita consultas ao bd para os textos mais usados e
+    o nivel persistente sobrevive a reinicializacoes da aplicacao.
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl: float, ttl_banco: float,
+                 intervalo_limpeza: float = TRADUCAO_CACHE_INTERVALO_LIMPEZA):
+        """
+        Cria um novo cache de traducoes
+
+        Argumentos:
+            tamanho_maximo : quantidade maxima de traducoes em memoria
+            ttl : tempo de vida de uma traducao em memoria, em segundos
+            ttl_banco : tempo de vida de uma traducao no bd, em segundos
+            intervalo_limpeza : intervalo minimo, em segundos, entre as
+                remocoes das traducoes expiradas do bd
+
+        """
+        self.memoria = CacheLRU(tamanho_maximo, ttl)
+        self.ttl_banco = ttl_banco
+        self.intervalo_limpeza = intervalo_limpeza
+        self._proxima_limpeza = 0.0
+        self._lock = threading.Lock()
+        self.acertos_banco = 0
+        self.falhas = 0
+
+    def obter_lote(self, chaves: List[str]):
+        """
+        Retorna as traducoes associadas as chaves encontradas, por chave,
+        consultando o bd uma unica vez para as chaves ausentes da memoria
+        """
+        encontradas = {}
+        ausentes = []
+        for chave in chaves:
+            traduzido = self.memoria.obter(chave)
+            if traduzido is not None:
+                encontradas[chave] = traduzido
+            else:
+                ausentes.append(chave)
+
+        if not ausentes:
+            return encontradas
+
+        try:
+            session = SessionFactory()
+            try:
+                limite = datetime.now() - timedelta(seconds=self.ttl_banco)
+                linhas = session.execute(
+                    select(Traducao.chave, Traducao.texto_traduzido).where(
+                        Traducao.chave.in_(ausentes), Traducao.data_criacao >= limite)).all()
+            finally:
+                session.close()
+        except Exception as e:
+            # o cache nao deve impedir a traducao
+            logger.warning("Erro ao consultar cache de traducoes %s", {e})
+            linhas = []
+
+        for chave, traduzido in linhas:
+            encontradas[chave] = traduzido
+            # promove a traducao para o nivel em memoria
+            self.memoria.armazenar(chave, traduzido)
+
+        with self._lock:
+            self.acertos_banco += len(linhas)
+            self.falhas += len(ausentes) - len(linhas)
+
+        return encontradas
+
+    def _remove_expiradas(self, session):
+        """
+        Remove do bd as traducoes expiradas, na transacao da sessao, no maximo
+        uma vez a cada intervalo_limpeza segundos
+        """
+        agora = time.monotonic()
+        with self._lock:
+            if agora < self._proxima_limpeza:
+                return
+            self._proxima_limpeza = agora + self.intervalo_limpeza
+
+        limite = datetime.now() - timedelta(seconds=self.ttl_banco)
+        session.execute(delete(Traducao).where(Traducao.data_criacao < limite))
+
+    def armazenar_lote(self, traducoes: dict, idioma_origem: str, idioma_destino: str):
+        """
+        Armazena varias traducoes, por chave, nos dois niveis do cache, com
+        uma unica transacao no bd
+        """
+        for chave, texto_traduzido in traducoes.items():
+            self.memoria.armazenar(chave, texto_traduzido)
+
+        try:
+            session = SessionFactory()
+            try:
+                for chave, texto_traduzido in traducoes.items():
+                    session.merge(Traducao(chave, idioma_origem, idioma_destino, texto_traduzido))
+                self._remove_expiradas(session)
+                session.commit()
+            finally:
+                session.close()
+        except Exception as e:
+            logger.warning("Erro ao armazenar traducao em cache %s", {e})
+
+    def estatisticas(self):
+        """
+        Retorna os contadores de acertos e falhas do cache
+        """
+        acertos = self.memoria.acertos + self.acertos_banco
+        total = acertos + self.falhas
+
+        return {
+            "acertos_memoria": self.memoria.acertos,
+            "acertos_banco": self.acertos_banco,
+            "falhas": self.falhas,
+            "itens_memoria": len(self.memoria),
+            "taxa_acerto": acertos / total if total else 0.0
+        }
+
+
+cache_traducao = CacheTraducao(TRADUCAO_CACHE_TAMANHO, TRADUCAO_CACHE_TTL, TRADUCAO_CACHE_TTL_BANCO)
+
+# traducoes identicas simultaneas compartilham uma unica request a API
+coalescencia_traducoes = CoalescenciaChamadas()
+
+# threads que enviam os blocos de uma traducao em paralelo
+executor_traducoes = ThreadPoolExecutor(TRADUCAO_BLOCOS_SIMULTANEOS, thread_name_prefix="traducao")
+
+
+def divide_em_blocos(textos: List[str], max_caracteres: int, max_textos: int):
+    """ Divide os textos, na ordem recebida, em blocos com no maximo
+        max_caracteres caracteres e max_textos textos
+
+        Um texto maior que max_caracteres forma um bloco sozinho.
+    """
+    blocos = []
+    bloco = []
+    caracteres = 0
+
+    for texto in textos:
+        if bloco and (caracteres + len(texto) > max_caracteres or len(bloco) >= max_textos):
+            blocos.append(bloco)
+            bloco = []
+            caracteres = 0
+
+        bloco.append(texto)
+        caracteres += len(texto)
+
+    if bloco:
+        blocos.append(bloco)
+
+    return blocos
+
+
+def realizar_traducao(texto: str, idioma_origem: str, idioma_destino: str):
+    """Prepara  a request de tradução de textos através da API Google Translate
+
+    Consulta o cache de traducoes antes de requisitar a API.
+
+    Retorna o texto traduzido e o status code da request.
+    """
+    if not texto:
+        error_msg = "Texto a ser traduzido não enviado"
+        logger.warning(
+            "Erro ao traduzir texto %s", error_msg)
+        return {"message": error_msg}, 404
+
+    traducoes, status_code = realizar_traducao_lote([texto], idioma_origem, idioma_destino)
+
+    if status_code == 200:
+        return traducoes[0], 200
+
+    return traducoes, status_code
+
+
+def _separa_pendentes(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """ Consulta o cache para cada texto
+
+        Retorna a lista de traducoes, com os textos encontrados no cache
+        preenchidos, e os indices de cada texto que precisa ser enviado para
+        a API.
+    """
+    traducoes = [""] * len(textos)
+    pendentes = {}
+
+    chaves = {texto: gera_chave_traducao(texto, idioma_origem, idioma_destino) for texto in textos if texto}
+    encontradas = cache_traducao.obter_lote(list(set(chaves.values())))
+
+    for indice, texto in enumerate(textos):
+        if not texto:
+            continue
+
+        traduzido = encontradas.get(chaves[texto])
+        if traduzido is not None:
+            traducoes[indice] = traduzido
+        else:
+            pendentes.setdefault(texto, []).append(indice)
+
+    return traducoes, pendentes
+
+
+def _preenche_pendentes(traducoes: List[str], pendentes: dict, resultado: List[str]):
+    """ Preenche as traducoes recebidas da API nos indices dos textos
+    """
+    for texto, traduzido in zip(pendentes, resultado):
+        for indice in pendentes[texto]:
+            traducoes[indice] = traduzido
+
+
+def realizar_traducao_lote(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """Traduz uma lista de textos com a API Google Translate
+
+    Os textos presentes no cache nao sao enviados e textos vazios sao
+    mantidos vazios. Os demais sao divididos em blocos limitados por
+    quantidade de caracteres e de textos, traduzidos em paralelo e
+    remontados pela posicao de cada texto.
+
+    Retorna a lista de textos traduzidos, na mesma ordem recebida, e o
+    status code da request.
+    """
+    try:
+        traducoes, pendentes = _separa_pendentes(textos, idioma_origem, idioma_destino)
+
+        if not pendentes:
+            logger.debug("Traducoes encontradas em cache")
+            return traducoes, 200
+
+        blocos = divide_em_blocos(list(pendentes.keys()), TRADUCAO_BLOCO_CARACTERES, TRADUCAO_BLOCO_TEXTOS)
+
+        def traduz_bloco(bloco):
+            chave_bloco = gera_chave_traducao("\n".join(bloco), idioma_origem, idioma_destino)
+            return coalescencia_traducoes.executar(
+                chave_bloco, lambda: requisitar_traducoes(bloco, idioma_origem, idioma_destino))
+
+        if len(blocos) == 1:
+            resultados = [traduz_bloco(blocos[0])]
+        else:
+            resultados = list(executor_traducoes.map(traduz_bloco, blocos))
+
+        if any(status_code != 200 for _, status_code in resultados):
+            return "", 400
+
+        _preenche_pendentes(traducoes, pendentes, [traduzido for traduzidos, _ in resultados for traduzido in traduzidos])
+        return traducoes, 200
+
+    except ServicoIndisponivel:
+        # permite que o chamador sirva um resultado em cache
+        raise
+
+    except Exception as e:
+        # tratando erros nao previstos
+        error_msg = "Não foi possível realizar a requisição :/"
+        logger.warning(
+            "Erro ao realizar a requisição %s", {e})
+        return {"message": error_msg}, 400
+
+
+async def realizar_traducao_lote_assincrona(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """Variante assincrona de realizar_traducao_lote, usando o cliente http
+    assincrono
+
+    A consulta ao cache, que pode acessar o bd, e feita em uma thread.
+
+    Retorna a lista de textos traduzidos, na mesma ordem recebida, e o
+    status code da request.
+    """
+    try:
+        traducoes, pendentes = await asyncio.to_thread(
+            _separa_pendentes, textos, idioma_origem, idioma_destino)
+
+        if not pendentes:
+            logger.debug("Traducoes encontradas em cache")
+            return traducoes, 200
+
+        blocos = divide_em_blocos(list(pendentes.keys()), TRADUCAO_BLOCO_CARACTERES, TRADUCAO_BLOCO_TEXTOS)
+
+        async def traduz_bloco(bloco):
+            chave_bloco = gera_chave_traducao("\n".join(bloco), idioma_origem, idioma_destino)
+            return await coalescencia_traducoes.executar_assincrono(
+                chave_bloco, lambda: requisitar_traducoes_assincrona(
+                    bloco, idioma_origem, idioma_destino))
+
+        resultados = await asyncio.gather(*(traduz_bloco(bloco) for bloco in blocos))
+
+        if any(status_code != 200 for _, status_code in resultados):
+            return "", 400
+
+        _preenche_pendentes(traducoes, pendentes, [traduzido for traduzidos, _ in resultados for traduzido in traduzidos])
+        return traducoes, 200
+
+    except ServicoIndisponivel:
+        # permite que o chamador sirva um resultado em cache
+        raise
+
+    except Exception as e:
+        # tratando erros nao previstos
+        error_msg = "Não foi possível realizar a requisição :/"
+        logger.warning(
+            "Erro ao realizar a requisição %s", {e})
+        return {"message": error_msg}, 400
+
+
+def normaliza_termo(termo: str):
+    """ Normaliza um termo: remove espacos extras, converte para minusculas e
+        para a forma unicode composta (NFC), para que o mesmo termo acentuado
+        digitado de formas diferentes tenha uma unica representacao
+    """
+    return " ".join(unicodedata.normalize("NFC", termo).lower().split())
+
+
+def separa_termos(lista: str):
+    """ Separa uma lista de termos separados por virgula em termos
+        normalizados, sem repeticoes e na ordem original
+    """
+    termos = (normaliza_termo(termo) for termo in lista.split(","))
+    return list(dict.fromkeys(termo for termo in termos if termo))
+
+
+def _consulta_memo_termos(termos: List[str], idioma_origem: str, idioma_destino: str):
+    """ Retorna as traducoes memorizadas dos termos, por termo
+    """
+    if not termos:
+        return {}
+
+    try:
+        session = SessionFactory()
+        try:
+            linhas = session.execute(
+                select(TraducaoTermo.termo, TraducaoTermo.texto_traduzido).where(
+                    TraducaoTermo.idioma_origem == idioma_origem,
+                    TraducaoTermo.idioma_destino == idioma_destino,
+                    TraducaoTermo.termo.in_(termos))).all()
+        finally:
+            session.close()
+    except Exception as e:
+        # o memo nao deve impedir a traducao
+        logger.warning("Erro ao consultar traducoes de termos %s", {e})
+        return {}
+
+    return dict(linhas)
+
+
+def _armazena_memo_termos(traducoes: dict, idioma_origem: str, idioma_destino: str):
+    """ Memoriza as traducoes de termos recebidas da API
+    """
+    try:
+        session = SessionFactory()
+        try:
+            session.execute(sqlite_insert(TraducaoTermo).on_conflict_do_nothing(), [
+                {"idioma_origem": idioma_origem, "idioma_destino": idioma_destino,
+                 "termo": termo, "texto_traduzido": traduzido}
+                for termo, traduzido in traducoes.items()
+            ])
+            session.commit()
+        finally:
+            session.close()
+    except Exception as e:
+        logger.warning("Erro ao armazenar traducoes de termos %s", {e})
+
+
+def _separa_termos_pendentes(listas: List[str], idioma_origem: str, idioma_destino: str):
+    """ Separa os termos de cada lista e consulta o memo
+
+        Retorna os termos de cada lista, as traducoes memorizadas e os termos
+        que precisam ser enviados para a API.
+    """
+    termos_listas = [separa_termos(lista) for lista in listas]
+    termos = list(dict.fromkeys(termo for termos in termos_listas for termo in termos))
+
+    memo = _consulta_memo_termos(termos, idioma_origem, idioma_destino)
+    pendentes = [termo for termo in termos if termo not in memo]
+
+    return termos_listas, memo, pendentes
+
+
+def _junta_termos(termos_listas: List[List[str]], memo: dict):
+    """ Monta as listas traduzidas, separadas por virgula
+    """
+    return [", ".join(memo[termo] for termo in termos) for termos in termos_listas]
+
+
+async def traduzir_termos_assincrona(listas: List[str], idioma_origem: str, idioma_destino: str):
+    """Traduz listas de termos separados por virgula, como listas de
+    ingredientes, termo a termo, usando o cliente http assincrono
+
+    Cada termo e normalizado e consultado no memo de termos, que nao expira.
+    Apenas os termos ausentes sao enviados para a API, em uma unica request,
+    e memorizados, de modo que listas diferentes compartilham as traducoes
+    dos termos em comum.
+
+    Retorna as listas traduzidas, na mesma ordem recebida, e o status code.
+    """
+    termos_listas, memo, pendentes = await asyncio.to_thread(
+        _separa_termos_pendentes, listas, idioma_origem, idioma_destino)
+
+    if pendentes:
+        traduzidos, status_code = await realizar_traducao_lote_assincrona(
+            pendentes, idioma_origem, idioma_destino)
+        if status_code != 200:
+            return traduzidos, status_code
+
+        novos = {termo: normaliza_termo(traduzido) for termo, traduzido in zip(pendentes, traduzidos)}
+        await asyncio.to_thread(_armazena_memo_termos, novos, idioma_origem, idioma_destino)
+        memo.update(novos)
+
+    return _junta_termos(termos_listas, memo), 200
+
+
+def _parametros_traducao(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """ Retorna a url e os parametros de uma request de traducao
+    """
+    #prepara a url da request
+    url = GOOGLE_TRANSLATE_URL + "?key=" + os.getenv('GOOGLE_TRANSLATE_API_KEY', "")
+
+    params = {
+        "q": textos,
+        "source": idioma_origem,
+        "target": idioma_destino,
+        "format": "text"
+    }
+
+    return url, params
+
+
+def _armazena_traducoes(textos: List[str], dados: dict, idioma_origem: str, idioma_destino: str):
+    """ Extrai as traducoes da resposta da API e as armazena no cache
+    """
+    # a API retorna as traducoes na mesma ordem dos textos enviados
+    traducoes = [item.get("translatedText") for item in dados.get("data").get("translations")]
+
+    cache_traducao.armazenar_lote({
+        gera_chave_traducao(texto, idioma_origem, idioma_destino): traduzido
+        for texto, traduzido in zip(textos, traducoes)
+    }, idioma_origem, idioma_destino)
+
+    return traducoes
+
+
+def requisitar_traducoes(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """Envia uma lista de textos para a API Google Translate em uma unica
+    request e armazena as traducoes no cache
+
+    Retorna a lista de textos traduzidos e o status code da request.
+    """
+    url, params = _parametros_traducao(textos, idioma_origem, idioma_destino)
+
+    logger.debug("Requisitando tradução de %s textos", len(textos))
+
+    resposta = cliente_http.post(url, data=params, protecao=protecao_google)
+
+    status_code = resposta.status_code
+
+    if status_code != 200:
+        return [], status_code
+
+    return _armazena_traducoes(textos, resposta.json(), idioma_origem, idioma_destino), 200
+
+
+async def requisitar_traducoes_assincrona(textos: List[str], idioma_origem: str, idioma_destino: str):
+    """Variante assincrona de requisitar_traducoes, usando o cliente http
+    assincrono
+
+    Retorna a lista de textos traduzidos e o status code da request.
+    """
+    url, params = _parametros_traducao(textos, idioma_origem, idioma_destino)
+
+    logger.debug("Requisitando tradução de %s textos", len(textos))
+
+    resposta = await cliente_http_assincrono.post(url, data=params, protecao=protecao_google)
+
+    status_code = resposta.status_code
+
+    if status_code != 200:
+        return [], status_code
+
+    # o armazenamento no cache acessa o bd
+    traducoes = await asyncio.to_thread(
+        _armazena_traducoes, textos, resposta.json(), idioma_origem, idioma_destino)
+    return traducoes, 200
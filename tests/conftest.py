@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# esquema original do bd, anterior as migracoes, com registros que incluem
+# categorias fora das enumeracoes e uma refeicao sem registro do diario,
+# possivel antes da ativacao das chaves estrangeiras
+ESQUEMA_ORIGINAL = """
+CREATE TABLE diario (
+    data_registro DATE NOT NULL,
+    PRIMARY KEY (data_registro),
+    UNIQUE (data_registro)
+);
+CREATE TABLE refeicao (
+    id INTEGER NOT NULL,
+    tipo VARCHAR(30),
+    metodo VARCHAR(30),
+    avaliacao VARCHAR(30),
+    aceitacao VARCHAR(30),
+    comentarios VARCHAR(4000),
+    diario DATE NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(diario) REFERENCES diario (data_registro)
+);
+INSERT INTO diario (data_registro) VALUES ('2024-04-10');
+INSERT INTO refeicao (tipo, metodo, avaliacao, aceitacao, comentarios, diario) VALUES
+    ('LANCHE_MANHA', 'TRADICIONAL', 'CAOS', 'RECUSOU', '', '2024-04-10'),
+    ('JANTA', 'BLW', 'SUCESSO', 'MUITO_BOM', 'categorias fora da enumeracao', '2024-04-10'),
+    ('ALMOCO', 'BLW', 'SUCESSO', 'OTIMO', 'refeicao sem registro', '2024-04-09');
+"""
+
+# o bd e os logs sao criados em caminhos relativos; os testes usam um
+# diretorio temporario para nao alterar os arquivos do repositorio
+os.chdir(tempfile.mkdtemp(prefix="mvp-arq-backend-testes-"))
+os.environ.setdefault("SPOONACULAR_API_KEY", "testes")
+os.environ.setdefault("GOOGLE_TRANSLATE_API_KEY", "testes")
+# os testes fazem varias buscas por segundo nos servidores locais
+os.environ.setdefault("SPOONACULAR_LIMITE_SEGUNDO", "0")
+
+# os testes usam um bd criado no esquema original, migrado na importacao do
+# modulo model, como os bds ja implantados
+os.makedirs("database")
+with sqlite3.connect("database/database.sqlite3") as conexao:
+    conexao.executescript(ESQUEMA_ORIGINAL)
+conexao.close()
@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorStub:
+    """
+    Servidor http local que responde as requisicoes com uma funcao
+    configuravel, registrando as requisicoes recebidas
+
+    A funcao responder recebe o handler e o numero da requisicao e retorna
+    (status, cabecalhos, corpo); o corpo pode ser um dict, enviado em JSON.
+    """
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.requisicoes = []
+        self.ativas = 0
+        self.maximo_ativas = 0
+        self.portas_clientes = set()
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 mantem as conexoes abertas entre as requisicoes (keep-alive)
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _atender(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo_requisicao = self.rfile.read(tamanho) if tamanho else b""
+                with stub._lock:
+                    numero = len(stub.requisicoes)
+                    stub.requisicoes.append((self.command, self.path, corpo_requisicao))
+                    stub.portas_clientes.add(self.client_address[1])
+                    stub.ativas += 1
+                    stub.maximo_ativas = max(stub.maximo_ativas, stub.ativas)
+                try:
+                    status, cabecalhos, corpo = stub.responder(self, numero)
+                finally:
+                    with stub._lock:
+                        stub.ativas -= 1
+
+                if isinstance(corpo, (dict, list)):
+                    corpo = json.dumps(corpo).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    for nome, valor in (cabecalhos or {}).items():
+                        self.send_header(nome, valor)
+                    self.send_header("Content-Length", str(len(corpo)))
+                    self.end_headers()
+                    self.wfile.write(corpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    # o cliente desistiu da requisicao (timeout)
+                    pass
+
+            do_GET = _atender
+            do_POST = _atender
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.servidor.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self.servidor.server_address[1]
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
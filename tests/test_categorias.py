@@ -0,0 +1,89 @@
+from enum import IntEnum
+
+import pytest
+
+from app import app
+from model import engine, migracoes
+from model.categorias import TipoRefeicao, AceitacaoRefeicao
+
+
+DATA = "2030-03-10"
+
+
+@pytest.fixture
+def cliente():
+    cliente = app.test_client()
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+    yield cliente
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+
+
+def tipos_armazenados(comentarios: str):
+    with engine.connect() as conexao:
+        return conexao.exec_driver_sql(
+            "SELECT tipo, typeof(tipo), aceitacao, typeof(aceitacao) FROM refeicao WHERE comentarios = ?",
+            (comentarios,)).one()
+
+
+def test_migracao_mantem_categorias_desconhecidas_como_texto():
+    # o bd dos testes e criado no esquema original e migrado na inicializacao
+    assert tipos_armazenados("") == (TipoRefeicao.LANCHE_MANHA.value, "integer", AceitacaoRefeicao.RECUSOU.value, "integer")
+    assert tipos_armazenados("categorias fora da enumeracao") == ("JANTA", "text", "MUITO_BOM", "text")
+
+    # os registros antigos continuam legiveis
+    resposta = app.test_client().get("/buscar_diario", query_string={"data_registro": "2024-04-10"})
+    refeicoes = resposta.get_json()["refeicoes"]
+    assert [(r["tipo"], r["aceitacao"]) for r in refeicoes] == [("LANCHE_MANHA", "RECUSOU"), ("JANTA", "MUITO_BOM")]
+
+
+def test_relata_refeicoes_com_categorias_desconhecidas():
+    conexao = engine.raw_connection()
+    try:
+        desconhecidas = migracoes._categorias_desconhecidas(conexao.cursor())
+    finally:
+        conexao.close()
+
+    assert set(desconhecidas) == {"tipo", "aceitacao"}
+    assert list(desconhecidas["tipo"]) == ["JANTA"]
+    assert list(desconhecidas["aceitacao"]) == ["MUITO_BOM"]
+
+
+def test_grava_categorias_como_codigos(cliente):
+    refeicoes = [{"tipo": nome, "comentarios": "codigo %s" % nome} for nome in TipoRefeicao.__members__]
+    assert cliente.post("/inserir_diario", json={"data_registro": DATA, "refeicoes": refeicoes}).status_code == 200
+
+    for tipo in TipoRefeicao:
+        assert tipos_armazenados("codigo %s" % tipo.name)[:2] == (tipo.value, "integer")
+
+
+@pytest.mark.parametrize("rota, corpo", [
+    ("/inserir_diario", {"data_registro": DATA, "refeicoes": [{"tipo": "JANTA"}]}),
+    ("/inserir_diarios", {"diarios": [{"data_registro": DATA, "refeicoes": [{"metodo": "MISTO"}]}]}),
+])
+def test_recusa_categorias_desconhecidas(cliente, rota, corpo):
+    assert cliente.post(rota, json=corpo).status_code == 422
+    assert cliente.get("/buscar_diario", query_string={"data_registro": DATA}).status_code == 404
+
+
+def test_recusa_filtro_por_categoria_desconhecida(cliente):
+    resposta = cliente.get("/buscar_diarios", query_string={
+        "data_inicio": DATA, "data_fim": DATA, "tipo": "JANTA"})
+
+    assert resposta.status_code == 422
+
+
+def test_converte_texto_quando_categoria_passa_a_existir(monkeypatch):
+    TipoAmpliado = IntEnum("TipoAmpliado", {**TipoRefeicao.__members__, "JANTA": 99})
+    monkeypatch.setitem(migracoes.CATEGORIAS_REFEICAO, "tipo", TipoAmpliado)
+
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        assert migracoes.refeicao_categorias_texto(cursor)
+        assert not migracoes.refeicao_categorias_texto(cursor)
+        assert cursor.execute(
+            "SELECT tipo FROM refeicao WHERE comentarios = 'categorias fora da enumeracao'").fetchone() == (99,)
+    finally:
+        # desfaz a conversao para nao afetar os demais testes
+        conexao.rollback()
+        conexao.close()
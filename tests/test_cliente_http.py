@@ -0,0 +1,164 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+import requests
+
+from services.cliente_http import ClienteHttp, ClienteHttpAssincrono
+from tests.servidor_stub import ServidorStub
+
+
+def cria_cliente(classe=ClienteHttp, conexoes_por_host=10, timeout_leitura=2, tentativas=3,
+                 espera_base=0.01, espera_maxima=5):
+    return classe(conexoes_por_host, 1, timeout_leitura, tentativas, espera_base, espera_maxima)
+
+
+@pytest.fixture
+def stub():
+    servidores = []
+
+    def iniciar(responder):
+        servidor = ServidorStub(responder)
+        servidores.append(servidor)
+        return servidor
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.encerrar()
+
+
+def test_repete_apos_503(stub):
+    servidor = stub(lambda handler, numero: (503, {}, b"") if numero == 0 else (200, {}, {"ok": True}))
+
+    resposta = cria_cliente().get(servidor.url + "/recurso")
+
+    assert resposta.status_code == 200
+    assert resposta.json() == {"ok": True}
+    assert len(servidor.requisicoes) == 2
+
+
+def test_retorna_ultima_resposta_apos_esgotar_tentativas(stub):
+    servidor = stub(lambda handler, numero: (503, {}, b""))
+
+    resposta = cria_cliente(tentativas=3).get(servidor.url)
+
+    assert resposta.status_code == 503
+    assert len(servidor.requisicoes) == 3
+
+
+def test_nao_repete_erros_definitivos(stub):
+    servidor = stub(lambda handler, numero: (400, {}, b""))
+
+    assert cria_cliente().post(servidor.url, json={}).status_code == 400
+    assert len(servidor.requisicoes) == 1
+
+
+def test_respeita_retry_after(stub):
+    servidor = stub(lambda handler, numero: (429, {"Retry-After": "1"}, b"") if numero == 0 else (200, {}, b""))
+
+    inicio = time.monotonic()
+    resposta = cria_cliente(espera_base=0).get(servidor.url)
+
+    assert resposta.status_code == 200
+    assert time.monotonic() - inicio >= 1
+
+
+def test_limita_retry_after_a_espera_maxima(stub):
+    servidor = stub(lambda handler, numero: (503, {"Retry-After": "120"}, b"") if numero == 0 else (200, {}, b""))
+
+    inicio = time.monotonic()
+    resposta = cria_cliente(espera_maxima=0.2).get(servidor.url)
+
+    assert resposta.status_code == 200
+    assert time.monotonic() - inicio < 2
+
+
+def test_timeout_de_leitura(stub):
+    def lento(handler, numero):
+        time.sleep(1)
+        return 200, {}, b""
+
+    servidor = stub(lento)
+
+    inicio = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        cria_cliente(timeout_leitura=0.2, tentativas=2).get(servidor.url)
+
+    # as duas tentativas expiram sem aguardar a resposta do servidor
+    assert len(servidor.requisicoes) == 2
+    assert time.monotonic() - inicio < 1.5
+
+
+def test_limita_conexoes_por_host(stub):
+    def lento(handler, numero):
+        time.sleep(0.1)
+        return 200, {}, b""
+
+    servidor = stub(lento)
+    cliente = cria_cliente(conexoes_por_host=2)
+
+    with ThreadPoolExecutor(8) as executor:
+        respostas = list(executor.map(lambda _: cliente.get(servidor.url), range(8)))
+
+    assert all(resposta.status_code == 200 for resposta in respostas)
+    assert servidor.maximo_ativas <= 2
+    # as conexoes sao reaproveitadas (keep-alive) em vez de abertas a cada requisicao
+    assert len(servidor.portas_clientes) <= 2
+
+
+def test_cliente_assincrono_repete_apos_503(stub):
+    servidor = stub(lambda handler, numero: (503, {}, b"") if numero == 0 else (200, {}, {"ok": True}))
+    cliente = cria_cliente(ClienteHttpAssincrono)
+
+    resposta = asyncio.run(cliente.get(servidor.url))
+
+    assert resposta.status_code == 200
+    assert len(servidor.requisicoes) == 2
+
+
+def test_cliente_assincrono_timeout_de_leitura(stub):
+    def lento(handler, numero):
+        time.sleep(1)
+        return 200, {}, b""
+
+    servidor = stub(lento)
+    cliente = cria_cliente(ClienteHttpAssincrono, timeout_leitura=0.2, tentativas=2)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(cliente.get(servidor.url))
+    assert len(servidor.requisicoes) == 2
+
+
+def test_cliente_assincrono_reaproveita_conexoes_entre_event_loops(stub):
+    servidor = stub(lambda handler, numero: (200, {}, b""))
+    cliente = cria_cliente(ClienteHttpAssincrono)
+
+    # o Flask executa cada view assincrona em um event loop proprio
+    for _ in range(3):
+        assert asyncio.run(cliente.get(servidor.url)).status_code == 200
+
+    assert len(servidor.requisicoes) == 3
+    assert len(servidor.portas_clientes) == 1
+
+
+def test_cliente_assincrono_limita_conexoes_por_host(stub):
+    def lento(handler, numero):
+        time.sleep(0.1)
+        return 200, {}, b""
+
+    servidor = stub(lento)
+    cliente = cria_cliente(ClienteHttpAssincrono, conexoes_por_host=2)
+
+    async def buscar():
+        return await asyncio.gather(*(cliente.get(servidor.url) for _ in range(8)))
+
+    # requisicoes concorrentes de varios event loops compartilham o limite
+    with ThreadPoolExecutor(2) as executor:
+        respostas = [resposta for lote in executor.map(lambda _: asyncio.run(buscar()), range(2))
+                     for resposta in lote]
+
+    assert all(resposta.status_code == 200 for resposta in respostas)
+    assert servidor.maximo_ativas <= 2
+    assert len(servidor.portas_clientes) <= 2
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import select, func, delete
+
+from model import engine, SessionFactory, Diario
+
+
+# tempo em que o escritor mantem a transacao aberta
+TEMPO_ESCRITA = 1.0
+LEITORES = 8
+
+
+def conta_diarios():
+    session = SessionFactory()
+    try:
+        return session.execute(select(func.count()).select_from(Diario)).scalar()
+    finally:
+        session.close()
+
+
+def remove_diarios(*datas):
+    with engine.begin() as conexao:
+        conexao.execute(delete(Diario).where(Diario.data_registro.in_(datas)))
+
+
+def test_modo_wal_ativo():
+    with engine.connect() as conexao:
+        assert conexao.exec_driver_sql("PRAGMA journal_mode").scalar().lower() == "wal"
+        assert conexao.exec_driver_sql("PRAGMA busy_timeout").scalar() > 0
+
+
+def test_leitores_nao_aguardam_escritor():
+    data = date(2031, 1, 1)
+    antes = conta_diarios()
+    escrita_iniciada = threading.Event()
+
+    def escritor():
+        # o bloqueio exclusivo, obtido no commit ou quando a escrita nao cabe
+        # no cache, impede as leituras fora do modo WAL
+        conexao = engine.raw_connection()
+        try:
+            driver = conexao.driver_connection
+            nivel_isolamento = driver.isolation_level
+            driver.isolation_level = None
+            cursor = driver.cursor()
+            try:
+                cursor.execute("BEGIN EXCLUSIVE")
+                cursor.execute("INSERT INTO diario (data_registro, versao) VALUES (?, 1)", (data.isoformat(),))
+                escrita_iniciada.set()
+                time.sleep(TEMPO_ESCRITA)
+                cursor.execute("COMMIT")
+            finally:
+                cursor.close()
+                driver.isolation_level = nivel_isolamento
+        finally:
+            conexao.close()
+
+    def leitor():
+        inicio = time.monotonic()
+        quantidade = conta_diarios()
+        return quantidade, time.monotonic() - inicio
+
+    try:
+        thread = threading.Thread(target=escritor)
+        thread.start()
+        assert escrita_iniciada.wait(5)
+
+        with ThreadPoolExecutor(LEITORES) as executor:
+            leituras = list(executor.map(lambda _: leitor(), range(LEITORES * 4)))
+        thread.join()
+
+        # as leituras terminam durante a escrita e veem apenas dados confirmados
+        assert all(quantidade == antes for quantidade, _ in leituras)
+        assert max(duracao for _, duracao in leituras) < TEMPO_ESCRITA / 2
+        assert conta_diarios() == antes + 1
+    finally:
+        remove_diarios(data)
+
+
+def test_escritores_concorrentes_aguardam_bloqueio():
+    datas = [date(2032, 1, 1) + timedelta(days=dia) for dia in range(20)]
+
+    def escritor(data):
+        session = SessionFactory()
+        try:
+            session.add(Diario(data))
+            session.commit()
+        finally:
+            session.close()
+
+    try:
+        # com busy_timeout os escritores aguardam a vez em vez de falhar
+        # com "database is locked"
+        with ThreadPoolExecutor(10) as executor:
+            list(executor.map(escritor, datas))
+
+        session = SessionFactory()
+        try:
+            salvas = session.execute(
+                select(func.count()).select_from(Diario).where(Diario.data_registro.in_(datas))).scalar()
+        finally:
+            session.close()
+        assert salvas == len(datas)
+    finally:
+        remove_diarios(*datas)
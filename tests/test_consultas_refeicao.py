@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from model import engine, Refeicao
+
+
+DATA = "2030-01-10"
+
+# refeicoes inseridas fora da ordem dos codigos de tipo
+REFEICOES = [
+    {"tipo": "JANTAR", "comentarios": "3"},
+    {"tipo": "ALMOCO", "comentarios": "2"},
+    {"tipo": "CAFE_MANHA", "comentarios": "1"},
+]
+
+
+@pytest.fixture(scope="module")
+def cliente():
+    cliente = app.test_client()
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+    resposta = cliente.post("/inserir_diario", json={"data_registro": DATA, "refeicoes": REFEICOES})
+    assert resposta.status_code == 200
+
+    yield cliente
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+
+
+@contextmanager
+def consultas_refeicao():
+    """ Captura as consultas a tabela refeicao feitas no bloco
+    """
+    consultas = []
+
+    def captura(conexao, cursor, comando, parametros, contexto, varios):
+        if comando.lstrip().upper().startswith("SELECT") and "refeicao" in comando:
+            consultas.append((comando, parametros))
+
+    event.listen(engine, "before_cursor_execute", captura)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, "before_cursor_execute", captura)
+
+
+def plano(comando: str, parametros):
+    """ Retorna os passos do plano de execucao da consulta
+    """
+    with engine.connect() as conexao:
+        linhas = conexao.exec_driver_sql("EXPLAIN QUERY PLAN " + comando, parametros).fetchall()
+    return [linha[-1] for linha in linhas]
+
+
+@pytest.fixture(params=["ix_refeicao_diario", "ix_refeicao_diario_tipo"])
+def ordem_indices(request):
+    """ Recria os indices de refeicao criando primeiro o indice informado
+
+        Sem estatisticas, o SQLite desempata entre indices equivalentes pela
+        ordem de criacao, que varia conforme o historico de migracoes do bd.
+    """
+    indices = sorted(Refeicao.__table__.indexes, key=lambda indice: indice.name != request.param)
+    with engine.begin() as conexao:
+        for indice in indices:
+            indice.drop(conexao)
+        for indice in indices:
+            indice.create(conexao)
+    return request.param
+
+
+def comentarios(diario: dict):
+    return [refeicao["comentarios"] for refeicao in diario["refeicoes"]]
+
+
+def diario_buscado(resposta):
+    dados = resposta.get_json()
+    diarios = dados["diarios"] if "diarios" in dados else [dados]
+    return next(diario for diario in diarios if diario["data_registro"].endswith("10 Jan 2030 00:00:00 GMT"))
+
+
+@pytest.mark.parametrize("url", [
+    "/buscar_diario?data_registro=%s" % DATA,
+    "/buscar_diarios?data_inicio=2030-01-01&data_fim=2030-01-31",
+    "/listar_diarios?limit=50",
+])
+def test_refeicoes_na_ordem_de_insercao(cliente, ordem_indices, url):
+    resposta = cliente.get(url)
+
+    assert resposta.status_code == 200
+    assert comentarios(diario_buscado(resposta)) == ["3", "2", "1"]
+
+
+def test_refeicoes_filtradas_na_ordem_de_insercao(cliente, ordem_indices):
+    resposta = cliente.get("/buscar_diarios?data_inicio=2030-01-01&data_fim=2030-01-31&aceitacao=OTIMO")
+
+    assert comentarios(diario_buscado(resposta)) == ["3", "2", "1"]
+
+
+@pytest.mark.parametrize("url", [
+    "/buscar_diario?data_registro=%s" % DATA,
+    "/buscar_diarios?data_inicio=2030-01-01&data_fim=2030-01-31",
+])
+def test_plano_carregamento_refeicoes_de_um_registro(cliente, ordem_indices, url):
+    with consultas_refeicao() as consultas:
+        assert cliente.get(url).status_code == 200
+
+    assert len(consultas) == 1
+    passos = plano(*consultas[0])
+    assert any("ix_refeicao_diario (diario=?)" in passo for passo in passos), passos
+    # a ordem de insercao (id) vem do proprio indice, sem ordenacao adicional
+    assert not any("TEMP B-TREE" in passo for passo in passos), passos
+
+
+def test_plano_busca_por_intervalo_filtrada_por_tipo(cliente, ordem_indices):
+    with consultas_refeicao() as consultas:
+        resposta = cliente.get("/buscar_diarios?data_inicio=2030-01-01&data_fim=2030-01-31&tipo=ALMOCO")
+
+    assert comentarios(diario_buscado(resposta)) == ["2"]
+    assert len(consultas) == 1
+    passos = plano(*consultas[0])
+    assert any("ix_refeicao_diario_tipo (diario=? AND tipo=?)" in passo for passo in passos), passos
+    assert not any(passo.startswith("SCAN refeicao") for passo in passos), passos
@@ -0,0 +1,94 @@
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from model import engine
+
+
+DATA = "2030-04-10"
+
+A = {"tipo": "LANCHE_MANHA", "comentarios": "a"}
+B = {"tipo": "ALMOCO", "comentarios": "b"}
+C = {"tipo": "LANCHE_TARDE", "comentarios": "c"}
+D = {"tipo": "JANTAR", "comentarios": "d"}
+E = {"tipo": "CEIA", "aceitacao": "RECUSOU", "comentarios": "e"}
+
+
+@pytest.fixture
+def cliente():
+    cliente = app.test_client()
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+    yield cliente
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+
+
+@contextmanager
+def escritas_refeicao():
+    """ Conta as linhas da tabela refeicao inseridas, alteradas e removidas
+        no bloco, por comando
+    """
+    escritas = Counter()
+
+    def captura(conexao, cursor, comando, parametros, contexto, varios):
+        partes = comando.split()
+        tabela = partes[2] if partes[0] in ("INSERT", "DELETE") else partes[1]
+        if partes[0] in ("INSERT", "UPDATE", "DELETE") and tabela == "refeicao":
+            escritas[partes[0]] += len(parametros) if varios else 1
+
+    event.listen(engine, "before_cursor_execute", captura)
+    try:
+        yield escritas
+    finally:
+        event.remove(engine, "before_cursor_execute", captura)
+
+
+def comentarios(diario: dict):
+    return [refeicao["comentarios"] for refeicao in diario["refeicoes"]]
+
+
+def estatisticas(cliente):
+    resposta = cliente.get("/estatisticas_refeicoes", query_string={
+        "periodo": "dia", "data_inicio": DATA, "data_fim": DATA})
+    return {(e["tipo"], e["aceitacao"]): e["quantidade"] for e in resposta.get_json()["estatisticas"]}
+
+
+def test_edicao_preserva_a_ordem_enviada(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DATA, "refeicoes": [A, B, C, D]})
+
+    # A mantida, C passa para a posicao de B, E substitui C e D e removida
+    with escritas_refeicao() as escritas:
+        resposta = cliente.put("/editar_diario", json={"data_registro": DATA, "refeicoes": [A, C, E]})
+
+    assert resposta.status_code == 200
+    assert comentarios(resposta.get_json()) == ["a", "c", "e"]
+    assert comentarios(cliente.get("/buscar_diario", query_string={"data_registro": DATA}).get_json()) == \
+        ["a", "c", "e"]
+
+    # apenas as posicoes alteradas sao gravadas
+    assert escritas == {"UPDATE": 2, "DELETE": 1}
+
+    assert estatisticas(cliente) == {("LANCHE_MANHA", "OTIMO"): 1, ("LANCHE_TARDE", "OTIMO"): 1,
+                                     ("CEIA", "RECUSOU"): 1}
+
+
+def test_edicao_troca_de_posicoes(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DATA, "refeicoes": [A, B]})
+
+    resposta = cliente.put("/editar_diario", json={"data_registro": DATA, "refeicoes": [B, C]})
+
+    assert comentarios(resposta.get_json()) == ["b", "c"]
+    assert comentarios(cliente.get("/buscar_diario", query_string={"data_registro": DATA}).get_json()) == ["b", "c"]
+
+
+def test_edicao_acrescenta_ao_final(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DATA, "refeicoes": [A]})
+
+    with escritas_refeicao() as escritas:
+        resposta = cliente.put("/editar_diario", json={"data_registro": DATA, "refeicoes": [A, B]})
+
+    assert comentarios(resposta.get_json()) == ["a", "b"]
+    assert escritas == {"INSERT": 1}
+    assert estatisticas(cliente) == {("LANCHE_MANHA", "OTIMO"): 1, ("ALMOCO", "OTIMO"): 1}
@@ -0,0 +1,139 @@
+import pytest
+from sqlalchemy import select
+
+from app import app
+from model import SessionFactory
+from model.estatistica import EstatisticaRefeicao, reconstroi_estatisticas
+
+
+# segunda-feira e dias seguintes da mesma semana
+SEMANA = "2030-06-03"
+DIAS = ["2030-06-03", "2030-06-04", "2030-06-05"]
+
+
+@pytest.fixture
+def cliente():
+    cliente = app.test_client()
+    intervalo = {"data_inicio": "2030-06-01", "data_fim": "2030-06-30"}
+    cliente.delete("/deletar_diarios", query_string=intervalo)
+    yield cliente
+    cliente.delete("/deletar_diarios", query_string=intervalo)
+
+
+def refeicao(tipo="ALMOCO", metodo="BLW", avaliacao="SUCESSO", aceitacao="OTIMO"):
+    return {"tipo": tipo, "metodo": metodo, "avaliacao": avaliacao, "aceitacao": aceitacao, "comentarios": ""}
+
+
+def estatisticas(cliente, periodo="dia"):
+    resposta = cliente.get("/estatisticas_refeicoes", query_string={
+        "periodo": periodo, "data_inicio": "2030-06-01", "data_fim": "2030-06-30"})
+    assert resposta.status_code == 200
+    return {(e["inicio_periodo"], e["tipo"], e["metodo"], e["avaliacao"], e["aceitacao"]): e["quantidade"]
+            for e in resposta.get_json()["estatisticas"]}
+
+
+def confere_reconstrucao():
+    """ As contagens mantidas a cada escrita devem ser iguais as recalculadas
+        a partir das refeicoes salvas
+    """
+    session = SessionFactory()
+    try:
+        def contagens():
+            return sorted(tuple(linha) for linha in session.execute(select(
+                EstatisticaRefeicao.periodo, EstatisticaRefeicao.inicio_periodo, EstatisticaRefeicao.tipo,
+                EstatisticaRefeicao.metodo, EstatisticaRefeicao.avaliacao, EstatisticaRefeicao.aceitacao,
+                EstatisticaRefeicao.quantidade)))
+
+        mantidas = contagens()
+        reconstroi_estatisticas(session)
+        assert contagens() == mantidas
+    finally:
+        session.rollback()
+        session.close()
+
+
+def test_insercao(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[0], "refeicoes": [
+        refeicao(), refeicao(), refeicao("JANTAR", aceitacao="RECUSOU")]})
+
+    assert estatisticas(cliente) == {
+        (DIAS[0], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 2,
+        (DIAS[0], "JANTAR", "BLW", "SUCESSO", "RECUSOU"): 1,
+    }
+    assert estatisticas(cliente, "semana") == {
+        (SEMANA, "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 2,
+        (SEMANA, "JANTAR", "BLW", "SUCESSO", "RECUSOU"): 1,
+    }
+    confere_reconstrucao()
+
+
+def test_insercao_em_lote_ignora_conflitos(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[0], "refeicoes": [refeicao()]})
+
+    resposta = cliente.post("/inserir_diarios", json={"diarios": [
+        {"data_registro": DIAS[0], "refeicoes": [refeicao("CEIA")]},
+        {"data_registro": DIAS[1], "refeicoes": [refeicao(), refeicao("CAFE_MANHA", "TRADICIONAL")]},
+        {"data_registro": DIAS[1], "refeicoes": [refeicao("CEIA")]},
+    ]})
+
+    assert len(resposta.get_json()["conflitos"]) == 2
+    assert estatisticas(cliente) == {
+        (DIAS[0], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+        (DIAS[1], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+        (DIAS[1], "CAFE_MANHA", "TRADICIONAL", "SUCESSO", "OTIMO"): 1,
+    }
+    assert estatisticas(cliente, "semana") == {
+        (SEMANA, "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 2,
+        (SEMANA, "CAFE_MANHA", "TRADICIONAL", "SUCESSO", "OTIMO"): 1,
+    }
+    confere_reconstrucao()
+
+
+def test_edicao_altera_tipo_avaliacao_e_aceitacao(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[0], "refeicoes": [refeicao(), refeicao()]})
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[1], "refeicoes": [refeicao()]})
+
+    resposta = cliente.put("/editar_diario", json={"data_registro": DIAS[0], "refeicoes": [
+        refeicao(), refeicao("LANCHE_TARDE", avaliacao="CAOS", aceitacao="RUIM")]})
+
+    assert resposta.status_code == 200
+    assert estatisticas(cliente) == {
+        (DIAS[0], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+        (DIAS[0], "LANCHE_TARDE", "BLW", "CAOS", "RUIM"): 1,
+        (DIAS[1], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+    }
+    assert estatisticas(cliente, "semana") == {
+        (SEMANA, "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 2,
+        (SEMANA, "LANCHE_TARDE", "BLW", "CAOS", "RUIM"): 1,
+    }
+    confere_reconstrucao()
+
+
+def test_remocao(cliente):
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[0], "refeicoes": [refeicao("JANTAR")]})
+    cliente.post("/inserir_diario", json={"data_registro": DIAS[1], "refeicoes": [refeicao()]})
+
+    cliente.delete("/deletar_diario", query_string={"data_registro": DIAS[0]})
+
+    # as contagens zeradas sao removidas
+    assert estatisticas(cliente) == {(DIAS[1], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1}
+    assert estatisticas(cliente, "semana") == {(SEMANA, "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1}
+    confere_reconstrucao()
+
+
+def test_remocao_por_intervalo(cliente):
+    for dia in DIAS:
+        cliente.post("/inserir_diario", json={"data_registro": dia, "refeicoes": [refeicao(), refeicao("CEIA")]})
+
+    resposta = cliente.delete("/deletar_diarios", query_string={"data_inicio": DIAS[0], "data_fim": DIAS[1]})
+
+    assert resposta.get_json()["quantidade"] == 2
+    assert estatisticas(cliente) == {
+        (DIAS[2], "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+        (DIAS[2], "CEIA", "BLW", "SUCESSO", "OTIMO"): 1,
+    }
+    assert estatisticas(cliente, "semana") == {
+        (SEMANA, "ALMOCO", "BLW", "SUCESSO", "OTIMO"): 1,
+        (SEMANA, "CEIA", "BLW", "SUCESSO", "OTIMO"): 1,
+    }
+    confere_reconstrucao()
@@ -0,0 +1,61 @@
+import pytest
+
+from app import app
+
+
+DATA = "2030-02-10"
+
+
+@pytest.fixture
+def cliente():
+    cliente = app.test_client()
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+    yield cliente
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+
+
+def diario(*comentarios):
+    return {"data_registro": DATA, "refeicoes": [{"comentarios": comentario} for comentario in comentarios]}
+
+
+def busca(cliente, etag=None):
+    cabecalhos = {"If-None-Match": etag} if etag else {}
+    return cliente.get("/buscar_diario", query_string={"data_registro": DATA}, headers=cabecalhos)
+
+
+def test_retorna_304_para_etag_atual(cliente):
+    assert cliente.post("/inserir_diario", json=diario("a")).status_code == 200
+    etag = busca(cliente).headers["ETag"]
+
+    assert busca(cliente, etag).status_code == 304
+
+
+def test_edicao_altera_etag(cliente):
+    cliente.post("/inserir_diario", json=diario("a"))
+    etag = busca(cliente).headers["ETag"]
+
+    assert cliente.put("/editar_diario", json=diario("b")).status_code == 200
+    assert busca(cliente, etag).status_code == 200
+
+
+def test_edicao_sem_alteracao_mantem_etag(cliente):
+    cliente.post("/inserir_diario", json=diario("a"))
+    etag = busca(cliente).headers["ETag"]
+
+    cliente.put("/editar_diario", json=diario("a"))
+    assert busca(cliente, etag).status_code == 304
+
+
+@pytest.mark.parametrize("rota", ["/inserir_diario", "/inserir_diarios"])
+def test_reinsercao_da_data_nao_reaproveita_etag(cliente, rota):
+    cliente.post("/inserir_diario", json=diario("a"))
+    etag = busca(cliente).headers["ETag"]
+
+    cliente.delete("/deletar_diario", query_string={"data_registro": DATA})
+    corpo = diario("b") if rota == "/inserir_diario" else {"diarios": [diario("b")]}
+    assert cliente.post(rota, json=corpo).status_code == 200
+
+    resposta = busca(cliente, etag)
+    assert resposta.status_code == 200
+    assert resposta.get_json()["refeicoes"][0]["comentarios"] == "b"
+    assert resposta.headers["ETag"] != etag
@@ -0,0 +1,177 @@
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+
+import pytest
+from sqlalchemy import update
+
+from app import app
+from model import engine, BuscaReceita
+from services import limitador, receita, traducao
+from services.cache import CacheRevalidavel
+from services.limitador import Disjuntor, ProtecaoServico, ServicoIndisponivel, cria_protecao
+from tests.servidor_stub import ServidorStub
+from tests.test_cliente_http import cria_cliente
+from tests.test_paginacao_receitas import receita_spoonacular
+
+
+@pytest.fixture
+def stub():
+    servidores = []
+
+    def iniciar(responder):
+        servidor = ServidorStub(responder)
+        servidores.append(servidor)
+        return servidor
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.encerrar()
+
+
+def protecao_disjuntor(servico: str, limite_falhas=2, tempo_aberto=0.3):
+    return ProtecaoServico(servico, [], Disjuntor(servico, limite_falhas, tempo_aberto))
+
+
+def test_balde_de_fichas_recusa_requisicoes_excedentes(stub, monkeypatch):
+    monkeypatch.setattr(limitador, "LIMITE_ESPERA_MAXIMA", 0)
+    servidor = stub(lambda handler, numero: (200, {}, b""))
+    protecao = cria_protecao("teste-balde", 2, 0)
+    cliente = cria_cliente()
+
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    with pytest.raises(ServicoIndisponivel, match="limite teste-balde:segundo esgotado"):
+        cliente.get(servidor.url, protecao=protecao)
+    assert len(servidor.requisicoes) == 2
+
+    # o balde e reabastecido a duas fichas por segundo
+    time.sleep(0.6)
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    assert len(servidor.requisicoes) == 3
+
+
+def test_balde_de_fichas_aguarda_dentro_da_espera_maxima(stub):
+    servidor = stub(lambda handler, numero: (200, {}, b""))
+    protecao = cria_protecao("teste-balde-espera", 4, 0)
+    cliente = cria_cliente()
+
+    inicio = time.monotonic()
+    respostas = [cliente.get(servidor.url, protecao=protecao) for _ in range(6)]
+
+    assert all(resposta.status_code == 200 for resposta in respostas)
+    # as duas requisicoes alem da capacidade aguardam as proximas fichas
+    assert time.monotonic() - inicio >= 0.4
+
+
+def test_disjuntor_abre_apos_falhas_consecutivas_e_fecha_apos_sucesso(stub):
+    servidor = stub(lambda handler, numero: (500, {}, b"") if numero < 2 else (200, {}, b""))
+    protecao = protecao_disjuntor("teste-disjuntor")
+    cliente = cria_cliente(tentativas=1)
+
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 500
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 500
+    with pytest.raises(ServicoIndisponivel, match="disjuntor aberto"):
+        cliente.get(servidor.url, protecao=protecao)
+    assert len(servidor.requisicoes) == 2
+
+    # apos o tempo aberto, uma unica requisicao de teste e liberada
+    time.sleep(0.3)
+    assert protecao.disjuntor.permite()
+    assert not protecao.disjuntor.permite()
+
+    # o sucesso da requisicao de teste fecha o disjuntor
+    protecao.registrar(True)
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    assert len(servidor.requisicoes) == 4
+
+
+def test_disjuntor_permanece_aberto_se_a_requisicao_de_teste_falha(stub):
+    servidor = stub(lambda handler, numero: (503, {}, b""))
+    protecao = protecao_disjuntor("teste-disjuntor-teste")
+    cliente = cria_cliente(tentativas=1)
+
+    for _ in range(2):
+        cliente.get(servidor.url, protecao=protecao)
+    time.sleep(0.3)
+
+    assert cliente.get(servidor.url, protecao=protecao).status_code == 503
+    with pytest.raises(ServicoIndisponivel, match="disjuntor aberto"):
+        cliente.get(servidor.url, protecao=protecao)
+    assert len(servidor.requisicoes) == 3
+
+
+def test_cota_esgotada_abre_o_disjuntor_sem_repetir(stub):
+    servidor = stub(lambda handler, numero: (402, {}, b""))
+    protecao = protecao_disjuntor("teste-cota", limite_falhas=5, tempo_aberto=30)
+    cliente = cria_cliente(tentativas=3)
+
+    with pytest.raises(ServicoIndisponivel, match="cota esgotada, status 402"):
+        cliente.get(servidor.url, protecao=protecao)
+    with pytest.raises(ServicoIndisponivel, match="disjuntor aberto"):
+        cliente.get(servidor.url, protecao=protecao)
+    assert len(servidor.requisicoes) == 1
+
+
+@pytest.mark.parametrize("status, tentativas, requisicoes, esgotada", [
+    # 429 na ultima tentativa indica a cota esgotada
+    ([429, 429], 2, 2, True),
+    # 429 seguido de sucesso e apenas uma falha temporaria
+    ([429, 200], 2, 2, False),
+])
+def test_429_apos_a_ultima_tentativa_e_cota_esgotada(stub, status, tentativas, requisicoes, esgotada):
+    servidor = stub(lambda handler, numero: (status[numero], {}, b""))
+    protecao = protecao_disjuntor("teste-429-%s" % esgotada, limite_falhas=5, tempo_aberto=30)
+    cliente = cria_cliente(tentativas=tentativas)
+
+    if esgotada:
+        with pytest.raises(ServicoIndisponivel, match="cota esgotada, status 429"):
+            cliente.get(servidor.url, protecao=protecao)
+    else:
+        assert cliente.get(servidor.url, protecao=protecao).status_code == 200
+    assert len(servidor.requisicoes) == requisicoes
+    assert protecao.disjuntor.permite() != esgotada
+
+
+def test_cota_esgotada_serve_resultados_obsoletos(stub, monkeypatch):
+    status_spoonacular = [200]
+
+    def responder(handler, numero):
+        if handler.command == "POST":
+            textos = parse_qs(servidor.requisicoes[numero][2].decode()).get("q", [])
+            return 200, {}, {"data": {"translations": [{"translatedText": texto} for texto in textos]}}
+        if status_spoonacular[0] != 200:
+            return status_spoonacular[0], {}, {"message": "Your daily points limit has been reached."}
+        return 200, {}, {"results": [receita_spoonacular(1)], "totalResults": 1}
+
+    servidor = stub(responder)
+    monkeypatch.setattr(traducao, "GOOGLE_TRANSLATE_URL", servidor.url + "/translate")
+    monkeypatch.setattr(receita, "SPOONACULAR_URL", servidor.url + "/search")
+    monkeypatch.setattr(receita, "protecao_spoonacular", cria_protecao("spoonacular-obsoletos", 0, 0))
+    cliente = app.test_client()
+
+    def busca(ingredientes: str):
+        return cliente.get("/buscar_receitas", query_string={"ingredients": ingredientes, "excludeIngredients": ""})
+
+    assert busca("abobora").get_json()["receitas"][0]["titulo"] == "Recipe 1"
+
+    # resultados expirados na memoria e no bd
+    monkeypatch.setattr(receita, "cache_receitas", CacheRevalidavel(8, 0, 0))
+    chave = receita.gera_chave_receita(*receita.normaliza_busca("abobora", "", "breakfast"))
+    with engine.begin() as conexao:
+        assert conexao.execute(update(BuscaReceita).where(BuscaReceita.chave == chave)
+                               .values(data_resultados=datetime.now() - timedelta(days=2))).rowcount == 1
+
+    status_spoonacular[0] = 402
+    buscas_api = len([r for r in servidor.requisicoes if r[0] == "GET"])
+    for _ in range(2):
+        resposta = busca("abobora")
+        assert resposta.status_code == 200
+        assert resposta.get_json()["receitas"][0]["titulo"] == "Recipe 1"
+
+    # apenas a primeira busca chega a API; a seguinte e recusada pelo disjuntor
+    assert len([r for r in servidor.requisicoes if r[0] == "GET"]) == buscas_api + 1
+
+    # buscas sem resultados armazenados continuam indisponiveis
+    assert busca("beterraba").status_code == 503
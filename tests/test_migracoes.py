@@ -0,0 +1,46 @@
+import logging
+import sqlite3
+
+from sqlalchemy import create_engine, event
+
+from model import Base, engine, configura_conexao
+from model.migracoes import executa_migracoes
+from tests.conftest import ESQUEMA_ORIGINAL
+
+
+def comentarios_refeicoes(conexao):
+    return {comentarios for (comentarios,) in conexao.exec_driver_sql("SELECT comentarios FROM refeicao")}
+
+
+def test_migracao_remove_refeicoes_sem_registro(tmp_path, caplog):
+    caminho = tmp_path / "original.sqlite3"
+    with sqlite3.connect(caminho) as conexao:
+        conexao.executescript(ESQUEMA_ORIGINAL)
+    conexao.close()
+
+    # mesma configuracao do engine da aplicacao, com as chaves estrangeiras ativas
+    engine_original = create_engine("sqlite:///%s" % caminho)
+    event.listen(engine_original, "connect", configura_conexao)
+    try:
+        # como na importacao do modulo model
+        Base.metadata.create_all(engine_original)
+        with caplog.at_level(logging.WARNING, logger="logger"):
+            executa_migracoes(engine_original)
+
+        with engine_original.connect() as conexao:
+            assert comentarios_refeicoes(conexao) == {"", "categorias fora da enumeracao"}
+            assert conexao.exec_driver_sql("PRAGMA foreign_key_check").fetchall() == []
+            # as chaves estrangeiras voltam a ser verificadas apos as migracoes
+            assert conexao.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+    finally:
+        engine_original.dispose()
+
+    assert any("sem registro relacionado removidos" in registro.getMessage() for registro in caplog.records)
+
+
+def test_bd_dos_testes_migrado_sem_orfaos():
+    # o bd dos testes e criado no esquema original, com uma refeicao sem
+    # registro, e migrado na importacao do modulo model
+    with engine.connect() as conexao:
+        assert "refeicao sem registro" not in comentarios_refeicoes(conexao)
+        assert conexao.exec_driver_sql("PRAGMA foreign_key_check").fetchall() == []
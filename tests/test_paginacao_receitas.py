@@ -0,0 +1,98 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app import app
+from services import receita, traducao
+from services.limitador import cria_protecao
+from tests.servidor_stub import ServidorStub
+
+
+# receitas encontradas pela busca e tamanho dos lotes obtidos da API
+TOTAL = 7
+LOTE = 3
+
+
+def receita_spoonacular(numero: int):
+    return {"id": numero, "title": "Recipe %s" % numero,
+            "extendedIngredients": [{"name": "egg", "measures": {"metric": {"amount": 1, "unitLong": "unit"}}}],
+            "analyzedInstructions": [{"steps": [{"step": "Cook."}]}]}
+
+
+@pytest.fixture
+def apis(monkeypatch):
+    """ Emula as APIs Google Translate e Spoonacular em um servidor local
+    """
+    def responder(handler, numero):
+        if handler.command == "POST":
+            textos = parse_qs(servidor.requisicoes[numero][2].decode()).get("q", [])
+            return 200, {}, {"data": {"translations": [{"translatedText": texto} for texto in textos]}}
+
+        parametros = parse_qs(urlsplit(handler.path).query)
+        offset, number = int(parametros["offset"][0]), int(parametros["number"][0])
+        receitas = [receita_spoonacular(indice + 1) for indice in range(offset, min(offset + number, servidor.total))]
+        return 200, {}, {"results": receitas, "offset": offset, "number": number, "totalResults": servidor.total}
+
+    servidor = ServidorStub(responder)
+    servidor.total = TOTAL
+    monkeypatch.setattr(traducao, "GOOGLE_TRANSLATE_URL", servidor.url + "/translate")
+    monkeypatch.setattr(receita, "SPOONACULAR_URL", servidor.url + "/search")
+    monkeypatch.setattr(receita, "RECEITA_RESULTADOS_POR_BUSCA", LOTE)
+    yield servidor
+    servidor.encerrar()
+
+
+def offsets_buscados(servidor):
+    return [int(parse_qs(urlsplit(caminho).query)["offset"][0])
+            for metodo, caminho, _ in servidor.requisicoes if metodo == "GET"]
+
+
+def busca(ingredientes: str, offset: int, limit: int):
+    resposta = app.test_client().get("/buscar_receitas", query_string={
+        "ingredients": ingredientes, "excludeIngredients": "", "offset": offset, "limit": limit})
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+
+def titulos(pagina: dict):
+    return [receita["titulo"] for receita in pagina["receitas"]]
+
+
+def test_total_informado_pela_api(apis):
+    pagina = busca("ovo", 0, 2)
+
+    assert pagina["total"] == TOTAL
+    assert titulos(pagina) == ["Recipe 1", "Recipe 2"]
+
+
+def test_obtem_os_lotes_seguintes_conforme_as_paginas(apis):
+    assert titulos(busca("leite", 0, 2)) == ["Recipe 1", "Recipe 2"]
+    # a pagina atravessa o primeiro e o segundo lote
+    assert titulos(busca("leite", 2, 2)) == ["Recipe 3", "Recipe 4"]
+    assert titulos(busca("leite", 5, 5)) == ["Recipe 6", "Recipe 7"]
+
+    assert offsets_buscados(apis) == [0, LOTE, 2 * LOTE]
+
+    # lotes ja obtidos sao servidos do cache
+    assert titulos(busca("leite", 4, 2)) == ["Recipe 5", "Recipe 6"]
+    assert offsets_buscados(apis) == [0, LOTE, 2 * LOTE]
+
+
+def test_pagina_alem_do_total_nao_consulta_a_api(apis):
+    pagina = busca("queijo", 20, 5)
+
+    assert pagina["receitas"] == []
+    assert pagina["total"] == TOTAL
+    assert offsets_buscados(apis) == [0]
+
+
+def test_pagina_com_varios_lotes_respeita_o_limite_por_segundo(apis, monkeypatch):
+    # limite padrao de uma requisicao por segundo, com um estado proprio no bd
+    monkeypatch.setattr(receita, "protecao_spoonacular", cria_protecao("spoonacular-paginacao", 1, 0))
+    monkeypatch.setattr(receita, "RECEITA_RESULTADOS_POR_BUSCA", 10)
+    apis.total = 50
+
+    pagina = busca("farinha", 15, 10)
+
+    assert titulos(pagina) == ["Recipe %s" % numero for numero in range(16, 26)]
+    assert offsets_buscados(apis) == [0, 10, 20]
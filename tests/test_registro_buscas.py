@@ -0,0 +1,155 @@
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs
+
+import pytest
+from sqlalchemy import select, delete
+
+from app import app
+from model import SessionFactory, engine, BuscaReceita
+from services import preaquecimento, receita, traducao
+from services.receita import normaliza_busca, gera_chave_receita
+from services.registro_buscas import RegistroBuscas
+from tests.servidor_stub import ServidorStub
+from tests.test_paginacao_receitas import receita_spoonacular
+
+
+@pytest.fixture(autouse=True)
+def limpa_buscas():
+    with engine.begin() as conexao:
+        conexao.execute(delete(BuscaReceita))
+    yield
+    with engine.begin() as conexao:
+        conexao.execute(delete(BuscaReceita))
+
+
+def registro(retencao=60):
+    # sem gravacao periodica durante o teste
+    return RegistroBuscas(3600, retencao, 0)
+
+
+def registra(registro_buscas, ingredientes, excluir_ingredientes="", tipo_prato=""):
+    busca = normaliza_busca(ingredientes, excluir_ingredientes, tipo_prato)
+    registro_buscas.registrar(gera_chave_receita(*busca), busca)
+
+
+def buscas_gravadas():
+    session = SessionFactory()
+    try:
+        return {linha.chave: linha for linha in session.execute(select(BuscaReceita)).scalars()}
+    finally:
+        session.close()
+
+
+def test_contagens_gravadas_em_lote():
+    registro_buscas = registro()
+    for _ in range(3):
+        registra(registro_buscas, "ovo, Banana", "sal")
+    registra(registro_buscas, "leite")
+
+    # nenhuma escrita no bd a cada busca
+    assert buscas_gravadas() == {}
+
+    assert registro_buscas.gravar() == 2
+    registra(registro_buscas, "banana, ovo", "sal")
+    registro_buscas.gravar()
+
+    gravadas = buscas_gravadas()
+    busca = gravadas[gera_chave_receita("ovo, banana", "sal", "")]
+    assert busca.quantidade == 4
+    assert (busca.ingredientes, busca.excluir_ingredientes, busca.tipo_prato) == ("banana, ovo", "sal", "")
+    assert gravadas[gera_chave_receita("leite", "", "")].quantidade == 1
+
+
+def test_remove_resultados_e_buscas_antigos():
+    antigo = datetime.now() - timedelta(seconds=120)
+    recente = datetime.now()
+    session = SessionFactory()
+    try:
+        session.add_all([
+            BuscaReceita(chave="antiga", quantidade=2, ultima_busca=antigo, resultados="[]", data_resultados=antigo),
+            BuscaReceita(chave="feita_recentemente", quantidade=2, ultima_busca=recente,
+                         resultados="[]", data_resultados=antigo),
+            BuscaReceita(chave="resultados_recentes", quantidade=0, resultados="[]", data_resultados=recente),
+        ])
+        session.commit()
+
+        registro(retencao=60).remove_antigos(session)
+        session.commit()
+    finally:
+        session.close()
+
+    gravadas = buscas_gravadas()
+    assert set(gravadas) == {"feita_recentemente", "resultados_recentes"}
+    # a contagem da busca e mantida, sem os resultados antigos
+    assert gravadas["feita_recentemente"].resultados is None
+    assert gravadas["feita_recentemente"].quantidade == 2
+    assert gravadas["resultados_recentes"].resultados == "[]"
+
+
+def test_alimentos_apenas_dos_ingredientes_incluidos():
+    data = date(2031, 6, 1)
+    registro_buscas = registro()
+    registra(registro_buscas, "ovo, batata doce", "sal")
+    registro_buscas.gravar()
+
+    cliente = app.test_client()
+    cliente.post("/inserir_diario", json={"data_registro": data.isoformat(), "refeicoes": [
+        {"comentarios": "Batata doce com ovo e uma pitada de sal"}]})
+    try:
+        contagens = preaquecimento.alimentos_frequentes(data, "")
+    finally:
+        cliente.delete("/deletar_diario", query_string={"data_registro": data.isoformat()})
+
+    assert set(contagens) == {("batata doce", "", ""), ("ovo", "", ""), ("batata doce, ovo", "", "")}
+
+
+def test_alimentos_recorrentes_nos_comentarios():
+    data = date(2032, 1, 1)
+    registro_buscas = registro()
+    registra(registro_buscas, "batata doce", "sal")
+    registro_buscas.gravar()
+
+    cliente = app.test_client()
+    cliente.post("/inserir_diario", json={"data_registro": data.isoformat(), "refeicoes": [
+        {"comentarios": "Comeu abacate com banana e sal"},
+        {"comentarios": "Abacate amassado com batata doce e sal"},
+        {"comentarios": "Banana com abacate, comeu muito bem e sal"}]})
+    try:
+        contagens = preaquecimento.alimentos_frequentes(data, "", 3)
+        contagens_duas_refeicoes = preaquecimento.alimentos_frequentes(data, "", 2)
+    finally:
+        cliente.delete("/deletar_diario", query_string={"data_registro": data.isoformat()})
+
+    # "com" e ignorada e "sal" e um ingrediente excluido das buscas
+    assert contagens == {("abacate", "", ""): 3, ("batata doce", "", ""): 1, ("abacate, batata doce", "", ""): 1}
+    assert contagens_duas_refeicoes[("banana", "", "")] == 2
+    assert ("comeu", "", "") not in contagens_duas_refeicoes
+
+
+@pytest.fixture
+def apis(monkeypatch):
+    """ Emula as APIs Google Translate e Spoonacular em um servidor local
+    """
+    def responder(handler, numero):
+        if handler.command == "POST":
+            textos = parse_qs(servidor.requisicoes[numero][2].decode()).get("q", [])
+            return 200, {}, {"data": {"translations": [{"translatedText": texto} for texto in textos]}}
+        # receitas ainda nao armazenadas pelos demais testes
+        return 200, {}, {"results": [receita_spoonacular(9000 + numero)], "totalResults": 1}
+
+    servidor = ServidorStub(responder)
+    monkeypatch.setattr(traducao, "GOOGLE_TRANSLATE_URL", servidor.url + "/translate")
+    monkeypatch.setattr(receita, "SPOONACULAR_URL", servidor.url + "/search")
+    yield servidor
+    servidor.encerrar()
+
+
+def test_preaquecimento_respeita_orcamento_de_traducoes(apis, monkeypatch):
+    buscas = [normaliza_busca(ingredientes, "", "") for ingredientes in ("quiabo", "jilo", "maxixe")]
+    monkeypatch.setattr(preaquecimento, "candidatas", lambda: buscas)
+
+    estatisticas = preaquecimento.executa_preaquecimento(orcamento=10, orcamento_traducoes=2)
+
+    # cada busca traduz os ingredientes e a receita encontrada
+    assert estatisticas == {"preaquecidas": 1, "buscas_api": 1, "traducoes_api": 2, "falhas": 0}
+    assert [metodo for metodo, _, _ in apis.requisicoes].count("POST") == 2